@@ -1,6 +1,9 @@
-import os, json, random
+import os, json, random, hashlib
 from datetime import date
 
+from answer_store import AnswerCatalog, file_lock, read_json, write_json_atomic
+from result_cache import invalidate_mission_cache
+
 # ======================================
 # ✅ 루트 기준 절대 경로 계산
 # ======================================
@@ -9,19 +12,33 @@ DATA_DIR = os.path.join(PROJECT_ROOT, "data")
 ANSWER_FILE = os.path.join(DATA_DIR, "answer.json")
 STATE_FILE = os.path.join(DATA_DIR, "current_answer.json")
 
+# ======================================
+# ✅ 정답 선택 방식 (환경 변수로 변경 가능)
+# ======================================
+# "random": 날짜가 바뀌면 무작위로 고르고 current_answer.json에 저장 (기본값)
+# "hash": 날짜 + 배포 비밀값의 해시로 계산 (모든 워커/노드가 파일 없이 같은 정답을 얻음)
+ANSWER_SELECTION = os.getenv("ANSWER_SELECTION", "random")
+# 해시 방식에서 정답을 예측할 수 없게 하는 배포 비밀값
+ANSWER_SECRET = os.getenv("ANSWER_SECRET", "")
+# 해시 방식에서 날짜별로 관리자가 지정한 정답 ({"2026-10-20": {"missions1": "피노키오", "missions2": "차분한"}})
+OVERRIDES_FILE = os.getenv("ANSWER_OVERRIDES_FILE", os.path.join(DATA_DIR, "answer_overrides.json"))
+
+if ANSWER_SELECTION == "hash" and not ANSWER_SECRET:
+    print("⚠️ ANSWER_SECRET이 설정되지 않아 날짜만으로 정답을 계산합니다. (정답을 미리 알 수 있음)")
+
+
+# ✅ answer.json은 한 번만 파싱/검증하고 파일이 바뀌었을 때만 다시 읽음
+catalog = AnswerCatalog(ANSWER_FILE)
+
 
 def load_missions1():
     """missions1 리스트 로드"""
-    with open(ANSWER_FILE, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    return data.get("missions1", [])
+    return catalog.missions("missions1")
 
 
 def load_missions2():
     """missions2 리스트 로드"""
-    with open(ANSWER_FILE, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    return data.get("missions2", [])
+    return catalog.missions("missions2")
 
 
 def get_today_answer(admin_choice=None, mission_type=None):
@@ -71,6 +88,103 @@ def get_today_answer(admin_choice=None, mission_type=None):
     return answer, hint
 
 
+def load_overrides(path=OVERRIDES_FILE):
+    """
+    날짜별 관리자 지정 정답을 로드합니다.
+
+    Returns:
+        dict: {"YYYY-MM-DD": {"missions1": 정답, "missions2": 정답}} (파일이 없으면 빈 dict)
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError as e:
+        print(f"⚠️ 관리자 지정 정답 파일 형식 오류: {e}. 무시합니다.")
+        return {}
+
+
+def save_override(day, admin_choice1=None, admin_choice2=None):
+    """
+    해시 방식에서 관리자 지정 정답을 날짜별 지정 파일에 저장합니다. (서버 워커는 파일 변경을 감지해 반영)
+
+    Args:
+        day (date): 날짜
+        admin_choice1 (str, optional): missions1 정답
+        admin_choice2 (str, optional): missions2 정답
+
+    Raises:
+        ValueError: 후보에 없는 정답일 때 (저장하지 않음)
+    """
+    choices = {}
+    if admin_choice1:
+        choices["missions1"] = find_candidate(load_missions1(), admin_choice1, "missions1")["answer"]
+    if admin_choice2:
+        choices["missions2"] = find_candidate(load_missions2(), admin_choice2, "missions2")["answer"]
+
+    with file_lock(OVERRIDES_FILE):
+        overrides = load_overrides()
+        overrides.setdefault(str(day), {}).update(choices)
+        write_json_atomic(OVERRIDES_FILE, overrides)
+    print(f"📝 {day} 관리자 지정 정답 저장: {choices}")
+
+
+def pick_daily(candidates, day, slot):
+    """
+    날짜와 비밀값으로 후보 중 하나를 결정적으로 고릅니다.
+    후보 수만큼의 날을 한 주기로 묶어 주기마다 해시로 섞은 순서를 쓰므로, 한 주기 안에서는 같은 정답이 반복되지 않습니다.
+    주기와 순서가 후보 목록에 따라 정해지므로 answer.json을 고치면 오늘 정답도 바로 바뀔 수 있습니다.
+    (서버 워커는 answer.json 변경을 감지해 함께 다시 계산하며, 오늘 정답을 유지하려면 먼저 save_override로 지정)
+
+    Args:
+        candidates (list): missions1 또는 missions2 리스트
+        day (date): 날짜
+        slot (str): "missions1" / "missions2" (두 미션이 서로 다른 순서를 쓰도록)
+
+    Returns:
+        dict: 선택된 {"answer", "hint"}
+    """
+    cycle, position = divmod(day.toordinal(), len(candidates))
+    seed = hashlib.sha256(f"{ANSWER_SECRET}|{slot}|{cycle}".encode("utf-8")).digest()
+    order = sorted(candidates, key=lambda m: m["answer"])  # answer.json 항목 순서와 무관하게
+    random.Random(seed).shuffle(order)
+    return order[position]
+
+
+def find_candidate(candidates, answer, slot):
+    """후보 중 answer와 일치하는 항목 (없으면 ValueError)"""
+    match = next((m for m in candidates if m["answer"] == answer), None)
+    if match is None:
+        raise ValueError(f"관리자 지정 {slot} '{answer}'은 후보에 없습니다.")
+    return match
+
+
+def get_daily_answers(day=None):
+    """
+    해시 방식으로 날짜의 정답과 힌트를 계산합니다. (파일 저장 없음)
+    우선순위: 관리자 지정 정답 파일 (save_override) > 날짜 해시
+
+    Returns:
+        tuple: (mission1_answer, mission2_answer, hint1, hint2)
+    """
+    day = day or date.today()
+    overrides = load_overrides().get(str(day), {})
+
+    picks = []
+    for slot, candidates in (("missions1", load_missions1()), ("missions2", load_missions2())):
+        pick = None
+        if overrides.get(slot):
+            try:
+                pick = find_candidate(candidates, overrides[slot], slot)
+            except ValueError as e:
+                # 지정 파일의 오타로 서버가 멈추지 않도록 해시 결과 사용
+                print(f"⚠️ {e} 날짜 해시로 선택합니다.")
+        picks.append(pick or pick_daily(candidates, day, slot))
+
+    return picks[0]["answer"], picks[1]["answer"], picks[0]["hint"], picks[1]["hint"]
+
+
 def get_today_answers(admin_choice1=None, admin_choice2=None):
     """
     오늘의 정답과 두 가지 힌트(missions1, missions2)를 모두 가져옵니다.
@@ -83,37 +197,49 @@ def get_today_answers(admin_choice1=None, admin_choice2=None):
     Returns:
         tuple: (mission1_answer, mission2_answer, hint1, hint2)
     """
+    if ANSWER_SELECTION == "hash":
+        # 날짜별로 항상 같은 값이므로 상태 파일을 쓰지 않음 (관리자 지정은 지정 파일에 저장해 모든 워커에 반영)
+        if admin_choice1 or admin_choice2:
+            save_override(date.today(), admin_choice1, admin_choice2)
+        return get_daily_answers()
+
+    # ✅ 확인-선택-저장을 잠금 안에서 수행 (자정에 여러 워커가 동시에 서로 다른 정답을 저장하지 않도록)
+    with file_lock(STATE_FILE):
+        return load_or_create_answers(admin_choice1, admin_choice2)
+
+
+def load_or_create_answers(admin_choice1=None, admin_choice2=None):
+    """
+    get_today_answers의 본체 - 상태 파일에 오늘 정답이 있으면 그대로, 없으면 새로 골라 저장합니다.
+    (STATE_FILE 잠금 보유 상태에서 호출)
+    """
     today = str(date.today())
 
     # ✅ data 폴더 없으면 자동 생성
     os.makedirs(DATA_DIR, exist_ok=True)
 
-    # 파일이 존재하고 비어있지 않은 경우에만 읽기 시도
+    # 잠금을 기다리는 동안 다른 워커가 이미 오늘 정답을 저장했을 수 있으므로 잠금 안에서 다시 읽음
     if not admin_choice1 and not admin_choice2:
-        if os.path.exists(STATE_FILE) and os.path.getsize(STATE_FILE) > 0:
-            try:
-                with open(STATE_FILE, "r", encoding="utf-8") as f:
-                    content = f.read().strip()
-                    if content:  # 내용이 있는 경우에만 파싱 시도
-                        state = json.loads(content)
-                        if state.get("date") == today:
-                            # 오늘 날짜면 기존 값 반환
-                            answer1 = state.get("answer1") or state.get(
-                                "answer"
-                            )  # 하위 호환성
-                            answer2 = state.get("answer2")
-                            hint1 = state.get("hint") or state.get(
-                                "hint1"
-                            )  # 하위 호환성
-                            hint2 = state.get("hint2")
-                            if answer1 and answer2 and hint1 and hint2:
-                                return answer1, answer2, hint1, hint2
-            except (json.JSONDecodeError, ValueError, KeyError) as e:
-                # JSON 파싱 오류나 잘못된 형식일 경우 새로 생성
-                print(f"⚠️ 상태 파일 형식 오류: {e}. 새로 생성합니다.")
-            except Exception as e:
-                # 기타 오류
-                print(f"⚠️ 상태 파일 읽기 오류: {e}. 새로 생성합니다.")
+        try:
+            state = read_json(STATE_FILE)  # 파일이 없거나 비어 있으면 None
+            if state and state.get("date") == today:
+                # 오늘 날짜면 기존 값 반환
+                answer1 = state.get("answer1") or state.get(
+                    "answer"
+                )  # 하위 호환성
+                answer2 = state.get("answer2")
+                hint1 = state.get("hint") or state.get(
+                    "hint1"
+                )  # 하위 호환성
+                hint2 = state.get("hint2")
+                if answer1 and answer2 and hint1 and hint2:
+                    return answer1, answer2, hint1, hint2
+        except (json.JSONDecodeError, ValueError, KeyError, AttributeError) as e:
+            # JSON 파싱 오류나 잘못된 형식일 경우 새로 생성
+            print(f"⚠️ 상태 파일 형식 오류: {e}. 새로 생성합니다.")
+        except Exception as e:
+            # 기타 오류
+            print(f"⚠️ 상태 파일 읽기 오류: {e}. 새로 생성합니다.")
 
     # 새로운 정답 생성
     # missions1에서 answer1과 hint1 선택
@@ -161,8 +287,10 @@ def get_today_answers(admin_choice1=None, admin_choice2=None):
         "hint2": hint2,  # missions2 힌트
     }
 
-    with open(STATE_FILE, "w", encoding="utf-8") as f:
-        json.dump(state, f, ensure_ascii=False, indent=2)
+    write_json_atomic(STATE_FILE, state)
+
+    # 정답이 바뀌었으므로 이전 정답 기준의 미션 판정 캐시는 폐기
+    invalidate_mission_cache()
 
     return answer1, answer2, hint1, hint2
 
@@ -0,0 +1,160 @@
+# answer_store.py
+import os
+import json
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl  # Linux/macOS
+except ImportError:
+    fcntl = None
+    import msvcrt  # Windows
+
+
+# ======================================
+# ✅ 파일 잠금과 원자적 쓰기
+# ======================================
+
+@contextmanager
+def file_lock(path):
+    """
+    path 옆의 잠금 파일(path + ".lock")로 프로세스 간 배타 잠금을 잡습니다. (권고 잠금)
+    같은 파일을 읽고-판단하고-쓰는 구간을 여러 워커가 동시에 실행하지 않도록 감쌉니다.
+    """
+    lock_path = f"{path}.lock"
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    with open(lock_path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def write_json_atomic(path, data):
+    """
+    같은 폴더의 임시 파일에 쓴 뒤 os.replace로 교체합니다.
+    읽는 쪽은 항상 이전 파일 전체나 새 파일 전체만 보게 됩니다. (반쯤 쓰인 파일 없음)
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_json(path):
+    """
+    JSON 파일을 읽습니다.
+
+    Returns:
+        파싱된 값 (파일이 없거나 비어 있으면 None)
+
+    Raises:
+        json.JSONDecodeError: 형식이 잘못되었을 때
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return json.loads(content) if content else None
+
+
+# ======================================
+# ✅ 정답 후보 목록 (answer.json) 캐시
+# ======================================
+
+def validate_catalog(data):
+    """
+    answer.json 형식을 검사합니다.
+
+    Returns:
+        dict: {"missions1": [...], "missions2": [...]}
+
+    Raises:
+        ValueError: 형식이 잘못되었을 때
+    """
+    if not isinstance(data, dict):
+        raise ValueError("최상위 값이 객체가 아닙니다.")
+
+    catalog = {}
+    for slot in ("missions1", "missions2"):
+        missions = data.get(slot)
+        if not isinstance(missions, list) or not missions:
+            raise ValueError(f"'{slot}' 목록이 없거나 비어 있습니다.")
+        seen = set()
+        for i, mission in enumerate(missions):
+            if not isinstance(mission, dict):
+                raise ValueError(f"{slot}[{i}]가 객체가 아닙니다.")
+            answer, hint = mission.get("answer"), mission.get("hint")
+            if not isinstance(answer, str) or not answer.strip():
+                raise ValueError(f"{slot}[{i}]에 'answer'가 없습니다.")
+            if not isinstance(hint, str) or not hint.strip():
+                raise ValueError(f"{slot}[{i}] ('{answer}')에 'hint'가 없습니다.")
+            if answer in seen:
+                raise ValueError(f"{slot}에 '{answer}'가 중복되어 있습니다.")
+            seen.add(answer)
+        catalog[slot] = [{"answer": m["answer"], "hint": m["hint"]} for m in missions]
+    return catalog
+
+
+class AnswerCatalog:
+    """
+    answer.json을 한 번만 파싱/검증해 메모리에 보관하고, 파일 mtime이 바뀌면 다시 읽습니다.
+    수정된 파일이 잘못되었으면 경고 후 마지막으로 검증된 목록을 계속 사용합니다.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._catalog = None
+        self._mtime = None
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def _load(self, mtime):
+        """(_lock 보유 상태에서 호출)"""
+        try:
+            catalog = validate_catalog(read_json(self.path))
+        except (OSError, ValueError) as e:  # json.JSONDecodeError는 ValueError의 하위 클래스
+            if self._catalog is None:
+                raise ValueError(f"정답 목록을 읽을 수 없습니다 ({self.path}): {e}") from e
+            print(f"⚠️ 수정된 정답 목록이 잘못되어 이전 목록을 사용합니다 ({self.path}): {e}")
+        else:
+            self._catalog = catalog
+            self.loads += 1
+            print(f"✅ 정답 목록 로드 완료: missions1 {len(catalog['missions1'])}개, missions2 {len(catalog['missions2'])}개")
+        self._mtime = mtime
+
+    def missions(self, slot):
+        """
+        후보 리스트를 반환합니다. (호출부가 수정해도 캐시에 영향 없도록 복사본)
+
+        Args:
+            slot (str): "missions1" 또는 "missions2"
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        with self._lock:
+            if self._catalog is None or mtime != self._mtime:
+                self._load(mtime)
+            return list(self._catalog[slot])
@@ -50,10 +50,12 @@ kw_strong = ["활기찬", "차분한"]
 kw_middle = ["옛스러운", "화사한", "자연적인"]
 kw_weak = ["신비로운", "웅장한"]
 
+# top_k: 판정/힌트에 쓰는 상위 분위기 수
+# 성공 조건: 1위가 정답이거나, 상위 window개 안에 정답 분위기가 min_count개 이상
 rules = [
-        {"group": kw_strong, "top_k": 5},
-        {"group": kw_middle, "top_k": 7},
-        {"group": kw_weak,   "top_k": 9},
+        {"group": kw_strong, "top_k": 5, "window": 5, "min_count": 3},
+        {"group": kw_middle, "top_k": 7, "window": 7, "min_count": 2},
+        {"group": kw_weak,   "top_k": 9, "window": 7, "min_count": 1},
     ]
 
 feedback_guide = {
@@ -0,0 +1,162 @@
+# daily_state.py
+import os
+import json
+import time
+import hashlib
+import threading
+from datetime import date, datetime, timedelta
+
+from answer_manager import ANSWER_FILE, ANSWER_SELECTION, OVERRIDES_FILE, STATE_FILE, get_daily_answers, get_today_answers
+
+# ======================================
+# ✅ 설정
+# ======================================
+# 상태 파일의 변경 여부(mtime)를 확인하는 최소 간격(초) - 그 사이 요청은 메모리 값만 사용
+DAILY_STATE_CHECK_INTERVAL = float(os.getenv("DAILY_STATE_CHECK_INTERVAL", "1"))
+
+
+def next_midnight(now=None):
+    """다음 로컬 자정 시각 (오늘의 정답이 바뀌는 시점)"""
+    now = now or datetime.now()
+    return datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+
+
+def read_state_file(path=STATE_FILE):
+    """
+    상태 파일에서 오늘의 정답/힌트를 읽습니다.
+
+    Returns:
+        dict: {"date", "answer1", "answer2", "hint1", "hint2"} (없거나 비어 있거나 형식이 잘못되면 None)
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read().strip()
+        if not content:
+            return None
+        state = json.loads(content)
+    except FileNotFoundError:
+        return None
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️ 상태 파일 로드 실패: {e}")
+        return None
+
+    # 하위 호환성: answer1/hint1이 없으면 answer/hint 사용
+    values = {
+        "date": state.get("date"),
+        "answer1": state.get("answer1") or state.get("answer"),
+        "answer2": state.get("answer2"),
+        "hint1": state.get("hint1") or state.get("hint"),
+        "hint2": state.get("hint2"),
+    }
+    if not all(values.values()):
+        return None
+    return values
+
+
+class DailyState:
+    """
+    오늘의 정답/힌트를 프로세스 메모리에 보관합니다.
+    날짜가 바뀌었거나 상태 파일이 다른 프로세스(관리자 스크립트, 다른 워커)에 의해 바뀌었을 때만 파일을 다시 읽습니다.
+    해시 방식(ANSWER_SELECTION=hash)에서는 상태 파일 대신 관리자 지정 정답 파일과 answer.json의 변경을 감시하고,
+    정답은 날짜로 계산합니다. (후보 목록이 바뀌면 계산 결과도 바뀌므로 모든 워커가 함께 다시 계산)
+    """
+
+    def __init__(self, paths, check_interval, selection="random"):
+        self.paths = paths  # 변경을 감시할 파일들 (첫 번째가 상태 파일)
+        self.path = paths[0]
+        self.selection = selection
+        self.check_interval = check_interval
+        self._values = None
+        self._mtime = None
+        self._expires_at = None  # 다음 자정 (datetime)
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def _file_mtime(self):
+        """감시 중인 파일들의 mtime (없는 파일은 None)"""
+        mtimes = []
+        for path in self.paths:
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def _reload(self):
+        """
+        오늘의 정답을 다시 구합니다. (_lock 보유 상태에서 호출)
+        해시 방식이면 날짜로 계산하고, 아니면 상태 파일을 읽되 없거나 오늘 날짜가 아니면 새 정답을 생성합니다.
+        """
+        today = str(date.today())
+        values = None if self.selection == "hash" else read_state_file(self.path)
+        if values is None or values["date"] != today:
+            if self.selection == "hash":
+                print(f"📅 오늘의 정답 계산 ({today}, 해시 방식)")
+                answer1, answer2, hint1, hint2 = get_daily_answers()
+            else:
+                print("📅 오늘의 정답이 없거나 날짜가 바뀌어 새 정답을 생성합니다.")
+                answer1, answer2, hint1, hint2 = get_today_answers()
+            values = {"date": today, "answer1": answer1, "answer2": answer2, "hint1": hint1, "hint2": hint2}
+
+        self._values = values
+        self._mtime = self._file_mtime()
+        self._expires_at = next_midnight()
+        self.reloads += 1
+
+    def current(self):
+        """
+        오늘의 정답/힌트를 반환합니다. (자정이 지났거나 파일이 바뀌었으면 다시 읽음)
+
+        Returns:
+            dict: {"date", "answer1", "answer2", "hint1", "hint2"}
+        """
+        with self._lock:
+            if self._values is None or datetime.now() >= self._expires_at:
+                self._reload()
+            elif time.monotonic() - self._checked_at >= self.check_interval:
+                if self._file_mtime() != self._mtime:
+                    names = ", ".join(os.path.basename(path) for path in self.paths)
+                    print(f"🔄 {names} 중 변경된 파일이 있어 오늘의 정답을 다시 읽습니다.")
+                    self._reload()
+            self._checked_at = time.monotonic()
+            return self._values
+
+    def answer(self, mission_type):
+        """미션 종류에 맞는 오늘의 정답"""
+        values = self.current()
+        return values["answer2"] if mission_type == "photo" else values["answer1"]
+
+    def hint_payload(self, mission_type):
+        """
+        /get-today-hint 응답 본문과 ETag, 만료 시각을 반환합니다.
+
+        Returns:
+            tuple: (payload, etag, expires_at)
+        """
+        values = self.current()
+        if mission_type == "photo":
+            payload = {"answer": values["answer2"], "hint": values["hint2"]}
+        else:
+            payload = {"answer": values["answer1"], "hint": values["hint1"]}
+        body = json.dumps([values["date"], payload], ensure_ascii=False, sort_keys=True)
+        etag = hashlib.sha1(body.encode("utf-8")).hexdigest()[:16]
+        return payload, etag, next_midnight()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "date": self._values["date"] if self._values else None,
+                "selection": self.selection,
+                "reloads": self.reloads,
+                "expires_at": self._expires_at.isoformat() if self._expires_at else None,
+                "check_interval": self.check_interval,
+            }
+
+
+# ✅ 프로세스별 오늘의 정답 상태 (server.py 시작 시 로드)
+daily_state = DailyState(
+    [OVERRIDES_FILE, ANSWER_FILE] if ANSWER_SELECTION == "hash" else [STATE_FILE],
+    DAILY_STATE_CHECK_INTERVAL,
+    ANSWER_SELECTION,
+)
@@ -167,6 +167,52 @@ function App() {
     }
   };
 
+  // 스트림에 연결할 수 없을 때 폴링으로 힌트 받기 (확정되거나 횟수를 넘으면 중단)
+  const pollHint = async (hintUrl, attempts = 15) => {
+    for (let i = 0; i < attempts; i++) {
+      try {
+        const response = await fetch(`${API_ENDPOINT}${hintUrl}`);
+        if (!response.ok) return; // 만료된 토큰 - 화면의 기본 문구 유지
+        const { status, hint } = await response.json();
+        if (hint) {
+          setResult((prev) => (prev ? { ...prev, hint } : prev));
+        }
+        if (status === "done") return;
+      } catch (err) {
+        console.error("Hint polling error:", err);
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+    }
+  };
+
+  const followHint = (streamUrl, hintUrl) => {
+    const source = new EventSource(`${API_ENDPOINT}${streamUrl}`);
+    let text = "";
+    let finished = false;
+    source.addEventListener("delta", (event) => {
+      text += JSON.parse(event.data).text;
+      setResult((prev) => (prev ? { ...prev, hint: text } : prev));
+    });
+    source.addEventListener("done", (event) => {
+      finished = true;
+      const { hint } = JSON.parse(event.data);
+      setResult((prev) => (prev ? { ...prev, hint } : prev));
+      source.close();
+    });
+    source.addEventListener("expired", () => {
+      finished = true;
+      source.close();
+    });
+    // 스트림 연결이 끊기거나 열리지 않으면 (서버 재시작, 프록시 등) 자동 재연결 대신 폴링으로 전환
+    source.addEventListener("error", () => {
+      source.close();
+      if (!finished) {
+        finished = true;
+        pollHint(hintUrl);
+      }
+    });
+  };
+
   const handleSubmit = async () => {
     if (completedMissions[missionType]) {
       alert("이미 성공한 미션입니다. 다른 미션을 선택해주세요.");
@@ -206,6 +252,10 @@ function App() {
 
       setStatus("완료!");
       setResult(data);
+      // 실패 판정이 먼저 오고 힌트는 서버에서 생성 중인 경우 스트림으로 이어서 받기
+      if (data.hint_stream_url) {
+        followHint(data.hint_stream_url, data.hint_url);
+      }
       // 성공한 경우 히스토리에 저장
       if (data.success) {
         saveToHistory(data);
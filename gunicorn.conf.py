@@ -0,0 +1,54 @@
+# ============================================
+# gunicorn.conf.py - 운영 서버 실행 설정
+# ============================================
+# 실행: gunicorn -c gunicorn.conf.py server:app
+#
+# preload_app=True 이므로 master 프로세스가 server.py를 한 번 import 하면서
+# BLIP/CLIP 가중치를 올리고, 워커는 fork 되어 가중치 메모리를 copy-on-write로 공유합니다.
+# (CUDA는 fork 후 재사용할 수 없으므로 GPU 서버는 워커 1개 또는 추론 데몬을 사용하세요.)
+import gc
+import os
+
+# ======================================
+# ✅ 설정 (환경 변수로 변경 가능)
+# ======================================
+CPU_COUNT = os.cpu_count() or 1
+
+# 워커 1개당 torch 연산 스레드 수
+TORCH_THREADS = int(os.getenv("TORCH_THREADS_PER_WORKER", "2"))
+
+bind = os.getenv("BIND", "0.0.0.0:8080")
+# 기본값: 전체 코어를 워커별 torch 스레드 수로 나눈 만큼
+workers = int(os.getenv("WEB_CONCURRENCY", str(max(1, CPU_COUNT // TORCH_THREADS))))
+# 요청 스레드: 추론 대기 중에도 /get-today-hint 같은 가벼운 요청을 처리
+worker_class = "gthread"
+threads = int(os.getenv("WORKER_THREADS", "4"))
+# CPU에서 40개 질문 VQA + LLM 힌트까지 걸리는 시간을 고려
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+graceful_timeout = 30
+
+# 모델을 master에서 한 번만 로드한 뒤 fork
+preload_app = True
+
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    """워커를 띄우기 전에 master의 객체를 GC 추적 대상에서 빼서, GC가 공유 페이지를 건드리지 않게 합니다."""
+    gc.freeze()
+    server.log.info(
+        f"모델 로드 완료 - 워커 {workers}개 x torch 스레드 {TORCH_THREADS}개 (CPU {CPU_COUNT}개)"
+    )
+
+
+def post_fork(server, worker):
+    """워커별 torch 스레드 수를 제한해 워커끼리 코어를 나눠 쓰게 합니다."""
+    import torch
+
+    torch.set_num_threads(TORCH_THREADS)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # master에서 이미 병렬 연산이 실행된 경우 변경 불가 (intra-op 설정만 적용)
+    server.log.info(f"워커 {worker.pid}: torch 스레드 {torch.get_num_threads()}개")
@@ -0,0 +1,326 @@
+# hint_store.py
+import os
+import time
+import uuid
+import random
+import sqlite3
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from models.llm_hint_generator import fallback_hint, stream_hint
+from models.hint_cache import hint_cache
+from models.hint_pack import pack_hint
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# ======================================
+# ✅ 설정
+# ======================================
+# 생성 중인 힌트와 조각을 보관하는 SQLite 파일 (gunicorn 워커가 모두 같은 파일을 봄)
+HINT_STORE_FILE = os.getenv("HINT_STORE_FILE", os.path.join(PROJECT_ROOT, "data", "hint_store.sqlite3"))
+# 힌트를 생성할 백그라운드 스레드 수 (LLM 호출은 네트워크 대기라 추론 스레드와 분리)
+HINT_WORKERS = int(os.getenv("HINT_WORKERS", "8"))
+# 이 시간(초) 안에 LLM 힌트가 완성되지 않으면 기본 힌트로 확정
+HINT_DEADLINE = float(os.getenv("HINT_DEADLINE", "8"))
+# 보관할 최대 힌트 수와 확정 후 보관 시간(초)
+HINT_STORE_SIZE = int(os.getenv("HINT_STORE_SIZE", "1000"))
+HINT_TTL = float(os.getenv("HINT_TTL", "600"))
+# 다른 워커가 생성 중인 힌트의 새 조각을 확인하는 간격(초)
+HINT_POLL_INTERVAL = float(os.getenv("HINT_POLL_INTERVAL", "0.2"))
+
+
+class HintStore:
+    """
+    비동기로 생성 중인 힌트를 토큰별로 SQLite 파일에 보관하는 크기 제한 + 만료 저장소.
+    LLM이 보내는 조각(delta)을 쌓아 두고, 힌트를 생성하는 워커와 다른 워커에서도 조회/스트리밍할 수 있습니다.
+    같은 프로세스의 조각은 대기 중인 스트림을 바로 깨우고, 다른 프로세스의 조각은 poll_interval마다 확인합니다.
+    """
+
+    def __init__(self, path, max_hints, ttl, deadline, poll_interval=HINT_POLL_INTERVAL):
+        self.path = path
+        self.max_hints = max_hints
+        self.ttl = ttl
+        self.deadline = deadline
+        self.poll_interval = poll_interval
+        self._conn = None
+        self._conn_pid = None
+        self._cond = threading.Condition()
+
+    def _connect(self):
+        """프로세스마다 연결을 한 번 엽니다. (fork 전에 연 연결은 재사용하지 않음, _cond 보유 상태에서 호출)"""
+        if self._conn is None or self._conn_pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")  # 여러 워커 프로세스가 동시에 읽고 쓰기
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS hints ("
+                " token TEXT PRIMARY KEY, status TEXT NOT NULL, text TEXT, source TEXT,"
+                " fallback TEXT NOT NULL, deadline_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS hint_chunks ("
+                " token TEXT NOT NULL REFERENCES hints (token) ON DELETE CASCADE,"
+                " seq INTEGER NOT NULL, text TEXT NOT NULL, PRIMARY KEY (token, seq))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS hints_updated_at ON hints (updated_at)")
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    @contextmanager
+    def _transaction(self):
+        """쓰기 트랜잭션 (_cond 보유 상태에서 호출)"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")  # 다른 워커의 쓰기와 겹치지 않도록
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _expire(self, conn):
+        """만료된 힌트와 크기를 넘는 오래된 힌트를 제거합니다. (트랜잭션 안에서 호출)"""
+        conn.execute("DELETE FROM hints WHERE updated_at < ?", (time.time() - self.ttl,))
+        conn.execute(
+            "DELETE FROM hints WHERE token NOT IN"
+            " (SELECT token FROM hints ORDER BY updated_at DESC LIMIT ?)",
+            (self.max_hints,),
+        )
+
+    def _settle_overdue(self, conn, token):
+        """마감 시간이 지났는데 아직 생성 중이면 기본 힌트로 확정합니다. (트랜잭션 안에서 호출)"""
+        now = time.time()
+        settled = conn.execute(
+            "UPDATE hints SET status = 'done', text = fallback, source = 'fallback', updated_at = ?"
+            " WHERE token = ? AND status = 'pending' AND deadline_at <= ?",
+            (now, token, now),
+        ).rowcount
+        if settled:
+            self._cond.notify_all()
+
+    def create(self, answer, fallback=None):
+        """
+        새 힌트 자리를 만들고 토큰을 반환합니다.
+
+        Args:
+            answer (str): 정답
+            fallback (str, optional): 마감 시 사용할 힌트 (기본값: 기본 힌트 템플릿)
+        """
+        token = uuid.uuid4().hex
+        now = time.time()
+        with self._cond:
+            with self._transaction() as conn:
+                conn.execute(
+                    "INSERT INTO hints (token, status, fallback, deadline_at, updated_at)"
+                    " VALUES (?, 'pending', ?, ?, ?)",
+                    (token, fallback or fallback_hint(answer), now + self.deadline, now),
+                )
+                self._expire(conn)
+        return token
+
+    def append(self, token, delta):
+        """
+        생성된 조각을 추가합니다.
+
+        Returns:
+            bool: 계속 생성할 필요가 있으면 True (만료/마감되었으면 False)
+        """
+        with self._cond:
+            with self._transaction() as conn:
+                self._settle_overdue(conn, token)
+                row = conn.execute("SELECT status FROM hints WHERE token = ?", (token,)).fetchone()
+                if row is None or row[0] != "pending":
+                    return False
+                seq = conn.execute("SELECT COUNT(*) FROM hint_chunks WHERE token = ?", (token,)).fetchone()[0] + 1
+                conn.execute("INSERT INTO hint_chunks (token, seq, text) VALUES (?, ?, ?)", (token, seq, delta))
+                conn.execute("UPDATE hints SET updated_at = ? WHERE token = ?", (time.time(), token))
+            self._cond.notify_all()
+            return True
+
+    def finish(self, token, text, source):
+        """
+        힌트를 확정합니다. 이미 마감되어 기본 힌트로 확정되었으면 무시합니다.
+
+        Returns:
+            bool: 이번 호출로 확정되었으면 True
+        """
+        with self._cond:
+            with self._transaction() as conn:
+                self._settle_overdue(conn, token)
+                finished = conn.execute(
+                    "UPDATE hints SET status = 'done', text = ?, source = ?, updated_at = ?"
+                    " WHERE token = ? AND status = 'pending'",
+                    (text, source, time.time(), token),
+                ).rowcount
+            if finished:
+                self._cond.notify_all()
+            return bool(finished)
+
+    def _load(self, token, after=0):
+        """
+        힌트 상태와 after번째 이후의 조각을 읽습니다. 마감 시간이 지났으면 기본 힌트로 확정합니다.
+        (_cond 보유 상태에서 호출)
+
+        Returns:
+            tuple: (chunks, hint, deadline_at) - hint가 None이면 힌트가 없거나 만료됨
+        """
+        conn = self._connect()
+        conn.execute("BEGIN")  # 힌트 상태와 조각을 같은 시점 기준으로 읽음
+        try:
+            row = conn.execute(
+                "SELECT status, text, source, deadline_at, updated_at FROM hints WHERE token = ?", (token,)
+            ).fetchone()
+            chunks = [
+                text
+                for (text,) in conn.execute("SELECT text FROM hint_chunks WHERE token = ? ORDER BY seq", (token,))
+            ]
+        finally:
+            conn.execute("COMMIT")
+        if row is None or row[4] < time.time() - self.ttl:
+            return [], None, None
+        status, text, source, deadline_at, _ = row
+        if status == "pending" and time.time() >= deadline_at:
+            with self._transaction() as conn:
+                self._settle_overdue(conn, token)
+            return self._load(token, after)
+        hint = {
+            "token": token,
+            "status": status,
+            # 생성 중이면 지금까지 받은 텍스트, 확정되면 최종 힌트
+            "hint": text if status == "done" else "".join(chunks),
+            "source": source,
+        }
+        return chunks[after:], hint, deadline_at
+
+    def get(self, token):
+        """힌트 상태를 반환합니다. 없거나 만료되었으면 None"""
+        with self._cond:
+            return self._load(token)[1]
+
+    def wait_chunks(self, token, after, timeout):
+        """
+        after번째 이후의 조각이 생기거나 힌트가 확정될 때까지 최대 timeout초 기다립니다.
+        기다리는 동안 마감 시간이 지나면 기본 힌트로 확정합니다.
+
+        Returns:
+            tuple: (chunks, hint) - hint가 None이면 힌트가 없거나 만료됨
+        """
+        wait_until = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                chunks, hint, deadline_at = self._load(token, after)
+                if hint is None:
+                    return [], None
+                now = time.monotonic()
+                if chunks or hint["status"] != "pending" or now >= wait_until:
+                    return chunks, hint
+                until_deadline = max(0.0, deadline_at - time.time())
+                self._cond.wait(min(wait_until - now, until_deadline, self.poll_interval))
+
+    def stats(self):
+        """저장된 힌트의 상태/출처별 수를 반환합니다. (모든 워커)"""
+        with self._cond:
+            conn = self._connect()
+            size = conn.execute("SELECT COUNT(*) FROM hints").fetchone()[0]
+            pending = conn.execute("SELECT COUNT(*) FROM hints WHERE status = 'pending'").fetchone()[0]
+            sources = dict(conn.execute("SELECT source, COUNT(*) FROM hints GROUP BY source").fetchall())
+            return {
+                "size": size,
+                "max_size": self.max_hints,
+                "ttl": self.ttl,
+                "deadline": self.deadline,
+                "pending": pending,
+                **{source: sources.get(source, 0) for source in ("llm", "cache", "pack", "fallback")},
+            }
+
+
+# ✅ 서버 시작 시 저장소와 힌트 생성 스레드 풀 생성
+# (DB 연결은 첫 사용 시 프로세스별로 열리고, 스레드는 첫 요청 때 생성되므로 fork 후에도 안전)
+hint_store = HintStore(HINT_STORE_FILE, HINT_STORE_SIZE, HINT_TTL, HINT_DEADLINE)
+hint_executor = ThreadPoolExecutor(max_workers=HINT_WORKERS, thread_name_prefix="llm-hint")
+
+
+# 같은 힌트 캐시 키로 생성 중인 토큰 (같은 프로세스의 동시 요청은 같은 토큰을 받음)
+inflight_tokens = {}
+inflight_lock = threading.Lock()
+
+
+def submit_hint(answer, messages, on_done=None, cache_key=None):
+    """
+    LLM 힌트 생성을 백그라운드에서 시작하고 바로 토큰을 반환합니다.
+
+    Args:
+        answer (str): 정답 (기본 힌트 생성용)
+        messages (list): build_blip_messages / build_clip_messages의 반환값
+        on_done (callable, optional): 힌트가 마감 전에 완성되면 on_done(hint)를 호출 (결과 캐시 저장용)
+        cache_key (str, optional): 힌트 캐시 키 - 변형이 다 모였으면 LLM 호출 없이 바로 확정
+
+    Returns:
+        str: 힌트 토큰 (/api/hints/<token>으로 조회)
+    """
+    packed = pack_hint(cache_key) if cache_key is not None else None
+    if packed is not None:
+        # 미리 생성해 둔 힌트 팩에 있는 시그니처
+        token = hint_store.create(answer)
+        hint_store.finish(token, packed, "pack")
+        return token
+
+    cacheable = cache_key is not None and hint_cache.variants > 0
+    variants = []
+    if cacheable:
+        cached, variants = hint_cache.lookup(cache_key)
+        if cached is not None:
+            token = hint_store.create(answer)
+            hint_store.finish(token, cached, "cache")
+            if on_done is not None:
+                on_done(cached)
+            return token
+
+        with inflight_lock:
+            token = inflight_tokens.get(cache_key)
+            pending = hint_store.get(token) if token else None
+            if pending is not None and pending["status"] == "pending":
+                hint_cache.record_coalesced()
+                return token
+            # 모아 둔 변형이 있으면 마감/오류 시 기본 템플릿 대신 사용
+            token = hint_store.create(answer, random.choice(variants) if variants else None)
+            inflight_tokens[cache_key] = token
+    else:
+        token = hint_store.create(answer)
+
+    def run():
+        chunks = []
+        streaming = True  # 아직 토큰으로 조각을 보내는 중 (마감/만료되면 False)
+        try:
+            for delta in stream_hint(messages):
+                chunks.append(delta)
+                if streaming and not hint_store.append(token, delta):
+                    # 마감되어 기본 힌트로 확정됨 - 캐시에 저장할 수 있으면 끝까지 받아 다음 요청에 사용
+                    streaming = False
+                    if not cacheable:
+                        return
+            hint = "".join(chunks).strip()
+            if not hint:
+                raise ValueError("빈 힌트가 생성되었습니다.")
+        except Exception as e:
+            print(f"❌ 비동기 힌트 생성 오류 ({token}): {e}")
+            hint_store.finish(token, random.choice(variants) if variants else fallback_hint(answer), "fallback")
+            return
+        finally:
+            if cache_key is not None:
+                with inflight_lock:
+                    if inflight_tokens.get(cache_key) == token:
+                        del inflight_tokens[cache_key]
+
+        if cacheable:
+            hint_cache.add_variant(cache_key, hint)  # 마감이 지났어도 다음 요청을 위해 저장
+        if hint_store.finish(token, hint, "llm"):
+            print("✅ LLM 힌트 생성 성공 (비동기)")
+            if on_done is not None:
+                on_done(hint)
+
+    hint_executor.submit(run)
+    return token
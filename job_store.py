@@ -0,0 +1,290 @@
+# job_store.py
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# ======================================
+# ✅ 설정
+# ======================================
+# 작업 상태/이벤트를 보관하는 SQLite 파일 (gunicorn 워커가 모두 같은 파일을 봄)
+JOB_STORE_FILE = os.getenv("JOB_STORE_FILE", os.path.join(PROJECT_ROOT, "data", "job_store.sqlite3"))
+# 보관할 최대 완료 작업 수와 완료 후 보관 시간(초) - 대기/실행 중인 작업은 제거하지 않음
+JOB_STORE_SIZE = int(os.getenv("JOB_STORE_SIZE", "500"))
+JOB_TTL = float(os.getenv("JOB_TTL", "600"))
+# 미션 작업을 실행할 백그라운드 스레드 수 (워커 프로세스당)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# 동시에 대기/실행할 수 있는 최대 작업 수 (워커 프로세스당, 작업마다 업로드 바이트를 메모리에 보관하므로 제한)
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", "32"))
+# 대기열이 가득 찼을 때 클라이언트에 알려 줄 재시도 대기 시간(초)
+JOB_RETRY_AFTER = int(os.getenv("JOB_RETRY_AFTER", "5"))
+# 다른 워커가 실행 중인 작업의 새 이벤트를 확인하는 간격(초)
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.2"))
+
+
+class JobQueueFullError(Exception):
+    """대기/실행 중인 작업이 JOB_QUEUE_LIMIT개에 이르러 새 작업을 받을 수 없을 때"""
+
+
+def pid_alive(pid):
+    """같은 호스트에서 pid 프로세스가 살아 있는지 확인합니다. (확인할 수 없으면 True)"""
+    if os.name == "nt":
+        return True  # Windows의 os.kill은 프로세스를 종료시키므로 확인하지 않음
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # 권한 없음 등 - 살아 있는 것으로 간주
+    return True
+
+
+class JobStore:
+    """
+    비동기 미션 작업의 상태와 진행 이벤트를 SQLite 파일에 보관하는 크기 제한 + 만료 저장소.
+    작업은 요청을 받은 워커 프로세스에서 실행되지만, 상태 조회와 SSE 구독은 어느 워커에서나 할 수 있습니다.
+    같은 프로세스의 이벤트는 대기 중인 스트림을 바로 깨우고, 다른 프로세스의 이벤트는 poll_interval마다 확인합니다.
+    """
+
+    def __init__(self, path, max_jobs, ttl, queue_limit, poll_interval=JOB_POLL_INTERVAL):
+        self.path = path
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self.queue_limit = queue_limit
+        self.poll_interval = poll_interval
+        self.pending = 0  # 이 프로세스에서 대기/실행 중인 작업 수
+        self.rejected = 0
+        self._conn = None
+        self._conn_pid = None
+        self._cond = threading.Condition()
+
+    def _connect(self):
+        """프로세스마다 연결을 한 번 엽니다. (fork 전에 연 연결은 재사용하지 않음, _cond 보유 상태에서 호출)"""
+        if self._conn is None or self._conn_pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")  # 여러 워커 프로세스가 동시에 읽고 쓰기
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, mission_type TEXT, status TEXT NOT NULL, result TEXT,"
+                " http_status INTEGER, owner_pid INTEGER NOT NULL, finished_at REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_events ("
+                " job_id TEXT NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,"
+                " seq INTEGER NOT NULL, event TEXT NOT NULL, PRIMARY KEY (job_id, seq))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at)")
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    @contextmanager
+    def _transaction(self):
+        """쓰기 트랜잭션 (_cond 보유 상태에서 호출)"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")  # 다른 워커의 쓰기와 겹치지 않도록
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _expire(self, conn):
+        """
+        완료 후 ttl이 지난 작업과 크기를 넘는 오래된 완료 작업을 제거합니다. (트랜잭션 안에서 호출)
+        대기/실행 중인 작업은 결과를 기다리는 클라이언트가 있으므로 제거하지 않습니다.
+        """
+        conn.execute("DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (time.time() - self.ttl,))
+        overflow = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] - self.max_jobs
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM jobs WHERE id IN"
+                " (SELECT id FROM jobs WHERE finished_at IS NOT NULL ORDER BY finished_at LIMIT ?)",
+                (overflow,),
+            )
+
+    def _load(self, job_id, after=0):
+        """
+        작업 상태와 seq가 after보다 큰 이벤트를 읽습니다. (_cond 보유 상태에서 호출)
+        실행하던 워커 프로세스가 종료된 작업은 오류로 확정합니다.
+
+        Returns:
+            tuple: (events, job) - job이 None이면 작업이 없거나 만료됨
+        """
+        conn = self._connect()
+        conn.execute("BEGIN")  # 작업 상태와 이벤트를 같은 시점 기준으로 읽음
+        try:
+            row = conn.execute(
+                "SELECT id, mission_type, status, result, http_status, owner_pid, finished_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+            events = [
+                json.loads(event)
+                for (event,) in conn.execute(
+                    "SELECT event FROM job_events WHERE job_id = ? AND seq > ? ORDER BY seq", (job_id, after)
+                )
+            ]
+        finally:
+            conn.execute("COMMIT")
+        if row is None or (row[6] is not None and row[6] < time.time() - self.ttl):
+            return [], None
+        if row[6] is None and row[5] != os.getpid() and not pid_alive(row[5]):
+            result = {"error": "작업을 실행하던 서버 프로세스가 종료되었습니다. 다시 시도해주세요."}
+            self._finish_row(job_id, result, 500)
+            return self._load(job_id, after)
+        job = {
+            "id": row[0],
+            "mission_type": row[1],
+            "status": row[2],
+            "result": json.loads(row[3]) if row[3] is not None else None,
+            "http_status": row[4],
+        }
+        return events, job
+
+    def create(self, mission_type):
+        """
+        새 작업을 만들고 ID를 반환합니다.
+
+        Raises:
+            JobQueueFullError: 이 프로세스에서 대기/실행 중인 작업이 queue_limit개일 때
+        """
+        job_id = uuid.uuid4().hex
+        with self._cond:
+            if self.pending >= self.queue_limit:
+                self.rejected += 1
+                raise JobQueueFullError(f"대기 중인 미션 작업이 {self.pending}개입니다.")
+            with self._transaction() as conn:
+                conn.execute(
+                    "INSERT INTO jobs (id, mission_type, status, owner_pid) VALUES (?, ?, 'queued', ?)",
+                    (job_id, mission_type, os.getpid()),
+                )
+                self._expire(conn)
+            self.pending += 1
+        return job_id
+
+    def _append_event(self, conn, job_id, stage, info):
+        """이벤트를 추가합니다. (트랜잭션 안에서 호출)"""
+        seq = conn.execute("SELECT COUNT(*) FROM job_events WHERE job_id = ?", (job_id,)).fetchone()[0] + 1
+        event = {"seq": seq, "stage": stage, **(info or {})}
+        conn.execute(
+            "INSERT INTO job_events (job_id, seq, event) VALUES (?, ?, ?)",
+            (job_id, seq, json.dumps(event, ensure_ascii=False)),
+        )
+
+    def add_event(self, job_id, stage, info=None):
+        """진행 이벤트를 추가하고 대기 중인 스트림을 깨웁니다. (작업이 이미 만료되었으면 무시)"""
+        with self._cond:
+            with self._transaction() as conn:
+                updated = conn.execute(
+                    "UPDATE jobs SET status = 'running' WHERE id = ? AND status = 'queued'", (job_id,)
+                ).rowcount
+                if not updated and conn.execute("SELECT 1 FROM jobs WHERE id = ?", (job_id,)).fetchone() is None:
+                    return
+                self._append_event(conn, job_id, stage, info)
+            self._cond.notify_all()
+
+    def _finish_row(self, job_id, result, http_status):
+        """아직 끝나지 않은 작업에 결과와 "done" 이벤트를 저장합니다. (_cond 보유 상태에서 호출)"""
+        with self._transaction() as conn:
+            updated = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, http_status = ?, finished_at = ?"
+                " WHERE id = ? AND finished_at IS NULL",
+                (
+                    "done" if http_status < 500 else "error",
+                    json.dumps(result, ensure_ascii=False),
+                    http_status,
+                    time.time(),
+                    job_id,
+                ),
+            ).rowcount
+            if updated:
+                self._append_event(conn, job_id, "done", {"http_status": http_status})
+        self._cond.notify_all()
+
+    def finish(self, job_id, result, http_status=200):
+        """최종 결과를 저장하고 "done" 이벤트를 추가합니다."""
+        with self._cond:
+            self.pending -= 1
+            self._finish_row(job_id, result, http_status)
+
+    def get(self, job_id):
+        """작업 상태(이벤트 포함)를 반환합니다. 없거나 만료되었으면 None"""
+        with self._cond:
+            events, job = self._load(job_id)
+            if job is None:
+                return None
+            job["events"] = events
+            return job
+
+    def wait_events(self, job_id, after, timeout):
+        """
+        seq가 after보다 큰 이벤트가 생길 때까지 최대 timeout초 기다립니다.
+        이미 끝난 작업이면 새 이벤트가 없어도 바로 반환합니다.
+
+        Returns:
+            tuple: (events, job) - job이 None이면 작업이 없거나 만료됨
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                events, job = self._load(job_id, after)
+                if job is None:
+                    return [], None
+                remaining = deadline - time.monotonic()
+                if events or remaining <= 0 or job["status"] in ("done", "error"):
+                    return events, job
+                self._cond.wait(min(remaining, self.poll_interval))
+
+    def stats(self):
+        """저장된 작업 상태별 수(모든 워커)와 이 프로세스의 대기열 상태를 반환합니다."""
+        with self._cond:
+            counts = dict(self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            return {
+                "size": sum(counts.values()),
+                "max_size": self.max_jobs,
+                "ttl": self.ttl,
+                "pending": self.pending,
+                "queue_limit": self.queue_limit,
+                "rejected": self.rejected,
+                **{status: counts.get(status, 0) for status in ("queued", "running", "done", "error")},
+            }
+
+
+# ✅ 서버 시작 시 저장소와 작업 실행 스레드 풀 생성
+# (DB 연결은 첫 사용 시 프로세스별로 열리고, 스레드는 첫 작업 때 생성되므로 fork 후에도 안전)
+job_store = JobStore(JOB_STORE_FILE, JOB_STORE_SIZE, JOB_TTL, JOB_QUEUE_LIMIT)
+job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="mission-job")
+
+
+def submit_job(mission_type, fn):
+    """
+    fn(progress)를 백그라운드에서 실행하는 작업을 만들고 바로 ID를 반환합니다.
+    fn은 (결과 dict, HTTP 상태 코드)를 반환해야 합니다.
+
+    Raises:
+        JobQueueFullError: 대기열이 가득 찼을 때 (실행기에 넣지 않음)
+    """
+    job_id = job_store.create(mission_type)
+
+    def progress(stage, info=None):
+        job_store.add_event(job_id, stage, info)
+
+    def run():
+        try:
+            result, http_status = fn(progress)
+        except Exception as e:
+            print(f"❌ 미션 작업 오류 ({job_id}): {e}")
+            result, http_status = {"error": str(e)}, 500
+        job_store.finish(job_id, result, http_status)
+
+    job_executor.submit(run)
+    return job_id
@@ -1,4 +1,5 @@
 import os
+import sys
 from PIL import Image
 from pillow_heif import register_heif_opener
 from datetime import datetime
@@ -12,27 +13,37 @@ register_heif_opener()
 # metadata.py 파일이 group5_project/metadata/ 안에 있으니까,
 # 상위 폴더(../)로 올라가면 group5_project 루트 폴더가 됨
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+from utils.image_context import ImageContext
+from utils.exif_fast import read_exif_fast, photo_datetime
+
 TEST_IMAGE_DIR = os.path.join(PROJECT_ROOT, "metadata", "test_image")  # 예시 경로
 
 
+def read_exif(source):
+    """
+    파일 경로 또는 ImageContext에서 EXIF를 읽습니다. (픽셀 디코딩 없음)
+    JPEG APP1 / HEIF Exif 항목은 바이트에서 직접 파싱하고, 그 외 포맷만 Pillow로 읽습니다.
+    ImageContext는 한 번 파싱한 결과를 재사용합니다.
+    """
+    if isinstance(source, ImageContext):
+        return source.exif
+    with open(source, "rb") as f:
+        exif = read_exif_fast(f.read())
+    return exif if exif is not None else Image.open(source).getexif()
+
+
 def quick_photo_summary(file_path):
     """
     HEIC/JPEG 파일의 촬영 시각 + GPS 좌표 + BBox 유효성 + 오늘 여부 출력 및 bool 반환
+    (file_path 대신 ImageContext를 넘기면 디스크를 읽지 않음)
     """
     try:
-        img = Image.open(file_path)
-        exif = img.getexif()
-
-        # 날짜
-        date_str = None
-        if exif:
-            from PIL.ExifTags import TAGS
+        exif = read_exif(file_path)
 
-            for tag_id, value in exif.items():
-                tag_name = TAGS.get(tag_id, tag_id)
-                if tag_name in ("DateTimeOriginal", "DateTime"):
-                    date_str = value
-                    break
+        # 날짜 (DateTimeOriginal 우선, 없으면 DateTime)
+        date_str = photo_datetime(exif)
 
         # GPS 추출
         coords = extract_gps_coordinates(file_path)
@@ -51,7 +62,8 @@ def quick_photo_summary(file_path):
 
         # 결과 출력
         print("\n" + "=" * 60)
-        print(f"📸 파일명: {os.path.basename(file_path)}")
+        file_name = file_path.filename if isinstance(file_path, ImageContext) else os.path.basename(file_path)
+        print(f"📸 파일명: {file_name}")
         print(f"🕒 촬영 시각: {date_str if date_str else '(정보 없음)'}")
         print(f"📅 오늘 여부: {'✅ 오늘 촬영' if is_today else '❌ 오늘 아님'}")
         print(f"📍 좌표: {lat:.6f}, {lon:.6f}")
@@ -76,14 +88,13 @@ def quick_photo_summary(file_path):
 
 def extract_gps_coordinates(file_path):
     """
-    HEIC 파일에서 GPS 좌표 추출
+    HEIC 파일에서 GPS 좌표 추출 (파일 경로 또는 ImageContext)
 
     Returns:
         (latitude, longitude) or None
     """
     try:
-        img = Image.open(file_path)
-        exif = img.getexif()
+        exif = read_exif(file_path)
 
         if not exif:
             return None
@@ -6,7 +6,7 @@ from metadata.metadata import quick_photo_summary
 
 def validate_metadata(image_path):
     """
-    사진 메타데이터 유효성 검사
+    사진 메타데이터 유효성 검사 (파일 경로 또는 ImageContext)
     - 촬영일이 오늘인지
     - 지정된 BBox(출판단지) 내부인지
     둘 다 만족해야 True 반환
@@ -1,24 +1,176 @@
 # mission_manager.py
-from models.blip_module import check_with_blip
-from models.clip_module import check_with_clip
-from models.llm_hint_generator import generate_blip_hint, generate_clip_hint
+import os
+
+# ✅ INFERENCE_DAEMON=1이면 모델을 웹 프로세스에 올리지 않고 로컬 추론 데몬(models/inference_daemon.py)에 요청
+USE_INFERENCE_DAEMON = os.getenv("INFERENCE_DAEMON", "0") == "1"
+# ✅ INFERENCE_QUEUE=1이면 동시 요청을 마이크로 배치로 묶어 실행하는 큐를 사용
+USE_INFERENCE_QUEUE = os.getenv("INFERENCE_QUEUE", "0") == "1"
+# ✅ ASYNC_HINTS=1이면 실패 판정을 바로 반환하고 LLM 힌트는 백그라운드에서 생성 (hint_token으로 조회)
+USE_ASYNC_HINTS = os.getenv("ASYNC_HINTS", "0") == "1"
+
+if USE_INFERENCE_DAEMON:
+    from models.inference_daemon import check_with_blip_remote as check_with_blip
+    from models.inference_daemon import blip_hint_questions_remote as blip_hint_questions
+    from models.inference_daemon import check_with_clip_remote as check_with_clip
+    from models.inference_daemon import gate_landmark_remote as gate_landmark
+    from models.inference_daemon import describe_mood_remote as describe_mood
+    from models.inference_daemon import gate_report_remote as gate_report
+else:
+    if USE_INFERENCE_QUEUE:
+        from models.inference_queue import check_with_blip_queued as check_with_blip
+        from models.inference_queue import check_with_clip_queued as check_with_clip
+    else:
+        from models.blip_module import check_with_blip
+        from models.clip_module import check_with_clip
+    from models.blip_module import blip_hint_questions
+    from models.clip_module import describe_mood
+    from models.clip_landmark_gate import gate_landmark, gate_report
+from models.llm_hint_generator import (
+    generate_blip_hint,
+    generate_clip_hint,
+    build_blip_messages,
+    build_clip_messages,
+    blip_hint_key,
+    clip_hint_key,
+)
+from hint_store import submit_hint
 from coupon_manager import give_coupon
+from result_cache import mission_cache, make_cache_key
+from utils.image_context import to_pil
 
 
-def run_mission1(user_image, answer):
+def load_image(user_image):
+    """
+    캐시 키 계산과 모델 추론에 함께 쓸 수 있도록 이미지를 한 번만 디코딩합니다.
+
+    Returns:
+        PIL.Image or None: 디코딩된 RGB 이미지 (실패 시 None)
+    """
+    try:
+        return to_pil(user_image)  # 업로드 컨텍스트는 한 번 디코딩한 결과를 공유
+    except Exception as e:
+        print(f"이미지 디코딩 실패: {e}")
+        return None
+
+
+def report(progress, stage, **info):
+    """진행 상황 콜백이 있으면 단계 이름과 정보를 전달합니다. (비동기 작업 API용)"""
+    if progress is not None:
+        progress(stage, info)
+
+
+def make_hint(mission, answer, failure_info, cache_key=None):
+    """
+    실패 판정에 대한 힌트를 만듭니다.
+    ASYNC_HINTS=1이면 LLM 호출을 기다리지 않고 힌트 토큰만 발급합니다.
+
+    Args:
+        mission (str): "mission1" (BLIP) 또는 "mission2" (CLIP)
+        answer (str): 정답
+        failure_info (list): BLIP 틀린 질문 리스트 또는 CLIP 판정 정보
+        cache_key (str, optional): 비동기 힌트가 완성되면 결과 캐시에 저장할 키
+
+    Returns:
+        tuple: (hint, hint_token, hint_source) - hint와 hint_token 중 하나만 값이 있음
+               hint_source: "pack" / "cache" / "llm" / "fallback" (비동기 힌트면 None)
+    """
+    if not USE_ASYNC_HINTS:
+        generate = generate_blip_hint if mission == "mission1" else generate_clip_hint
+        hint, hint_source = generate(answer, failure_info, with_source=True)
+        return hint, None, hint_source
+
+    if mission == "mission1":
+        messages, hint_key = build_blip_messages(answer, failure_info), blip_hint_key(answer, failure_info)
+    else:
+        messages, hint_key = build_clip_messages(answer, failure_info), clip_hint_key(answer, failure_info)
+    on_done = None
+    if cache_key is not None:
+        # 완성된 힌트만 캐시 (기본 힌트로 마감된 경우 다음 요청에서 다시 생성)
+        on_done = lambda hint: mission_cache.set(cache_key, (False, hint))
+    return None, submit_hint(answer, messages, on_done, hint_key), None
+
+
+def has_inference_error(failure_info):
+    """추론 오류로 "error" 답변이 섞인 판정인지 확인합니다. (일시적인 실패이므로 결과 캐시에 저장하지 않음)"""
+    return any(item.get("model_answer") == "error" for item in failure_info or [])
+
+
+def cache_verdict(cache_key, mission_result, hint, hint_source, failure_info):
+    """
+    동기 경로의 판정과 힌트를 결과 캐시에 저장합니다.
+    기본 힌트(API 키 없음, 서킷 열림, LLM 오류)나 추론 오류가 섞인 판정은 복구 후 다시 계산하도록 저장하지 않습니다.
+    """
+    if hint_source == "fallback" or has_inference_error(failure_info):
+        return
+    mission_cache.set(cache_key, (mission_result, hint))
+
+
+def report_hint(progress, hint_token):
+    """힌트가 준비되었거나(hint_ready) 백그라운드에서 생성 중임(hint_pending)을 알립니다."""
+    if hint_token is None:
+        report(progress, "hint_ready")
+    else:
+        report(progress, "hint_pending", hint_token=hint_token)
+
+
+def run_mission1(user_image, answer, progress=None):
     """
     Mission1 (장소 찾기) 실행 - BLIP으로 장소 인식
 
     Args:
-        user_image (str): 사용자가 업로드한 이미지 파일 경로
+        user_image (str or ImageContext or PIL.Image): 사용자가 업로드한 이미지 파일 경로, 업로드 컨텍스트 또는 PIL Image 객체
         answer (str): Mission1(BLIP)용 정답 랜드마크 이름
+        progress (callable, optional): progress(stage, info) 형태의 진행 상황 콜백
+            stage: "questions" ({"answered", "total"}), "verdict" ({"success"}),
+                   "hint_ready" 또는 "hint_pending" ({"hint_token"})
 
     Returns:
         dict: 미션 결과 정보
             - 성공: {"success": True, "coupon": str}
             - 실패: {"success": False, "hint": str, "message": str}
+                    (ASYNC_HINTS=1이면 hint는 None이고 "hint_token"이 추가됨)
     """
-    mission_result, blip_info = check_with_blip(user_image, answer)
+    image = load_image(user_image)
+    if image is None:
+        # 디코딩 실패 시 캐시 없이 기존 경로로 처리 (check_with_blip이 오류를 보고함)
+        mission_result, blip_info = check_with_blip(user_image, answer)
+        report(progress, "verdict", success=mission_result)
+        hint, hint_token, _ = (None, None, None) if mission_result else make_hint("mission1", answer, blip_info)
+    else:
+        cache_key = make_cache_key(image, "mission1", answer)
+        cached = mission_cache.get(cache_key)
+        if cached is not None:
+            print("⚡ 미션 결과 캐시 적중 (mission1)")
+            mission_result, hint = cached
+            hint_token = None
+            report(progress, "verdict", success=mission_result)
+        else:
+            # 참조 사진과 명백히 다른 사진은 전체 BLIP 질문 없이 바로 실패 처리
+            passed, _ = gate_landmark(image, answer)
+            if passed:
+                mission_result, blip_info = check_with_blip(
+                    image,
+                    answer,
+                    progress=lambda answered, total: report(
+                        progress, "questions", answered=answered, total=total
+                    ),
+                )
+                report(progress, "verdict", success=mission_result)
+            else:
+                # 판정은 실패로 먼저 알리고, 힌트용으로 변별력 상위 질문 몇 개만 물어 틀린 질문을 모음
+                mission_result = False
+                report(progress, "verdict", success=mission_result)
+                blip_info = blip_hint_questions(image, answer)
+            if has_inference_error(blip_info):
+                cache_key = None  # 비동기 힌트가 완성되어도 저장하지 않음
+            hint, hint_token, hint_source = (
+                (None, None, None) if mission_result else make_hint("mission1", answer, blip_info, cache_key)
+            )
+            if hint_token is None and cache_key is not None:
+                cache_verdict(cache_key, mission_result, hint, hint_source, blip_info)
+
+    if not mission_result:
+        report_hint(progress, hint_token)
 
     if mission_result:
         # 성공 - 쿠폰 발급
@@ -28,30 +180,60 @@ def run_mission1(user_image, answer):
             "coupon": coupon,
         }
     else:
-        # 실패 - 힌트 생성
+        # 실패 - 힌트 반환
         status_msg = "장소를 다시 찾아보세요!"
-        hint = generate_blip_hint(answer, blip_info)
-        return {
+        result = {
             "success": False,
             "hint": hint,
             "message": status_msg,
         }
+        if hint_token is not None:
+            # 비동기 힌트: hint는 None, /api/hints/<hint_token>으로 조회
+            result["hint_token"] = hint_token
+        return result
 
 
-def run_mission2(user_image, answer):
+def run_mission2(user_image, answer, progress=None):
     """
     Mission2 (사진 촬영) 실행 - CLIP으로 감정 분석
 
     Args:
-        user_image (str): 사용자가 업로드한 이미지 파일 경로
+        user_image (str or ImageContext or PIL.Image): 사용자가 업로드한 이미지 파일 경로, 업로드 컨텍스트 또는 PIL Image 객체
         answer (str): Mission2(CLIP)용 정답 감정/분위기 키워드
+        progress (callable, optional): progress(stage, info) 형태의 진행 상황 콜백
+            stage: "verdict" ({"success"}),
+                   "hint_ready" 또는 "hint_pending" ({"hint_token"})
 
     Returns:
         dict: 미션 결과 정보
             - 성공: {"success": True, "coupon": str}
             - 실패: {"success": False, "hint": str, "message": str}
+                    (ASYNC_HINTS=1이면 hint는 None이고 "hint_token"이 추가됨)
     """
-    mission_result, clip_info = check_with_clip(user_image, answer)
+    image = load_image(user_image)
+    if image is None:
+        mission_result, clip_info = check_with_clip(user_image, answer)
+        report(progress, "verdict", success=mission_result)
+        hint, hint_token, _ = (None, None, None) if mission_result else make_hint("mission2", answer, clip_info)
+    else:
+        cache_key = make_cache_key(image, "mission2", answer)
+        cached = mission_cache.get(cache_key)
+        if cached is not None:
+            print("⚡ 미션 결과 캐시 적중 (mission2)")
+            mission_result, hint = cached
+            hint_token = None
+            report(progress, "verdict", success=mission_result)
+        else:
+            mission_result, clip_info = check_with_clip(image, answer)
+            report(progress, "verdict", success=mission_result)
+            hint, hint_token, hint_source = (
+                (None, None, None) if mission_result else make_hint("mission2", answer, clip_info, cache_key)
+            )
+            if hint_token is None:
+                cache_verdict(cache_key, mission_result, hint, hint_source, clip_info)
+
+    if not mission_result:
+        report_hint(progress, hint_token)
 
     if mission_result:
         # 성공 - 쿠폰 발급
@@ -62,11 +244,14 @@ def run_mission2(user_image, answer):
             "message": "감정 분석 미션 성공!",
         }
     else:
-        # 실패 - 힌트 생성
+        # 실패 - 힌트 반환
         status_msg = "감정이 담긴 사진을 다시 찍어보세요!"
-        hint = generate_clip_hint(answer, clip_info)
-        return {
+        result = {
             "success": False,
             "hint": hint,
             "message": status_msg,
-        }
\ No newline at end of file
+        }
+        if hint_token is not None:
+            # 비동기 힌트: hint는 None, /api/hints/<hint_token>으로 조회
+            result["hint_token"] = hint_token
+        return result
@@ -1,9 +1,12 @@
 # /models/blip_module.py
 
 import os
+import sys
 import json
+import math
+import time
+import threading
 import torch
-from PIL import Image
 from transformers import BlipProcessor, BlipForQuestionAnswering
 
 
@@ -17,12 +20,41 @@ MODEL_NAME = "Salesforce/blip-vqa-base"
 # --- 랜드마크별 Q&A JSON 파일 경로 ---
 MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROJECT_ROOT = os.path.dirname(MODULE_DIR)
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+from utils.image_context import to_pil
+
 DATA_DIR = os.path.join(PROJECT_ROOT, "data")
 LANDMARK_QA_FILE = os.path.join(DATA_DIR, "landmark_qa_labeled_updated.json")
 
+# --- 랜드마크별 질문 순서 (참고 사진 기준 변별력 순, tests/build_question_order.py로 생성) ---
+QUESTION_ORDER_FILE = os.path.join(DATA_DIR, "landmark_question_order.json")
+
 # --- 미션 성공 기준 (75%) ---
 SUCCESS_THRESHOLD = 0.75
 
+# --- 한 번의 generate 호출에 묶을 질문 수 (메모리 ↔ 지연시간 트레이드오프) ---
+# 1이면 기존처럼 질문마다 한 번씩 generate를 호출합니다.
+VQA_BATCH_SIZE = int(os.getenv("BLIP_VQA_BATCH_SIZE", "16"))
+
+# --- VQA 채점 방식 ---
+# "generate": 자유 생성(max_new_tokens=10) 후 문자열 비교 (기존 방식)
+# "score": 디코더를 한 스텝만 실행해 "yes"/"no" 토큰 로짓을 비교
+VQA_MODE = os.getenv("BLIP_VQA_MODE", "generate")
+
+# --- soft-score 성공 기준 ("score" 모드 전용) ---
+# 질문별 기대 답변 확률의 평균이 이 값 이상이면 성공으로 판정합니다.
+USE_SOFT_SCORE = os.getenv("BLIP_USE_SOFT_SCORE", "0") == "1"
+SOFT_SUCCESS_THRESHOLD = float(os.getenv("BLIP_SOFT_SUCCESS_THRESHOLD", "0.75"))
+
+# --- 조기 종료 (early exit) ---
+# 성공이 확정되거나 더 이상 성공할 수 없게 되면 남은 질문을 건너뜁니다.
+# 판정 시점을 촘촘하게 잡기 위해 조기 종료 시에는 작은 배치로 질문합니다.
+USE_EARLY_EXIT = os.getenv("BLIP_EARLY_EXIT", "0") == "1"
+EARLY_EXIT_BATCH_SIZE = int(os.getenv("BLIP_EARLY_EXIT_BATCH_SIZE", "4"))
+# CLIP 게이트에서 걸러진 사진의 힌트용으로 물어볼 변별력 상위 질문 수 (판정에는 쓰지 않음)
+GATE_HINT_QUESTIONS = int(os.getenv("BLIP_GATE_HINT_QUESTIONS", "8"))
+
 
 # =====================================
 # 모델 및 데이터 전역 로드 (성능 최적화)
@@ -70,9 +102,427 @@ def load_landmark_qa():
         return {}
 
 
+def load_question_order():
+    """
+    랜드마크별 질문 순서를 로드합니다. (변별력이 높은 질문이 앞쪽)
+    파일이 없으면 빈 dict를 반환하며, 이 경우 JSON에 정의된 순서를 그대로 사용합니다.
+    """
+    try:
+        with open(QUESTION_ORDER_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+            print(f"Question order loaded from '{QUESTION_ORDER_FILE}'.")
+            return {
+                landmark: [item["question"] for item in items]
+                for landmark, items in data.get("landmarks", {}).items()
+            }
+    except FileNotFoundError:
+        return {}
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        print(f"Warning: Failed to load question order from '{QUESTION_ORDER_FILE}': {e}")
+        return {}
+
+
+def build_question_index(qa_data):
+    """
+    모든 랜드마크의 질문을 중복 없이 모은 인덱스를 만듭니다.
+    "no" 질문 대부분이 다른 랜드마크의 "yes" 질문이므로 중복이 많습니다.
+
+    Returns:
+        tuple: (unique_questions, landmark_index)
+               unique_questions (list): 중복 제거된 질문 문자열 리스트
+               landmark_index (dict): {랜드마크: [(질문 인덱스, 기대 답변), ...]}
+    """
+    unique_questions = []
+    position = {}
+    landmark_index = {}
+
+    for landmark, qa_pairs in qa_data.items():
+        entries = []
+        for question, expected_answer in qa_pairs:
+            if question not in position:
+                position[question] = len(unique_questions)
+                unique_questions.append(question)
+            entries.append((position[question], expected_answer))
+        landmark_index[landmark] = entries
+
+    return unique_questions, landmark_index
+
+
+def compile_questions(questions):
+    """
+    질문 리스트를 한 번만 토크나이즈하여 DEVICE에 올려 둡니다.
+    요청 처리 중에는 tokenizer를 호출하지 않고 이 텐서에서 행을 골라 씁니다.
+
+    Returns:
+        dict: {"input_ids", "attention_mask", "lengths", "rows"}
+              rows (dict): {질문 문자열: 행 번호}
+    """
+    encoded = processor(text=questions, padding=True, return_tensors="pt")
+    return {
+        "input_ids": encoded.input_ids.to(DEVICE),
+        "attention_mask": encoded.attention_mask.to(DEVICE),
+        "lengths": encoded.attention_mask.sum(dim=1).tolist(),
+        "rows": {question: i for i, question in enumerate(questions)},
+    }
+
+
+def compile_question_tensors(qa_data, unique_questions):
+    """
+    랜드마크별 질문과 중복 제거된 전체 질문을 미리 토크나이즈합니다.
+
+    Returns:
+        tuple: (landmark_tensors, unique_tensors)
+               landmark_tensors (dict): {랜드마크: compile_questions() 결과}
+               unique_tensors (dict): unique_questions의 compile_questions() 결과
+    """
+    if not processor:
+        return {}, None
+
+    landmark_tensors = {
+        landmark: compile_questions([question for question, _ in qa_pairs])
+        for landmark, qa_pairs in qa_data.items()
+        if qa_pairs
+    }
+    unique_tensors = compile_questions(unique_questions) if unique_questions else None
+    return landmark_tensors, unique_tensors
+
+
+def load_today_landmark():
+    """current_answer.json에 저장된 오늘의 Mission1 정답 랜드마크를 읽습니다. (없으면 None)"""
+    try:
+        with open(os.path.join(DATA_DIR, "current_answer.json"), "r", encoding="utf-8") as f:
+            state = json.load(f)
+        return state.get("answer1") or state.get("answer")
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
 # --- 모델과 데이터 로드 ---
 processor, model = load_model()
 landmark_qa_data = load_landmark_qa()
+question_order = load_question_order()
+unique_questions, landmark_question_index = build_question_index(landmark_qa_data)
+
+# --- 질문 텐서 사전 컴파일 (요청 처리 중 tokenizer 호출 없음) ---
+question_tensors, unique_question_tensors = compile_question_tensors(
+    landmark_qa_data, unique_questions
+)
+today_landmark = load_today_landmark()
+if today_landmark in question_tensors:
+    print(f"Question tensors compiled for {len(question_tensors)} landmarks (today: '{today_landmark}').")
+
+# --- "score" 모드에서 비교할 답변 토큰 ID ---
+YES_TOKEN_ID = processor.tokenizer.convert_tokens_to_ids("yes") if processor else None
+NO_TOKEN_ID = processor.tokenizer.convert_tokens_to_ids("no") if processor else None
+
+
+# =====================================
+# VQA 단계별 실행 (비전 인코더 1회 + 질문 배치)
+# =====================================
+# model.generate()는 호출할 때마다 비전 인코더(ViT)를 다시 실행하므로,
+# 이미지 임베딩을 한 번만 계산해 두고 텍스트 인코더/디코더에 재사용합니다.
+
+# --- 가장 최근 check_with_blip 호출의 단계별 소요 시간 (초) ---
+last_stage_timings = {}
+
+
+def encode_image(pixel_values):
+    """
+    비전 인코더를 한 번 실행하여 이미지 임베딩을 계산합니다.
+
+    Args:
+        pixel_values (torch.Tensor): processor로 변환한 이미지 텐서 (1, C, H, W)
+
+    Returns:
+        torch.Tensor: 이미지 임베딩 (1, num_patches, hidden_size)
+    """
+    with torch.inference_mode():
+        return model.vision_model(pixel_values=pixel_values)[0]
+
+
+def encode_questions(image_embeds, input_ids, attention_mask):
+    """
+    질문 배치를 이미지 임베딩과 함께 텍스트 인코더에 통과시킵니다.
+
+    Returns:
+        torch.Tensor: 질문 임베딩 (batch, seq_len, hidden_size)
+    """
+    # 같은 이미지 임베딩을 질문 수만큼 복제 (expand는 메모리를 새로 할당하지 않음)
+    batch_image_embeds = image_embeds.expand(input_ids.size(0), -1, -1)
+    image_attention_mask = torch.ones(
+        batch_image_embeds.size()[:-1], dtype=torch.long, device=batch_image_embeds.device
+    )
+
+    with torch.inference_mode():
+        return model.text_encoder(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            encoder_hidden_states=batch_image_embeds,
+            encoder_attention_mask=image_attention_mask,
+            return_dict=False,
+        )[0]
+
+
+def generate_answers(question_embeds, attention_mask):
+    """
+    질문 임베딩으로부터 답변 토큰을 생성합니다.
+    패딩 위치는 attention_mask로 가려 배치 크기와 관계없이 같은 답을 얻습니다.
+
+    Returns:
+        torch.Tensor: 생성된 토큰 ID (batch, generated_len)
+    """
+    bos_ids = torch.full(
+        (question_embeds.size(0), 1),
+        fill_value=model.decoder_start_token_id,
+        device=question_embeds.device,
+    )
+
+    with torch.inference_mode():
+        return model.text_decoder.generate(
+            input_ids=bos_ids,
+            eos_token_id=model.config.text_config.sep_token_id,
+            pad_token_id=model.config.text_config.pad_token_id,
+            encoder_hidden_states=question_embeds,
+            encoder_attention_mask=attention_mask,
+            max_new_tokens=10,
+        )
+
+
+def score_yes_no(question_embeds, attention_mask):
+    """
+    디코더를 한 스텝만 실행하여 첫 답변 토큰의 "yes"/"no" 로짓을 비교합니다.
+    자동회귀 디코딩 루프와 tokenizer decode가 필요 없습니다.
+
+    Returns:
+        torch.Tensor: 질문별 로짓 차이 (yes - no). 양수면 "yes", 음수면 "no"
+    """
+    bos_ids = torch.full(
+        (question_embeds.size(0), 1),
+        fill_value=model.decoder_start_token_id,
+        device=question_embeds.device,
+    )
+
+    with torch.inference_mode():
+        logits = model.text_decoder(
+            input_ids=bos_ids,
+            encoder_hidden_states=question_embeds,
+            encoder_attention_mask=attention_mask,
+            return_dict=True,
+        ).logits[:, -1, :]
+
+    return (logits[:, YES_TOKEN_ID] - logits[:, NO_TOKEN_ID]).float()
+
+
+def answer_tokenized(image_embeds, input_ids, attention_mask, mode="generate"):
+    """
+    미리 계산한 이미지 임베딩에 대해 토크나이즈된 질문 배치를 한 번에 답변합니다.
+
+    Args:
+        image_embeds (torch.Tensor): encode_image()가 반환한 이미지 임베딩
+        input_ids (torch.Tensor): 패딩된 질문 토큰 ID (batch, seq_len)
+        attention_mask (torch.Tensor): 패딩 마스크 (batch, seq_len)
+        mode (str): "generate" (자유 생성) 또는 "score" (yes/no 로짓 비교)
+
+    Returns:
+        tuple: (answers, margins)
+               answers (list): 질문 순서대로 정리된 모델 답변 (소문자, 공백 제거)
+               margins (list): 질문별 yes-no 로짓 차이 ("generate" 모드에서는 None)
+    """
+    question_embeds = encode_questions(image_embeds, input_ids, attention_mask)
+
+    if mode == "score":
+        margins = score_yes_no(question_embeds, attention_mask).tolist()
+        answers = ["yes" if margin > 0 else "no" for margin in margins]
+        return answers, margins
+
+    out = generate_answers(question_embeds, attention_mask)
+
+    answers = processor.batch_decode(out, skip_special_tokens=True)
+    return [answer.strip().lower() for answer in answers], None
+
+
+def answer_questions(image_embeds, questions, mode="generate"):
+    """
+    질문 문자열을 토크나이즈한 뒤 answer_tokenized()로 한 번에 답변합니다.
+    미리 컴파일된 질문 텐서가 없는 질문(오프라인 스크립트 등)에 사용합니다.
+
+    Returns:
+        tuple: (answers, margins) - answer_tokenized()와 동일
+    """
+    inputs = processor(text=questions, padding=True, return_tensors="pt").to(DEVICE)
+    return answer_tokenized(image_embeds, inputs.input_ids, inputs.attention_mask, mode)
+
+
+def select_question_rows(compiled, rows):
+    """
+    컴파일된 질문 텐서에서 일부 행만 골라 배치를 만듭니다.
+    (오른쪽 패딩이므로 배치 내 최대 길이까지만 잘라 불필요한 패딩 연산을 줄임)
+
+    Returns:
+        tuple: (input_ids, attention_mask)
+    """
+    length = max(compiled["lengths"][row] for row in rows)
+    index = torch.tensor(rows, device=compiled["input_ids"].device)
+    return (
+        compiled["input_ids"].index_select(0, index)[:, :length],
+        compiled["attention_mask"].index_select(0, index)[:, :length],
+    )
+
+
+def load_image_embeds(user_image_path, stage_timings=None):
+    """
+    이미지를 로드하고 비전 인코더를 한 번 실행합니다.
+
+    Args:
+        user_image_path (str or ImageContext or PIL.Image): 이미지 파일 경로, 업로드 컨텍스트 또는 PIL Image 객체
+        stage_timings (dict, optional): 단계별 소요 시간을 기록할 dict
+
+    Returns:
+        torch.Tensor or None: 이미지 임베딩 (실패 시 None)
+    """
+    try:
+        raw_image = to_pil(user_image_path)  # 이미 디코딩된 경우 그대로 사용
+    except FileNotFoundError:
+        print(f"Error: User image not found at '{user_image_path}'.")
+        return None
+    except Exception as e:
+        print(f"Error loading image '{user_image_path}': {e}")
+        return None
+
+    if stage_timings is None:
+        stage_timings = {"preprocess": 0.0, "vision_encoder": 0.0, "vision_encoder_calls": 0}
+
+    try:
+        stage_start = time.perf_counter()
+        pixel_values = processor(images=raw_image, return_tensors="pt").pixel_values.to(
+            DEVICE
+        )
+        stage_timings["preprocess"] = time.perf_counter() - stage_start
+
+        # 비전 인코더는 업로드 1건당 한 번만 실행
+        stage_start = time.perf_counter()
+        image_embeds = encode_image(pixel_values)
+        stage_timings["vision_encoder"] = time.perf_counter() - stage_start
+        stage_timings["vision_encoder_calls"] += 1
+    except Exception as e:
+        print(f"Error processing image with BLIP: {e}")
+        return None
+
+    return image_embeds
+
+
+# =====================================
+# 조기 종료용 질문 순서 및 통계
+# =====================================
+
+# --- 조기 종료 누적 통계 (early_exit_report()로 확인) ---
+early_exit_stats = {"requests": 0, "questions_asked": 0, "questions_total": 0}
+stats_lock = threading.Lock()  # 요청 스레드/작업 스레드 풀에서 동시에 갱신
+
+
+def ordered_questions(landmark_name, question_list):
+    """
+    질문 리스트를 참고 사진에서 측정한 변별력 순으로 정렬합니다.
+    순서 파일에 없는 질문은 원래 순서대로 뒤에 붙입니다.
+    """
+    order = question_order.get(landmark_name)
+    if not order:
+        return list(question_list)
+
+    rank = {question: i for i, question in enumerate(order)}
+    return sorted(question_list, key=lambda item: rank.get(item[0], len(rank)))
+
+
+def early_exit_report():
+    """조기 종료로 절약한 질문 수를 요약합니다."""
+    with stats_lock:
+        requests = early_exit_stats["requests"]
+        asked = early_exit_stats["questions_asked"]
+        total = early_exit_stats["questions_total"]
+    if requests == 0:
+        return {"requests": 0, "avg_questions_asked": 0.0, "avg_questions_saved": 0.0, "saved_ratio": 0.0}
+
+    return {
+        "requests": requests,
+        "avg_questions_asked": asked / requests,
+        "avg_questions_saved": (total - asked) / requests,
+        "saved_ratio": (total - asked) / total,
+    }
+
+
+# =====================================
+# 답변 집계 및 성공 판정
+# =====================================
+
+
+def new_tally():
+    """질문별 답변을 누적할 집계 dict를 만듭니다."""
+    return {
+        "correct_count": 0,
+        "expected_prob_sum": 0.0,  # soft-score용 기대 답변 확률 합계
+        "incorrect_questions_list": [],  # 오답 목록 저장용
+    }
+
+
+def tally_answers(tally, batch, model_answers, margins):
+    """
+    질문 배치의 모델 답변을 기대 답변과 비교해 집계에 더합니다.
+
+    Args:
+        tally (dict): new_tally()로 만든 집계 dict
+        batch (list): [[질문, 기대 답변], ...]
+        model_answers (list): 질문 순서대로 정리된 모델 답변
+        margins (list or None): 질문별 yes-no 로짓 차이 ("score" 모드)
+    """
+    if margins is None:
+        margins = [None] * len(batch)
+
+    for (question, expected_answer), model_answer, margin in zip(batch, model_answers, margins):
+        # 기대 답변에 대한 확률 (yes/no 로짓 차이의 시그모이드)
+        expected_prob = None
+        if margin is not None:
+            signed_margin = margin if expected_answer == "yes" else -margin
+            expected_prob = 1.0 / (1.0 + math.exp(-signed_margin))
+            tally["expected_prob_sum"] += expected_prob
+
+        if model_answer == expected_answer:
+            tally["correct_count"] += 1
+        else:
+            # 답변이 틀렸을 경우, 상세 정보와 함께 힌트 목록에 추가
+            incorrect_item = {
+                "question": question,
+                "model_answer": model_answer,
+                "expected_answer": expected_answer
+            }
+            if expected_prob is not None:
+                # 모델이 틀린 답에 얼마나 확신했는지 (0.5 ~ 1.0)
+                incorrect_item["confidence"] = round(1.0 - expected_prob, 3)
+            tally["incorrect_questions_list"].append(incorrect_item)
+
+
+def judge_tally(tally, total_questions, soft_score):
+    """
+    집계 결과로 최종 성공 여부를 판정합니다.
+
+    Returns:
+        tuple: (is_success, hint_payload) - 성공 시에는 빈 힌트 페이로드
+    """
+    correct_count = tally["correct_count"]
+    accuracy = correct_count / total_questions
+    if soft_score:
+        soft_accuracy = tally["expected_prob_sum"] / total_questions
+        is_success = soft_accuracy >= SOFT_SUCCESS_THRESHOLD
+        print(f"VQA Soft Score: {soft_accuracy:.2%} (threshold {SOFT_SUCCESS_THRESHOLD:.0%})")
+    else:
+        is_success = accuracy >= SUCCESS_THRESHOLD
+
+    print(f"VQA Result: {correct_count}/{total_questions} correct answers ({accuracy:.2%}). Success: {is_success}")
+
+    if is_success:
+        return True, [] # 성공 시에는 빈 힌트 페이로드 반환
+    else:
+        # 실패 시 오답 목록을 힌트 페이로드로 반환
+        return False, tally["incorrect_questions_list"]
 
 
 # =====================================
@@ -80,14 +530,30 @@ landmark_qa_data = load_landmark_qa()
 # =====================================
 
 
-def check_with_blip(user_image_path, landmark_name):
+def check_with_blip(
+    user_image_path,
+    landmark_name,
+    batch_size=None,
+    mode=None,
+    soft_score=None,
+    early_exit=None,
+    progress=None,
+):
     """
     BLIP VQA를 사용해 사용자 이미지가 해당 랜드마크가 맞는지 검증합니다.
     JSON에 정의된 질문 리스트를 수행하고 바른 답변의 비율을 계산합니다.
 
     Args:
-        user_image_path (str): 사용자가 업로드한 이미지 파일 경로
+        user_image_path (str or ImageContext or PIL.Image): 사용자가 업로드한 이미지 파일 경로, 업로드 컨텍스트 또는 PIL Image 객체
         landmark_name (str): 오늘의 정답 랜드마크 이름 (예: "피노키오")
+        batch_size (int, optional): 한 번에 묶어 실행할 질문 수.
+                                    None이면 VQA_BATCH_SIZE를 사용합니다.
+        mode (str, optional): "generate" 또는 "score". None이면 VQA_MODE를 사용합니다.
+        soft_score (bool, optional): "score" 모드에서 기대 답변 확률 평균으로
+                                     성공을 판정할지 여부. None이면 USE_SOFT_SCORE를 사용합니다.
+        early_exit (bool, optional): 결과가 확정되면 남은 질문을 건너뛸지 여부.
+                                     None이면 USE_EARLY_EXIT를 사용합니다.
+        progress (callable, optional): 배치마다 progress(답변한 질문 수, 전체 질문 수)로 호출됩니다.
 
     Returns:
         tuple: (is_success, hint_payload)
@@ -112,79 +578,295 @@ def check_with_blip(user_image_path, landmark_name):
         print(f"Warning: Empty Q&A list for landmark '{landmark_name}'.")
         return False, []
 
-    # --- 2. 이미지 로드 ---
-    try:
-        raw_image = Image.open(user_image_path).convert("RGB")
-    except FileNotFoundError:
-        print(f"Error: User image not found at '{user_image_path}'.")
-        return False, []
-    except Exception as e:
-        print(f"Error loading image '{user_image_path}': {e}")
+    # --- 2. 이미지 로드 및 비전 인코딩 ---
+    stage_timings = {"preprocess": 0.0, "vision_encoder": 0.0, "vision_encoder_calls": 0, "questions": 0.0}
+
+    image_embeds = load_image_embeds(user_image_path, stage_timings)
+    if image_embeds is None:
         return False, []
 
     # --- 3. VQA 실행 및 정확도 계산 ---
-    correct_count = 0
-    incorrect_questions_list = []  # 오답 목록 저장용
+    tally = new_tally()
+
+    if mode is None:
+        mode = VQA_MODE
+    if soft_score is None:
+        soft_score = USE_SOFT_SCORE
+    soft_score = soft_score and mode == "score"
+    if early_exit is None:
+        early_exit = USE_EARLY_EXIT
+    if batch_size is None:
+        batch_size = EARLY_EXIT_BATCH_SIZE if early_exit else VQA_BATCH_SIZE
+    batch_size = max(1, batch_size)
+
+    if early_exit:
+        # 변별력이 높은 질문부터 물어야 빨리 결과가 확정됨
+        question_list = ordered_questions(landmark_name, question_list)
+
+    # 미리 컴파일된 질문 텐서 (없으면 요청 중에 토크나이즈)
+    compiled = question_tensors.get(landmark_name)
+
+    # 성공 판정 기준 (정답 비율 또는 기대 답변 확률 평균)
+    threshold = SOFT_SUCCESS_THRESHOLD if soft_score else SUCCESS_THRESHOLD
+    asked_questions = 0
 
-    try:
-        pixel_values = processor(images=raw_image, return_tensors="pt").pixel_values.to(
-            DEVICE
-        )
-    except Exception as e:
-        print(f"Error processing image with BLIP: {e}")
-        return False, []
+    print(
+        f"Running VQA for landmark '{landmark_name}' "
+        f"({total_questions} questions, batch size {batch_size}, mode '{mode}'"
+        f"{', early exit' if early_exit else ''})..."
+    )
+
+    for start in range(0, total_questions, batch_size):
+        batch = question_list[start : start + batch_size]
+        questions = [item[0] for item in batch]
+
+        stage_start = time.perf_counter()
+        try:
+            if compiled is not None:
+                input_ids, attention_mask = select_question_rows(
+                    compiled, [compiled["rows"][question] for question in questions]
+                )
+                model_answers, margins = answer_tokenized(image_embeds, input_ids, attention_mask, mode)
+            else:
+                model_answers, margins = answer_questions(image_embeds, questions, mode)
+        except Exception as e:
+            print(f"Error during VQA processing for questions {questions}: {e}")
+            # 오류 발생 시에도 배치 전체를 오답으로 간주하고 목록에 추가
+            model_answers, margins = ["error"] * len(batch), None
+        stage_timings["questions"] += time.perf_counter() - stage_start
+
+        tally_answers(tally, batch, model_answers, margins)
+
+        asked_questions += len(batch)
+        if progress is not None:
+            progress(asked_questions, total_questions)
+
+        # --- 조기 종료: 남은 질문을 모두 맞히거나 모두 틀려도 결과가 같으면 중단 ---
+        if early_exit and asked_questions < total_questions:
+            score = tally["expected_prob_sum"] if soft_score else tally["correct_count"]
+            remaining = total_questions - asked_questions
+            if (
+                score / total_questions >= threshold
+                or (score + remaining) / total_questions < threshold
+            ):
+                print(f"VQA Early Exit: outcome decided after {asked_questions}/{total_questions} questions.")
+                break
+
+    if early_exit:
+        with stats_lock:
+            early_exit_stats["requests"] += 1
+            early_exit_stats["questions_asked"] += asked_questions
+            early_exit_stats["questions_total"] += total_questions
+
+    # --- 4. 최종 성공 여부 판별 ---
+    # 조기 종료 시에도 분모는 전체 질문 수 (건너뛴 질문은 결과를 바꿀 수 없음)
+    is_success, incorrect_questions_list = judge_tally(tally, total_questions, soft_score)
 
+    last_stage_timings.clear()
+    last_stage_timings.update(stage_timings)
     print(
-        f"Running VQA for landmark '{landmark_name}' ({total_questions} questions)..."
+        f"VQA Timings: preprocess {stage_timings['preprocess']:.3f}s, "
+        f"vision encoder {stage_timings['vision_encoder']:.3f}s "
+        f"(x{stage_timings['vision_encoder_calls']}), "
+        f"questions {stage_timings['questions']:.3f}s"
     )
 
-    for item in question_list:
-        question = item[0]
-        expected_answer = item[1]
-        
+    return is_success, incorrect_questions_list
+
+
+def blip_hint_questions(user_image_path, landmark_name, limit=None, mode=None):
+    """
+    CLIP 게이트에서 걸러진 사진의 힌트용으로 변별력 상위 질문 limit개만 물어 틀린 질문을 반환합니다.
+    (판정은 이미 실패이므로 한 배치만 실행)
+
+    Args:
+        user_image_path (str or ImageContext or PIL.Image): 이미지 파일 경로, 업로드 컨텍스트 또는 PIL Image 객체
+        landmark_name (str): 오늘의 정답 랜드마크 이름
+        limit (int, optional): 물어볼 질문 수. None이면 GATE_HINT_QUESTIONS를 사용합니다.
+        mode (str, optional): "generate" 또는 "score". None이면 VQA_MODE를 사용합니다.
+
+    Returns:
+        list: check_with_blip의 hint_payload와 같은 형식의 틀린 질문 리스트
+    """
+    question_list = landmark_qa_data.get(landmark_name)
+    if not processor or not model or not question_list:
+        return []
+
+    batch = ordered_questions(landmark_name, question_list)[: limit or GATE_HINT_QUESTIONS]
+    image_embeds = load_image_embeds(user_image_path)
+    if image_embeds is None:
+        return []
+
+    questions = [item[0] for item in batch]
+    compiled = question_tensors.get(landmark_name)
+    try:
+        if compiled is not None:
+            input_ids, attention_mask = select_question_rows(
+                compiled, [compiled["rows"][question] for question in questions]
+            )
+            model_answers, margins = answer_tokenized(image_embeds, input_ids, attention_mask, mode or VQA_MODE)
+        else:
+            model_answers, margins = answer_questions(image_embeds, questions, mode or VQA_MODE)
+    except Exception as e:
+        print(f"Error during VQA processing for hint questions: {e}")
+        return []
+
+    tally = new_tally()
+    tally_answers(tally, batch, model_answers, margins)
+    print(f"VQA Hint Questions: {len(tally['incorrect_questions_list'])}/{len(batch)} incorrect for '{landmark_name}'.")
+    return tally["incorrect_questions_list"]
+
+
+def check_with_blip_batch(user_images, landmark_names, mode=None, soft_score=None):
+    """
+    여러 요청의 이미지를 한 번의 forward로 묶어 검증합니다. (inference_queue에서 사용)
+    비전 인코더는 이미지 배치 전체에 대해 한 번 실행하고, 모든 (이미지, 질문) 쌍을
+    VQA_BATCH_SIZE 단위로 묶어 텍스트 인코더/디코더에 통과시킵니다.
+    요청 간 배치에서는 조기 종료를 사용하지 않습니다.
+
+    Args:
+        user_images (list): 이미지 파일 경로 또는 PIL Image 객체 리스트
+        landmark_names (list): 이미지별 정답 랜드마크 이름 리스트
+
+    Returns:
+        list: 이미지 순서대로 check_with_blip()과 같은 (is_success, hint_payload) 튜플
+    """
+    results = [(False, [])] * len(user_images)
+
+    if not processor or not model:
+        print("Error: BLIP model is not loaded. Aborting mission.")
+        return results
+
+    if mode is None:
+        mode = VQA_MODE
+    if soft_score is None:
+        soft_score = USE_SOFT_SCORE
+    soft_score = soft_score and mode == "score"
+
+    # --- 1. 이미지 로드 (실패한 요청은 (False, [])로 남김) ---
+    valid = []  # (요청 번호, PIL Image)
+    for i, (user_image, landmark_name) in enumerate(zip(user_images, landmark_names)):
+        if not landmark_question_index.get(landmark_name):
+            print(f"Warning: No Q&A data found for landmark '{landmark_name}'.")
+            continue
         try:
-            inputs = processor(text=question, return_tensors="pt").to(DEVICE)
+            valid.append((i, to_pil(user_image)))
+        except Exception as e:
+            print(f"Error loading image '{user_image}': {e}")
 
-            out = model.generate(
-                pixel_values=pixel_values,
-                input_ids=inputs.input_ids,
-                attention_mask=inputs.attention_mask,
-                max_new_tokens=10,
+    if not valid:
+        return results
+
+    # --- 2. 비전 인코더: 이미지 배치 전체를 한 번에 ---
+    try:
+        pixel_values = processor(
+            images=[image for _, image in valid], return_tensors="pt"
+        ).pixel_values.to(DEVICE)
+        image_embeds = encode_image(pixel_values)
+    except Exception as e:
+        print(f"Error processing images with BLIP: {e}")
+        return results
+
+    # --- 3. 모든 (이미지, 질문) 쌍을 중복 제거 질문 인덱스 기준으로 나열 ---
+    pairs = []  # (배치 내 이미지 번호, 질문 행, [질문, 기대 답변])
+    for image_pos, (i, _) in enumerate(valid):
+        for row, expected_answer in landmark_question_index[landmark_names[i]]:
+            pairs.append((image_pos, row, [unique_questions[row], expected_answer]))
+
+    print(f"Running batched VQA for {len(valid)} images ({len(pairs)} question pairs, mode '{mode}')...")
+
+    tallies = [new_tally() for _ in valid]
+    for start in range(0, len(pairs), VQA_BATCH_SIZE):
+        chunk = pairs[start : start + VQA_BATCH_SIZE]
+        try:
+            input_ids, attention_mask = select_question_rows(
+                unique_question_tensors, [row for _, row, _ in chunk]
+            )
+            image_index = torch.tensor([image_pos for image_pos, _, _ in chunk], device=image_embeds.device)
+            model_answers, margins = answer_tokenized(
+                image_embeds.index_select(0, image_index), input_ids, attention_mask, mode
             )
-            
-            model_answer = processor.decode(out[0], skip_special_tokens=True).strip().lower()
-            
-            if model_answer == expected_answer:
-                correct_count += 1
-            else:
-                # 답변이 틀렸을 경우, 상세 정보와 함께 힌트 목록에 추가
-                incorrect_questions_list.append({
-                    "question": question,
-                    "model_answer": model_answer,
-                    "expected_answer": expected_answer
-                })
-                
         except Exception as e:
-            print(f"Error during VQA processing for question '{question}': {e}")
-            # 오류 발생 시에도 오답으로 간주하고 목록에 추가
-            incorrect_questions_list.append({
-                "question": question,
-                "model_answer": "error",
-                "expected_answer": expected_answer
-            })
+            print(f"Error during batched VQA processing: {e}")
+            model_answers, margins = ["error"] * len(chunk), None
 
-    # --- 4. 최종 성공 여부 판별 ---
-    accuracy = correct_count / total_questions
-    is_success = accuracy >= SUCCESS_THRESHOLD
+        if margins is None:
+            margins = [None] * len(chunk)
+        for (image_pos, _, item), model_answer, margin in zip(chunk, model_answers, margins):
+            tally_answers(tallies[image_pos], [item], [model_answer], [margin])
 
-    print(f"VQA Result: {correct_count}/{total_questions} correct answers ({accuracy:.2%}). Success: {is_success}")
+    # --- 4. 요청별 성공 여부 판별 ---
+    results = list(results)
+    for image_pos, (i, _) in enumerate(valid):
+        total_questions = len(landmark_question_index[landmark_names[i]])
+        results[i] = judge_tally(tallies[image_pos], total_questions, soft_score)
+    return results
 
-    if is_success:
-        return True, [] # 성공 시에는 빈 힌트 페이로드 반환
-    else:
-        # 실패 시 오답 목록을 힌트 페이로드로 반환
-        return False, incorrect_questions_list
-    
+
+def score_all_landmarks(user_image_path, batch_size=None, mode=None):
+    """
+    중복 제거된 질문을 이미지당 한 번씩만 답변한 뒤, 모든 랜드마크에 대한 일치율을 계산합니다.
+    힌트 생성이나 관리자 진단에서 "가장 가까운 랜드마크"를 확인할 때 사용합니다.
+
+    Args:
+        user_image_path (str): 사용자가 업로드한 이미지 파일 경로
+        batch_size (int, optional): 한 번에 묶어 실행할 질문 수. None이면 VQA_BATCH_SIZE
+        mode (str, optional): "generate" 또는 "score". None이면 VQA_MODE
+
+    Returns:
+        list: 일치율 내림차순으로 정렬된 랜드마크 목록
+              [{"landmark": str, "match_ratio": float, "correct": int, "total": int}, ...]
+    """
+    if not processor or not model:
+        print("Error: BLIP model is not loaded. Aborting landmark scoring.")
+        return []
+
+    if not unique_questions:
+        print("Warning: No Q&A data loaded.")
+        return []
+
+    image_embeds = load_image_embeds(user_image_path)
+    if image_embeds is None:
+        return []
+
+    if batch_size is None:
+        batch_size = VQA_BATCH_SIZE
+    batch_size = max(1, batch_size)
+    if mode is None:
+        mode = VQA_MODE
+
+    print(
+        f"Scoring against {len(landmark_question_index)} landmarks "
+        f"({len(unique_questions)} unique questions, mode '{mode}')..."
+    )
+
+    model_answers = []
+    for start in range(0, len(unique_questions), batch_size):
+        questions = unique_questions[start : start + batch_size]
+        try:
+            input_ids, attention_mask = select_question_rows(
+                unique_question_tensors, list(range(start, start + len(questions)))
+            )
+            answers, _ = answer_tokenized(image_embeds, input_ids, attention_mask, mode)
+        except Exception as e:
+            print(f"Error during VQA processing for questions {questions}: {e}")
+            answers = ["error"] * len(questions)
+        model_answers.extend(answers)
+
+    ranking = []
+    for landmark, entries in landmark_question_index.items():
+        if not entries:
+            continue
+        correct = sum(model_answers[index] == expected for index, expected in entries)
+        ranking.append({
+            "landmark": landmark,
+            "match_ratio": correct / len(entries),
+            "correct": correct,
+            "total": len(entries),
+        })
+
+    ranking.sort(key=lambda item: item["match_ratio"], reverse=True)
+    return ranking
 
 
 # =====================================
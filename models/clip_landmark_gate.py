@@ -0,0 +1,353 @@
+# models/clip_landmark_gate.py
+
+import os
+import sys
+import json
+import time
+import threading
+from datetime import datetime
+
+import numpy as np
+import torch
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+from utils.clip_loader import clip_model, clip_processor, device
+from models.clip_module import as_features
+from utils.image_context import to_pil
+
+# ======================================
+# ✅ 설정
+# ======================================
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+INDEX_FILE = os.path.join(DATA_DIR, "clip_landmark_index.npy")
+INDEX_LABELS_FILE = os.path.join(DATA_DIR, "clip_landmark_index.json")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".jfif", ".png", ".heic", ".heif")
+# 미션 랜드마크 목록 (blip_module과 같은 Q&A 파일의 키, BLIP 모델을 올리지 않도록 직접 읽음)
+LANDMARK_QA_FILES = (
+    os.path.join(DATA_DIR, "landmark_qa_labeled_updated.json"),
+    os.path.join(DATA_DIR, "landmark_qa.json"),
+)
+
+# 오늘의 랜드마크 참조 사진과의 최대 코사인 유사도가 이 값보다 낮으면 BLIP 없이 실패 처리 (0 이하이면 게이트 끔)
+# 설정하지 않으면 인덱스를 만들 때 참조 사진으로 보정해 저장한 기준값을 사용하고, 보정값이 없으면 게이트를 끕니다.
+# (보정되지 않은 기준값이 너무 높으면 정답 사진을 BLIP 없이 거부하므로 추정치를 기본값으로 두지 않음)
+GATE_MIN_SIMILARITY_ENV = os.getenv("LANDMARK_GATE_MIN_SIMILARITY", "")
+EMBED_BATCH_SIZE = int(os.getenv("LANDMARK_GATE_BATCH_SIZE", "16"))
+
+
+def embed_images(images):
+    """
+    CLIP 이미지 인코더로 정규화된 임베딩을 계산합니다.
+
+    Args:
+        images (list): PIL Image 리스트
+
+    Returns:
+        np.ndarray: (이미지 수, 임베딩 차원) float32 정규화 행렬
+    """
+    inputs = clip_processor(images=images, return_tensors="pt").to(device)
+    with torch.inference_mode():
+        image_embeds = as_features(clip_model.get_image_features(**inputs))
+        image_embeds = image_embeds / image_embeds.norm(dim=-1, keepdim=True)
+    return image_embeds.float().cpu().numpy()
+
+
+def mission_landmarks():
+    """
+    Q&A 파일에 있는 미션 랜드마크 이름 목록을 반환합니다. (파일이 없으면 빈 리스트)
+    data/ 아래의 시연 사진(시연사진)이나 미션과 겹치는 다른 폴더(피노키오 ↔ 창틀 피노키오 등)를 인덱스에서 빼는 데 사용합니다.
+    """
+    for path in LANDMARK_QA_FILES:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return list(json.load(f))
+        except FileNotFoundError:
+            continue
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️ 랜드마크 Q&A 파일 로드 실패 ({path}): {e}")
+            return []
+    return []
+
+
+def list_reference_photos(data_dir=DATA_DIR, landmarks=None):
+    """
+    data/<랜드마크>/ 폴더의 참조 사진을 (랜드마크, 경로) 리스트로 모읍니다.
+
+    Args:
+        data_dir (str): 랜드마크별 참조 사진 폴더가 있는 경로
+        landmarks (list, optional): 모을 폴더(랜드마크) 이름. None이면 모든 폴더
+    """
+    photos = []
+    for landmark in sorted(os.listdir(data_dir)):
+        folder = os.path.join(data_dir, landmark)
+        if not os.path.isdir(folder):
+            continue
+        if landmarks is not None and landmark not in landmarks:
+            continue
+        for name in sorted(os.listdir(folder)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                photos.append((landmark, os.path.join(folder, name)))
+    return photos
+
+
+def build_index(data_dir=DATA_DIR, index_file=INDEX_FILE, labels_file=INDEX_LABELS_FILE):
+    """
+    참조 사진을 CLIP으로 임베딩해 float16 행렬(.npy)과 라벨(.json)로 저장합니다.
+
+    Args:
+        data_dir (str): 랜드마크별 참조 사진 폴더가 있는 경로
+        index_file (str): 임베딩 행렬을 저장할 .npy 경로
+        labels_file (str): 행 순서대로의 랜드마크 라벨을 저장할 .json 경로
+
+    미션 랜드마크(Q&A 파일의 키) 폴더만 인덱스에 넣습니다. 다른 폴더가 "다른 랜드마크"로 섞이면
+    보정 분포와 최근접 라벨이 틀어집니다.
+    """
+    landmarks = mission_landmarks()
+    if not landmarks:
+        raise RuntimeError("미션 랜드마크 Q&A 파일을 찾을 수 없어 참조 인덱스를 만들 수 없습니다.")
+    skipped = sorted(
+        name for name in os.listdir(data_dir)
+        if os.path.isdir(os.path.join(data_dir, name)) and name not in landmarks
+    )
+    if skipped:
+        print(f"미션 랜드마크가 아닌 폴더는 제외합니다: {', '.join(skipped)}")
+    photos = list_reference_photos(data_dir, landmarks)
+    print(f"Embedding {len(photos)} reference photos...")
+
+    labels, paths, rows = [], [], []
+    for start in range(0, len(photos), EMBED_BATCH_SIZE):
+        batch, images = [], []
+        for landmark, path in photos[start : start + EMBED_BATCH_SIZE]:
+            try:
+                images.append(to_pil(path))
+                batch.append((landmark, path))
+            except Exception as e:
+                print(f"⚠️ 참조 사진 로드 실패 ({path}): {e}")
+        if not images:
+            continue
+        rows.append(embed_images(images))
+        for landmark, path in batch:
+            labels.append(landmark)
+            paths.append(os.path.relpath(path, data_dir))
+
+    matrix = np.concatenate(rows).astype(np.float16)
+    np.save(index_file, matrix)
+
+    # 참조 사진끼리의 유사도로 보정한 기준값 (LANDMARK_GATE_MIN_SIMILARITY가 없을 때 사용)
+    same, other = similarity_distributions(matrix, labels)
+    calibrated = round(suggest_threshold(same), 4) if len(same) and len(other) else None
+    if calibrated is None:
+        print("⚠️ 랜드마크당 참조 사진이 2장 이상이어야 기준값을 보정할 수 있습니다. (게이트는 꺼진 상태로 시작)")
+
+    with open(labels_file, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "generated_at": datetime.now().isoformat(),
+                "model": str(clip_model.config._name_or_path),
+                "calibrated_threshold": calibrated,
+                "labels": labels,
+                "paths": paths,
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+    print(f"Successfully created landmark index ({matrix.shape[0]} x {matrix.shape[1]}) at: {index_file}")
+
+
+def similarity_distributions(matrix, labels):
+    """
+    참조 사진끼리의 유사도로 게이트 기준값을 고르기 위한 분포를 계산합니다.
+    각 사진에 대해 gate_landmark와 같은 방식(랜드마크별 참조 사진 중 최대 유사도)으로
+    - same: 같은 랜드마크의 다른 참조 사진과의 유사도 (정답 사진이 받을 점수, 자기 자신 제외)
+    - other: 다른 랜드마크마다의 유사도 (오답 사진이 받을 점수)
+    를 모읍니다.
+
+    Returns:
+        tuple: (same, other) - np.ndarray
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    similarities = matrix @ matrix.T
+    np.fill_diagonal(similarities, -1.0)  # 자기 자신 제외
+    labels = np.asarray(labels)
+
+    same, other = [], []
+    for landmark in sorted(set(labels)):
+        columns = labels == landmark
+        best = similarities[:, columns].max(axis=1)  # 사진별 이 랜드마크와의 최대 유사도
+        if columns.sum() > 1:
+            same.extend(best[columns])
+        other.extend(best[~columns])
+    return np.asarray(same), np.asarray(other)
+
+
+def suggest_threshold(same):
+    """정답 사진 오거부가 1% 이하가 되는 기준값 (같은 랜드마크 유사도의 1번째 백분위수)"""
+    return float(np.percentile(same, 1))
+
+
+def print_calibration(matrix, labels, threshold=0.0):
+    """같은/다른 랜드마크 유사도 분포와 기준값별 오거부/오통과 비율을 출력합니다."""
+    same, other = similarity_distributions(matrix, labels)
+    if len(same) == 0 or len(other) == 0:
+        print("⚠️ 분포를 계산할 참조 사진이 부족합니다. (랜드마크당 2장 이상 필요)")
+        return
+
+    percentiles = (0, 1, 5, 25, 50, 75, 95, 99, 100)
+    print(f"\n같은 랜드마크 유사도 ({len(same)}개): " + ", ".join(
+        f"p{p} {v:.3f}" for p, v in zip(percentiles, np.percentile(same, percentiles))))
+    print(f"다른 랜드마크 유사도 ({len(other)}개): " + ", ".join(
+        f"p{p} {v:.3f}" for p, v in zip(percentiles, np.percentile(other, percentiles))))
+
+    # 오거부: 정답 사진을 게이트가 거부하는 비율 / 오통과: 오답 사진이 BLIP까지 가는 비율
+    print("\n기준값   오거부(정답 사진)   게이트 거부(오답 사진)")
+    candidates = sorted(set(np.round(np.arange(0.40, 0.96, 0.05), 2)) | ({round(threshold, 2)} if threshold > 0 else set()))
+    for value in candidates:
+        marker = "  ← 현재" if threshold > 0 and abs(value - round(threshold, 2)) < 1e-9 else ""
+        print(f"{value:.2f}     {np.mean(same < value):>8.1%}           {np.mean(other < value):>8.1%}{marker}")
+
+    suggested = suggest_threshold(same)
+    print(f"\n정답 사진 오거부 1% 이하 기준값: {suggested:.3f} "
+          f"(이때 오답 사진 거부율 {np.mean(other < suggested):.1%}) → 인덱스에 저장됨 "
+          f"(LANDMARK_GATE_MIN_SIMILARITY로 덮어쓰기)")
+
+
+def load_index():
+    """
+    저장된 참조 임베딩 인덱스를 메모리 매핑으로 불러옵니다.
+
+    Returns:
+        tuple: (matrix, labels, calibrated) 또는 인덱스가 없으면 (None, [], None)
+               matrix (np.ndarray): (사진 수, 임베딩 차원) float16 memmap
+               labels (list): 행 순서대로의 랜드마크 이름
+               calibrated (float or None): 인덱스를 만들 때 보정한 기준값
+    """
+    if not (os.path.exists(INDEX_FILE) and os.path.exists(INDEX_LABELS_FILE)):
+        print("⚠️ 랜드마크 참조 인덱스가 없어 CLIP 게이트를 사용하지 않습니다. "
+              "(python models/clip_landmark_gate.py 로 생성)")
+        return None, [], None
+
+    try:
+        matrix = np.load(INDEX_FILE, mmap_mode="r")
+        with open(INDEX_LABELS_FILE, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        labels = meta["labels"]
+        calibrated = meta.get("calibrated_threshold")
+    except Exception as e:
+        print(f"⚠️ 랜드마크 참조 인덱스 로드 실패: {e}")
+        return None, [], None
+
+    if len(labels) != matrix.shape[0]:
+        print("⚠️ 랜드마크 참조 인덱스의 라벨 수가 행렬과 달라 CLIP 게이트를 사용하지 않습니다.")
+        return None, [], None
+
+    landmarks = set(mission_landmarks())
+    extra = sorted(set(labels) - landmarks) if landmarks else []
+    if extra:
+        # 이전 방식으로 만든 인덱스 - 미션이 아닌 행은 빼고 사용 (다시 생성 권장)
+        print(f"⚠️ 랜드마크 참조 인덱스에 미션이 아닌 폴더가 있어 제외합니다: {', '.join(extra)} "
+              "(python models/clip_landmark_gate.py 로 다시 생성하세요)")
+        keep = [row for row, label in enumerate(labels) if label in landmarks]
+        matrix = np.asarray(matrix[keep])
+        labels = [labels[row] for row in keep]
+        calibrated = None  # 다른 행까지 포함해 보정한 값은 믿지 않음
+
+    print(f"CLIP landmark gate: {matrix.shape[0]} reference photos, {len(set(labels))} landmarks")
+    return matrix, labels, calibrated
+
+
+def resolve_threshold(calibrated):
+    """
+    게이트 기준값을 정합니다.
+
+    Returns:
+        tuple: (threshold, source) - source: "env" / "calibrated" / "disabled"
+    """
+    if GATE_MIN_SIMILARITY_ENV.strip():
+        return float(GATE_MIN_SIMILARITY_ENV), "env"
+    if calibrated:
+        return float(calibrated), "calibrated"
+    return 0.0, "disabled"
+
+
+# --- 서버 시작 시 인덱스 로드 ---
+index_matrix, index_labels, index_calibrated = load_index()
+GATE_MIN_SIMILARITY, GATE_THRESHOLD_SOURCE = resolve_threshold(index_calibrated)
+if index_matrix is not None:
+    print(f"CLIP landmark gate: min similarity {GATE_MIN_SIMILARITY} ({GATE_THRESHOLD_SOURCE})")
+landmark_rows = {}
+for row, landmark in enumerate(index_labels):
+    landmark_rows.setdefault(landmark, []).append(row)
+gate_stats = {"checked": 0, "rejected": 0, "skipped": 0}
+stats_lock = threading.Lock()
+
+
+def gate_landmark(image, landmark_name):
+    """
+    업로드 사진이 오늘의 랜드마크 참조 사진과 명백히 다른지 최근접 이웃으로 빠르게 확인합니다.
+
+    Args:
+        image (PIL.Image): 디코딩된 RGB 이미지
+        landmark_name (str): 오늘의 정답 랜드마크 이름
+
+    Returns:
+        tuple: (passed, gate_info)
+               passed (bool): False이면 BLIP을 실행하지 않고 실패 처리
+               gate_info (dict): similarity, nearest, threshold, elapsed_ms
+    """
+    rows = landmark_rows.get(landmark_name)
+    if index_matrix is None or rows is None or GATE_MIN_SIMILARITY <= 0:
+        with stats_lock:
+            gate_stats["skipped"] += 1
+        return True, {}
+
+    start = time.perf_counter()
+    query = embed_images([image])[0]
+    similarities = np.asarray(index_matrix, dtype=np.float32) @ query
+
+    nearest = index_labels[int(similarities.argmax())]
+    similarity = float(similarities[rows].max())
+    passed = similarity >= GATE_MIN_SIMILARITY
+
+    gate_info = {
+        "similarity": round(similarity, 4),
+        "nearest": nearest,
+        "threshold": GATE_MIN_SIMILARITY,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+    with stats_lock:
+        gate_stats["checked"] += 1
+        if not passed:
+            gate_stats["rejected"] += 1
+
+    status = "통과" if passed else "거부"
+    print(
+        f"🚪 CLIP 게이트 {status}: '{landmark_name}' 유사도 {similarity:.3f} "
+        f"(기준 {GATE_MIN_SIMILARITY}, 최근접 '{nearest}', {gate_info['elapsed_ms']}ms)"
+    )
+    return passed, gate_info
+
+
+def gate_report():
+    """게이트 설정과 통과/거부 통계를 반환합니다."""
+    with stats_lock:
+        stats = dict(gate_stats)
+    return {
+        "enabled": index_matrix is not None and GATE_MIN_SIMILARITY > 0,
+        "threshold": GATE_MIN_SIMILARITY,
+        "threshold_source": GATE_THRESHOLD_SOURCE,
+        "calibrated_threshold": index_calibrated,
+        "reference_photos": 0 if index_matrix is None else int(index_matrix.shape[0]),
+        **stats,
+    }
+
+
+if __name__ == "__main__":
+    # 참조 사진 인덱스 생성 후 기준값 선택용 유사도 분포 출력
+    # python models/clip_landmark_gate.py
+    build_index()
+    matrix, labels, calibrated = load_index()
+    if matrix is not None:
+        print_calibration(matrix, labels, resolve_threshold(calibrated)[0])
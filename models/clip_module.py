@@ -1,15 +1,27 @@
 # clip_module.py
 import os
-import re
 import sys
+import hashlib
 import torch
+import torch.nn.functional as F
 from PIL import Image
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if PROJECT_ROOT not in sys.path:
     sys.path.append(PROJECT_ROOT)
 from utils.clip_loader import clip_model, clip_processor, device
-from config.keyword import keyword_mapping, kw_strong, kw_middle, kw_weak, rules, feedback_guide
+from config.keyword import keyword_mapping, rules
+from result_cache import LRUCache, image_digest
+from utils.image_context import to_pil
+
+# --- 분위기 프롬프트 텍스트 임베딩 캐시 (config/keyword.py 해시 기준) ---
+KEYWORD_FILE = os.path.join(PROJECT_ROOT, "config", "keyword.py")
+TEXT_EMBEDDING_CACHE_FILE = os.path.join(PROJECT_ROOT, "data", "clip_text_embeddings.pt")
+
+# --- 이미지별 분위기 프로필 캐시 (정답 키워드와 무관하므로 정답이 바뀌어도 재사용) ---
+MOOD_PROFILE_CACHE_SIZE = int(os.getenv("CLIP_PROFILE_CACHE_SIZE", "512"))
+MOOD_PROFILE_CACHE_TTL = float(os.getenv("CLIP_PROFILE_CACHE_TTL", "86400"))
+
 
 def make_label_pairs(keyword_mapping):
     label_pairs = []
@@ -38,23 +50,105 @@ def make_prompts_from_keywords(keywords, templates=None):
 
     return prompts
 
-def analyze_mood(image, keywords, top):
+def as_features(output):
+    """get_*_features 반환값을 임베딩 텐서로 통일합니다. (transformers 버전별 차이 흡수)"""
+    if isinstance(output, torch.Tensor):
+        return output
+    return output.pooler_output
+
+
+def compute_text_embeddings(keywords):
+    """키워드 프롬프트를 CLIP 텍스트 인코더에 통과시켜 정규화된 임베딩을 계산합니다."""
     prompts = make_prompts_from_keywords(keywords)
-    inputs = clip_processor(
-        text=prompts, images=image, return_tensors="pt", padding=True
-    ).to(device)
-    outputs = clip_model(**inputs)
+    inputs = clip_processor(text=prompts, return_tensors="pt", padding=True).to(device)
+    with torch.inference_mode():
+        text_embeds = as_features(clip_model.get_text_features(**inputs))
+    return text_embeds / text_embeds.norm(dim=-1, keepdim=True)
+
+
+def keyword_config_hash(keywords):
+    """config/keyword.py 내용 + 프롬프트 + 모델 이름으로 텍스트 임베딩 캐시 키를 만듭니다."""
+    digest = hashlib.sha256()
+    with open(KEYWORD_FILE, "rb") as f:
+        digest.update(f.read())
+    digest.update("\n".join(make_prompts_from_keywords(keywords)).encode("utf-8"))
+    digest.update(str(clip_model.config._name_or_path).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_text_embeddings():
+    """
+    분위기 프롬프트의 정규화된 텍스트 임베딩 행렬을 서버 시작 시 한 번만 준비합니다.
+    config/keyword.py 해시가 같으면 디스크 캐시를 재사용하고, 다르면 다시 계산해 저장합니다.
+
+    Returns:
+        tuple: (labels, text_embeddings, config_hash)
+               labels (list): 행 순서대로 정리된 분위기 키워드 (make_label_pairs 순서)
+               text_embeddings (torch.Tensor): (키워드 수, 임베딩 차원) 정규화된 행렬
+    """
+    labels = make_label_pairs(keyword_mapping)
+    config_hash = keyword_config_hash(labels)
+
+    try:
+        cached = torch.load(TEXT_EMBEDDING_CACHE_FILE, map_location=device)
+        if cached.get("hash") == config_hash and cached.get("labels") == labels:
+            print(f"CLIP text embeddings loaded from cache ({len(labels)} prompts).")
+            return labels, cached["embeddings"].to(device), config_hash
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"⚠️ CLIP 텍스트 임베딩 캐시 로드 실패: {e}")
+
+    text_embeddings = compute_text_embeddings(labels)
+    try:
+        torch.save(
+            {"hash": config_hash, "labels": labels, "embeddings": text_embeddings.cpu()},
+            TEXT_EMBEDDING_CACHE_FILE,
+        )
+    except OSError as e:
+        print(f"⚠️ CLIP 텍스트 임베딩 캐시 저장 실패: {e}")
+    print(f"CLIP text embeddings computed for {len(labels)} prompts (hash {config_hash[:12]}).")
+    return labels, text_embeddings, config_hash
+
+
+# --- 서버 시작 시 텍스트 임베딩 행렬 준비 ---
+label_pairs, text_embeddings, KEYWORD_CONFIG_HASH = load_text_embeddings()
+
+
+def mood_probs(images, keywords=None):
+    """
+    이미지(또는 이미지 리스트)와 키워드 프롬프트의 유사도 softmax를 계산합니다.
+    요청마다 이미지 인코더만 실행하고, 미리 계산한 텍스트 임베딩 행렬과 곱합니다.
+
+    Args:
+        images (PIL.Image or list): 이미지 또는 이미지 리스트
+        keywords (list, optional): 분위기 키워드. None이면 캐시된 label_pairs 사용
+
+    Returns:
+        torch.Tensor: (이미지 수, 키워드 수) 확률 행렬
+    """
+    if keywords is None or keywords == label_pairs:
+        text_embeds = text_embeddings
+    else:
+        text_embeds = compute_text_embeddings(keywords)
+
+    inputs = clip_processor(images=images, return_tensors="pt").to(device)
+    with torch.inference_mode():
+        image_embeds = as_features(clip_model.get_image_features(**inputs))
+        image_embeds = image_embeds / image_embeds.norm(dim=-1, keepdim=True)
+        logits_per_image = clip_model.logit_scale.exp() * image_embeds @ text_embeds.t()
+
+    return logits_per_image.softmax(dim=1)
+
 
-    logits_per_image = outputs.logits_per_image
-    probs = logits_per_image.softmax(dim=1)
+def analyze_mood(image, keywords, top):
+    probs = mood_probs(image, keywords)
 
     topk = torch.topk(probs, k=top)
     top_keywords = []
 
     for idx in topk.indices[0].tolist():
-        match = re.search(r"conveys a (.+?) mood", prompts[idx])
-        kw = match.group(1)
-        top_keywords.append(kw)
+        top_keywords.append(keywords[idx])
 
     return top_keywords
 
@@ -63,12 +157,188 @@ def find_mood(target):
         if target in values:
             return key
 
+
+def top_k_for(kw):
+    """rules 테이블에서 키워드 강도별 top-k를 찾습니다. (없으면 None)"""
+    for rule in rules:
+        if kw in rule["group"]:
+            return rule["top_k"]
+    return None
+
+
+def build_mood_index():
+    """
+    프롬프트 → 분위기 역인덱스와 rules 테이블을 텐서로 준비합니다.
+
+    Returns:
+        tuple: (mood_names, prompt_mood_ids, rule_table)
+               mood_names (list): keyword_mapping의 분위기 이름 (열 순서)
+               prompt_mood_ids (torch.Tensor): label_pairs 순서대로 각 프롬프트의 분위기 번호
+               rule_table (dict): windows (R,), min_counts (R,), group_mask (R, 분위기 수)
+    """
+    mood_names = list(keyword_mapping.keys())
+    mood_ids = {mood: i for i, mood in enumerate(mood_names)}
+    prompt_mood_ids = torch.tensor([mood_ids[find_mood(label)] for label in label_pairs])
+
+    group_mask = torch.zeros(len(rules), len(mood_names), dtype=torch.bool)
+    for r, rule in enumerate(rules):
+        for kw in rule["group"]:
+            if kw in mood_ids:
+                group_mask[r, mood_ids[kw]] = True
+
+    rule_table = {
+        "windows": torch.tensor([min(rule["window"], len(label_pairs)) for rule in rules]),
+        "min_counts": torch.tensor([rule["min_count"] for rule in rules]),
+        "group_mask": group_mask,
+    }
+    return mood_names, prompt_mood_ids, rule_table
+
+
+mood_names, prompt_mood_ids, rule_table = build_mood_index()
+profile_cache = LRUCache(MOOD_PROFILE_CACHE_SIZE, MOOD_PROFILE_CACHE_TTL)
+
+
+def get_mood_profiles(images):
+    """
+    이미지별 분위기 프로필(전체 프롬프트에 대한 softmax 벡터)을 반환합니다.
+    캐시에 없는 이미지만 한 번의 CLIP forward로 묶어 계산합니다.
+
+    Args:
+        images (list): PIL Image 리스트
+
+    Returns:
+        torch.Tensor: (이미지 수, 프롬프트 수) CPU float32 프로필 행렬
+    """
+    keys = [(image_digest(image), KEYWORD_CONFIG_HASH) for image in images]
+    profiles = [profile_cache.get(key) for key in keys]
+
+    missing = [i for i, profile in enumerate(profiles) if profile is None]
+    if missing:
+        probs = mood_probs([images[i] for i in missing]).float().cpu()
+        for row, i in enumerate(missing):
+            profiles[i] = probs[row]
+            profile_cache.set(keys[i], probs[row])
+
+    return torch.stack(profiles)
+
+
+def rank_moods(profiles):
+    """프로필을 확률 순으로 정렬해 순위별 분위기 번호 (이미지 수, 프롬프트 수)를 반환합니다."""
+    order = torch.topk(profiles, k=profiles.shape[1]).indices
+    return prompt_mood_ids[order]
+
+
+def match_profiles(profiles):
+    """
+    rules 테이블을 모든 이미지 × 모든 분위기에 대해 한 번에 적용합니다.
+
+    Args:
+        profiles (torch.Tensor): (이미지 수, 프롬프트 수) 분위기 프로필
+
+    Returns:
+        torch.Tensor: (이미지 수, 분위기 수) bool 성공 여부 행렬
+    """
+    ranked = rank_moods(profiles)
+    # counts[i, r, m]: i번째 이미지의 상위 r+1개 안에 분위기 m이 나온 횟수
+    counts = F.one_hot(ranked, num_classes=len(mood_names)).cumsum(dim=1)
+
+    windowed = counts[:, rule_table["windows"] - 1, :]  # (이미지, 규칙, 분위기)
+    enough = windowed >= rule_table["min_counts"][None, :, None]
+    by_count = (enough & rule_table["group_mask"][None]).any(dim=1)
+
+    is_first = F.one_hot(ranked[:, 0], num_classes=len(mood_names)).bool()
+    has_rule = rule_table["group_mask"].any(dim=0)
+    return (by_count | is_first) & has_rule
+
+
+def match_all_keywords(profile):
+    """
+    한 번의 CLIP 결과로 모든 분위기 키워드의 성공 여부를 판정합니다. (관리자 미리보기 등)
+
+    Returns:
+        dict: {분위기 키워드: 성공 여부}
+    """
+    matches = match_profiles(profile[None])[0]
+    return {mood: bool(matches[i]) for i, mood in enumerate(mood_names)}
+
+
+def mood_scores(profile):
+    """프롬프트별 확률을 분위기별로 합산합니다."""
+    scores = torch.zeros(len(mood_names)).index_add_(0, prompt_mood_ids, profile)
+    return {mood: round(float(scores[i]), 4) for i, mood in enumerate(mood_names)}
+
+
+def describe_mood(image):
+    """관리자 미리보기용 - 분위기별 점수와 모든 키워드의 성공 여부를 한 번에 반환합니다."""
+    profile = get_mood_profiles([to_pil(image)])[0]
+    return {"scores": mood_scores(profile), "matches": match_all_keywords(profile)}
+
+
+def filter_other_moods(kw, detected_top_moods):
+    """정답이 아닌 감지된 분위기를 중복 없이 순서대로 모읍니다."""
+    filtered_moods = []
+    moods_set = set()
+    # 활기찬, 차분한 대조가 됨
+    # 둘 중에 하나라도 먼저 나오면 그 다음부터는 그냥 추가를 안하는걸로
+    for mood in detected_top_moods:
+        if mood != kw:
+            if mood not in moods_set:
+                filtered_moods.append(mood)
+            moods_set.add(mood)
+            if mood == "활기찬":
+                moods_set.add("차분한")
+            if mood == "차분한":
+                moods_set.add("활기찬")
+    return filtered_moods
+
+
+def judge_mood(kw, profile):
+    """
+    분위기 프로필에 키워드 강도별 성공 규칙을 적용합니다.
+
+    Args:
+        kw (str): 목표 감정/분위기 키워드
+        profile (torch.Tensor): (프롬프트 수,) 분위기 프로필
+
+    Returns:
+        tuple: (is_success, moods)
+               moods (str): 실패 시 힌트에 쓸 감지된 다른 분위기 (쉼표로 구분)
+    """
+    top = top_k_for(kw)
+    if top is None:
+        return False, ""
+
+    if match_all_keywords(profile).get(kw, False):
+        return True, ""
+
+    ranked = rank_moods(profile[None])[0]
+    top_mood = [mood_names[i] for i in ranked[:top].tolist()]
+
+    # 정답 분위기가 조금이라도 보이면 상위 3개만, 아니면 전체를 힌트로 사용
+    detected_top_moods = top_mood[:3] if kw in top_mood else top_mood
+    return False, ', '.join(filter_other_moods(kw, detected_top_moods))
+
+
+def make_clip_info(kw, is_success, moods):
+    """감정 정보 반환 (힌트 생성용)"""
+    clip_info = []
+    if not is_success:
+        clip_info.append({
+            "question": f"이 장소에서 {kw} 분위기가 느껴지나요?",
+            "model_answer": f"아니요, 이 장소는 {moods} 분위기 순서대로 더 강하게 느껴져요.",
+            "expected_answer": f"네, 이 장소는 {kw} 분위기가 느껴져요.",
+            # 힌트 캐시 시그니처용 (감지된 다른 분위기, 강한 순서)
+            "detected_moods": [mood for mood in moods.split(", ") if mood],
+        })
+    return clip_info
+
+
 def check_with_clip(image, kw):
     """
     CLIP을 사용하여 이미지의 감정/분위기를 분석하고 목표 키워드와 일치하는지 확인합니다.
 
     Args:
-        image (str or PIL.Image): 이미지 파일 경로 또는 PIL Image 객체
+        image (str or ImageContext or PIL.Image): 이미지 파일 경로, 업로드 컨텍스트 또는 PIL Image 객체
         kw (str): 목표 감정/분위기 키워드 (예: "고요함", "즐거움", "활기찬")
 
     Returns:
@@ -78,153 +348,48 @@ def check_with_clip(image, kw):
     """
     print(f"오늘의 미션: {kw} 분위기, 감성을 지니고 있는 곳을 직접 찍어보세요!")
 
-    # 이미지 로드 (파일 경로인 경우)
-    if isinstance(image, str):
-        pil_image = Image.open(image).convert("RGB")
-    else:
-        pil_image = image  # 이미 PIL Image 객체인 경우
-
-    label_pairs = make_label_pairs(keyword_mapping)
-    is_success = False
-    moods = ""
-      
-    top_mood = []
-    top_mood_specific = []
-    clip_info = []
+    # 이미지 로드 (파일 경로/업로드 컨텍스트인 경우)
+    pil_image = to_pil(image)
 
-    if kw in kw_strong:
-        top_keywords = analyze_mood(pil_image, label_pairs, 5)
-
-        for key in top_keywords:
-            top_mood.append(find_mood(key))
-            top_mood_specific.append(feedback_guide[find_mood(key)]["keywords"][key])
-
-        # 성공 여부 판단
-        if top_mood[0] == kw and top_mood[1] == kw:
-            is_success = True
-        elif top_mood[0] == kw or sum(k == kw for k in top_mood) >= 3:
-            is_success = True
-        elif kw in top_mood:
-            detected_top_moods = top_mood[:3]
-            filtered_moods = []
-            moods_set = set()
-            for mood in detected_top_moods:
-                if mood != kw:
-                    if mood not in moods_set:
-                        filtered_moods.append(mood)
-                    moods_set.add(mood)
-                    if mood == "활기찬":
-                        moods_set.add("차분한")
-                    if mood == "차분한":
-                        moods_set.add("활기찬")
-            moods = ', '.join(filtered_moods)
-        else:
-            detected_top_moods = top_mood
-            filtered_moods = []
-            moods_set = set()
-            for mood in detected_top_moods:
-                if mood != kw:
-                    if mood not in moods_set:
-                        filtered_moods.append(mood)
-                    moods_set.add(mood)
-                    if mood == "활기찬":
-                        moods_set.add("차분한")
-                    if mood == "차분한":
-                        moods_set.add("활기찬")
-            moods = ', '.join(filtered_moods)
-
-    elif kw in kw_middle:
-        top_keywords = analyze_mood(pil_image, label_pairs, 7)
-
-        for key in top_keywords:
-            top_mood.append(find_mood(key))
-            top_mood_specific.append(feedback_guide[find_mood(key)]["keywords"][key])
-
-        # 성공 여부 판단
-        if top_mood[0] == kw or sum(k == kw for k in top_mood[:5]) >= 2:
-            is_success = True
-        elif sum(k == kw for k in top_mood) >= 2:
-            is_success = True
-        elif kw in top_mood:
-            detected_top_moods = top_mood[:3]
-            filtered_moods = []
-            moods_set = set()
-            for mood in detected_top_moods:
-                if mood != kw:
-                    if mood not in moods_set:
-                        filtered_moods.append(mood)
-                    moods_set.add(mood)
-                    if mood == "활기찬":
-                        moods_set.add("차분한")
-                    if mood == "차분한":
-                        moods_set.add("활기찬")
-            moods = ', '.join(filtered_moods)
-        else:
-            detected_top_moods = top_mood
-            filtered_moods = []
-            moods_set = set()
-            for mood in detected_top_moods:
-                if mood != kw:
-                    if mood not in moods_set:
-                        filtered_moods.append(mood)
-                    moods_set.add(mood)
-                    if mood == "활기찬":
-                        moods_set.add("차분한")
-                    if mood == "차분한":
-                        moods_set.add("활기찬")
-            moods = ', '.join(filtered_moods)
-
-    elif kw in kw_weak:
-        top_keywords = analyze_mood(pil_image, label_pairs, 9)
-
-        for key in top_keywords:
-            top_mood.append(find_mood(key))
-            top_mood_specific.append(feedback_guide[find_mood(key)]["keywords"][key])
-
-        # 성공 여부 판단
-        if top_mood[0] == kw or sum(k == kw for k in top_mood[:7]) >= 2:
-            is_success = True
-        elif kw in top_mood[:7]:
-            is_success = True
-        elif kw in top_mood:
-            detected_top_moods = top_mood[:3]
-            filtered_moods = []
-            moods_set = set()
-            for mood in detected_top_moods:
-                if mood != kw:
-                    if mood not in moods_set:
-                        filtered_moods.append(mood)
-                    moods_set.add(mood)
-                    if mood == "활기찬":
-                        moods_set.add("차분한")
-                    if mood == "차분한":
-                        moods_set.add("활기찬")
-            moods = ', '.join(filtered_moods)
-        else:
-            detected_top_moods = top_mood
-            filtered_moods = []
-            moods_set = set()
-            # 활기찬, 차분한 대조가 됨
-            # 둘 중에 하나라도 먼저 나오면 그 다음부터는 그냥 추가를 안하는걸로 
-            for mood in detected_top_moods:
-                if mood != kw:
-                    if mood not in moods_set:
-                        filtered_moods.append(mood)
-                    moods_set.add(mood)
-                    if mood == "활기찬":
-                        moods_set.add("차분한")
-                    if mood == "차분한":
-                        moods_set.add("활기찬")
-            moods = ', '.join(filtered_moods)
-    
-    # 감정 정보 반환 (힌트 생성용)
-    if not is_success:
-        clip_info.append({
-            "question": f"이 장소에서 {kw} 분위기가 느껴지나요?",
-            "model_answer": f"아니요, 이 장소는 {moods} 분위기 순서대로 더 강하게 느껴져요.",
-            "expected_answer": f"네, 이 장소는 {kw} 분위기가 느껴져요.",
-        })
-    return is_success, clip_info
+    # 이미지당 한 번 계산한 분위기 프로필로 키워드 강도(strong/middle/weak)별 규칙 판정
+    profile = get_mood_profiles([pil_image])[0]
+    is_success, moods = judge_mood(kw, profile)
+    return is_success, make_clip_info(kw, is_success, moods)
+
+
+def check_with_clip_batch(images, kws):
+    """
+    여러 요청의 이미지를 한 번의 CLIP forward로 묶어 판정합니다. (inference_queue에서 사용)
+
+    Args:
+        images (list): 이미지 파일 경로, ImageContext 또는 PIL Image 객체 리스트
+        kws (list): 이미지별 목표 감정/분위기 키워드 리스트
+
+    Returns:
+        list: 이미지 순서대로 check_with_clip()과 같은 (is_success, clip_info) 튜플
+              (이미지를 열 수 없는 요청은 (False, []))
+    """
+    results = [(False, [])] * len(images)
+
+    # 이미지 로드 (실패한 요청은 (False, [])로 남김 - 같은 배치의 다른 요청에 영향 없음)
+    valid = []  # (요청 번호, PIL Image)
+    for i, image in enumerate(images):
+        try:
+            valid.append((i, to_pil(image)))
+        except Exception as e:
+            print(f"Error loading image '{image}': {e}")
+
+    if not valid:
+        return results
+
+    profiles = get_mood_profiles([pil_image for _, pil_image in valid])
+    print(f"CLIP batch: {len(valid)} images analyzed in one forward pass.")
+
+    for (i, _), profile in zip(valid, profiles):
+        kw = kws[i]
+        is_success, moods = judge_mood(kw, profile)
+        results[i] = (is_success, make_clip_info(kw, is_success, moods))
+    return results
         
         
 if __name__ == "__main__":
@@ -238,3 +403,8 @@ if __name__ == "__main__":
     is_success, clip_info = check_with_clip(image, kw)
     print(is_success)
     print('\n', clip_info)
+
+    # 같은 프로필로 모든 키워드 판정 (CLIP은 다시 실행되지 않음)
+    profile = get_mood_profiles([image])[0]
+    print('\n', mood_scores(profile))
+    print(match_all_keywords(profile))
@@ -0,0 +1,240 @@
+# models/hint_cache.py
+"""
+LLM 힌트를 (정답, 실패 시그니처) 단위로 SQLite 파일에 보관합니다.
+
+- BLIP: 틀린 질문을 rank_failed_questions로 변별력 순 정렬/중복 제거한 목록(프롬프트에 들어가는 목록)의 상위 k개
+  (blip_hint_key가 이 목록을 blip_signature로 해시)
+- CLIP: 감지된 다른 분위기 순서 (detected_moods)
+- 키마다 힌트 변형을 여러 개 모아 두고, 다 모이면 그중 하나를 골라 반환 (같은 힌트만 반복되지 않도록)
+- 같은 키의 동시 요청은 한 번의 LLM 호출로 묶음 (프로세스 내)
+"""
+
+import os
+import json
+import time
+import random
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import Future
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ======================================
+# ✅ 설정
+# ======================================
+HINT_CACHE_FILE = os.getenv("HINT_CACHE_FILE", os.path.join(PROJECT_ROOT, "data", "hint_cache.sqlite3"))
+# 보관할 최대 키 수 (넘으면 가장 오래 쓰지 않은 키부터 삭제)
+HINT_CACHE_SIZE = int(os.getenv("HINT_CACHE_SIZE", "5000"))
+# 키당 모아 둘 힌트 변형 수 (0이면 캐시 사용 안 함)
+HINT_VARIANTS = int(os.getenv("HINT_VARIANTS", "3"))
+# BLIP 시그니처에 쓰는 틀린 질문 수
+HINT_SIGNATURE_TOP_K = int(os.getenv("HINT_SIGNATURE_TOP_K", "5"))
+
+
+# =====================================
+# 실패 시그니처
+# =====================================
+
+def normalize_text(text):
+    return " ".join(str(text).lower().split())
+
+
+def blip_signature(failed_questions, top_k=HINT_SIGNATURE_TOP_K):
+    """
+    BLIP 틀린 질문 리스트의 정규화된 시그니처를 만듭니다.
+
+    Args:
+        failed_questions (list): [{"question", "expected_answer", "model_answer"}, ...]
+            (rank_failed_questions로 정렬된 목록)
+        top_k (int): 시그니처에 포함할 상위 틀린 질문 수
+
+    Returns:
+        str: 시그니처 해시 (틀린 질문이 없으면 "none")
+    """
+    items = sorted(
+        f"{normalize_text(item.get('question', ''))}={normalize_text(item.get('expected_answer', ''))}"
+        for item in (failed_questions or [])[:top_k]
+    )
+    if not items:
+        return "none"
+    return hashlib.sha1("\n".join(items).encode("utf-8")).hexdigest()[:16]
+
+
+def clip_signature(clip_info):
+    """
+    CLIP 판정 정보의 시그니처 (감지된 분위기 순서를 그대로 사용)
+
+    Returns:
+        str: 예) "활기찬>신비로운" (정보가 없으면 "none")
+    """
+    if not clip_info:
+        return "none"
+    moods = clip_info[0].get("detected_moods")
+    if moods is None:
+        # detected_moods가 없는 이전 형식은 모델 답변 문장으로 대신
+        return hashlib.sha1(normalize_text(clip_info[0].get("model_answer", "")).encode("utf-8")).hexdigest()[:16]
+    return ">".join(moods) or "none"
+
+
+def make_hint_key(kind, answer, signature):
+    """(힌트 종류, 정답, 실패 시그니처) 캐시 키"""
+    return f"{kind}|{answer}|{signature}"
+
+
+# =====================================
+# SQLite 힌트 캐시
+# =====================================
+
+class HintCache:
+    """키별 힌트 변형 풀을 SQLite 파일에 보관하는 LRU 캐시"""
+
+    def __init__(self, path, max_keys, variants):
+        self.path = path
+        self.max_keys = max_keys
+        self.variants = variants
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+        self._inflight = {}  # key -> Future (같은 키의 동시 요청 묶기)
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _connect(self):
+        """프로세스마다 연결을 한 번 엽니다. (fork 전에 연 연결은 재사용하지 않음, _lock 보유 상태에서 호출)"""
+        if self._conn is None or self._conn_pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")  # 여러 워커 프로세스가 동시에 읽고 쓰기
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS hints ("
+                " key TEXT PRIMARY KEY, hints TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS hints_last_used ON hints (last_used)")
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def get_variants(self, key):
+        """키에 저장된 힌트 변형 리스트를 반환하고 사용 시각을 갱신합니다."""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT hints FROM hints WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return []
+            conn.execute("UPDATE hints SET last_used = ? WHERE key = ?", (time.time(), key))
+            return json.loads(row[0])
+
+    def add_variant(self, key, hint):
+        """힌트 변형을 추가하고, 키 수가 넘치면 가장 오래 쓰지 않은 키부터 삭제합니다."""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")  # 다른 워커의 추가와 겹치지 않도록
+            try:
+                row = conn.execute("SELECT hints FROM hints WHERE key = ?", (key,)).fetchone()
+                hints = json.loads(row[0]) if row else []
+                if hint not in hints:
+                    hints = (hints + [hint])[-self.variants:]
+                conn.execute(
+                    "INSERT OR REPLACE INTO hints (key, hints, last_used) VALUES (?, ?, ?)",
+                    (key, json.dumps(hints, ensure_ascii=False), time.time()),
+                )
+                conn.execute(
+                    "DELETE FROM hints WHERE key NOT IN"
+                    " (SELECT key FROM hints ORDER BY last_used DESC LIMIT ?)",
+                    (self.max_keys,),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def lookup(self, key):
+        """
+        변형이 다 모였으면 그중 하나를 반환합니다.
+
+        Returns:
+            tuple: (hint, variants) - hint가 None이면 새 변형을 생성해야 함
+        """
+        variants = self.get_variants(key)
+        hit = bool(variants) and len(variants) >= self.variants
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return (random.choice(variants) if hit else None), variants
+
+    def get_or_create(self, key, create):
+        """
+        캐시된 힌트를 반환하거나, create()로 새 변형을 만들어 저장합니다.
+        같은 키를 이미 생성 중인 요청이 있으면 그 결과를 함께 사용합니다.
+
+        Args:
+            key (str): make_hint_key()로 만든 키
+            create (callable): 힌트 문자열을 반환하는 함수 (실패하면 예외)
+
+        Returns:
+            str: 힌트 메시지
+        """
+        if self.variants <= 0:
+            return create()
+
+        hint, variants = self.lookup(key)
+        if hint is not None:
+            return hint
+
+        with self._lock:
+            pending = self._inflight.get(key)
+            owner = pending is None
+            if owner:
+                pending = Future()
+                self._inflight[key] = pending
+            else:
+                self.coalesced += 1
+        if not owner:
+            return pending.result()
+
+        try:
+            hint = create()
+            self.add_variant(key, hint)
+            pending.set_result(hint)
+            return hint
+        except Exception as e:
+            if variants:
+                # 생성 실패 시 모아 둔 변형이 있으면 그것을 사용
+                hint = random.choice(variants)
+                pending.set_result(hint)
+                return hint
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def record_coalesced(self):
+        """진행 중인 생성에 묶인 요청 수를 더합니다. (외부 힌트 저장소의 묶음 처리용)"""
+        with self._lock:
+            self.coalesced += 1
+
+    def stats(self):
+        """적중/미스/묶인 요청 수와 저장된 키 수를 반환합니다."""
+        with self._lock:
+            conn = self._connect()
+            size = conn.execute("SELECT COUNT(*) FROM hints").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "coalesced": self.coalesced,
+                "inflight": len(self._inflight),
+                "size": size,
+                "max_size": self.max_keys,
+                "variants": self.variants,
+            }
+
+
+# ✅ 서버 시작 시 캐시 객체 생성 (DB 연결은 첫 사용 시 프로세스별로 열림)
+hint_cache = HintCache(HINT_CACHE_FILE, HINT_CACHE_SIZE, HINT_VARIANTS)
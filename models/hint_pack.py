@@ -0,0 +1,259 @@
+# models/hint_pack.py
+"""
+자주 나오는 실패 시그니처의 힌트를 미리 만들어 두는 힌트 팩
+
+- 생성 (이벤트 전에 오프라인으로 실행):
+    python models/hint_pack.py [--concurrency 4] [--variants 3] [--mood-depth 3] [--limit N] [--output 경로]
+- 서버: 시작 시 data/hint_pack.json을 읽고, 팩에 있는 시그니처는 LLM을 호출하지 않고 팩의 힌트를 사용
+
+BLIP 시그니처는 data/ 참조 사진을 다른 랜드마크의 질문 목록으로 검사해서,
+CLIP 시그니처는 config/keyword.py의 분위기 순열과 참조 사진의 실제 판정 결과로 모읍니다.
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+import itertools
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+from models.hint_cache import HINT_SIGNATURE_TOP_K
+from result_cache import DATA_VERSION
+
+# ======================================
+# ✅ 설정
+# ======================================
+HINT_PACK_FILE = os.getenv("HINT_PACK_FILE", os.path.join(PROJECT_ROOT, "data", "hint_pack.json"))
+# 팩 파일 형식 버전 (형식이나 시그니처 계산이 바뀌면 이전 팩은 읽지 않음)
+# 2: BLIP 시그니처를 변별력 순으로 고른 틀린 질문으로 계산
+HINT_PACK_FORMAT = 2
+
+
+# =====================================
+# 실패 시그니처 모으기
+# =====================================
+
+def add_case(cases, key, kind, answer, failure_info):
+    """시그니처별로 한 번만 저장하고, 몇 번 관찰되었는지 셉니다."""
+    if key in cases:
+        cases[key]["count"] += 1
+    else:
+        cases[key] = {"kind": kind, "answer": answer, "failure_info": failure_info, "count": 1}
+
+
+def collect_blip_cases(cases):
+    """
+    참조 사진을 자기 랜드마크가 아닌 다른 랜드마크로 검사해 BLIP 실패 시그니처를 모읍니다.
+    (mission_manager.run_mission1과 같이 랜드마크 게이트를 먼저 적용)
+    """
+    from models.blip_module import blip_hint_questions, check_with_blip, landmark_qa_data
+    from models.clip_landmark_gate import gate_landmark, list_reference_photos
+    from models.llm_hint_generator import blip_hint_key
+    from utils.image_context import to_pil
+
+    for landmark in landmark_qa_data:
+        # 틀린 질문이 하나도 없는 경우 (게이트에서 걸러졌지만 상위 질문은 모두 맞힌 경우 등)
+        add_case(cases, blip_hint_key(landmark, []), "blip", landmark, [])
+
+    # 미션 랜드마크 폴더만 사용 (피노키오 ↔ 창틀 피노키오처럼 겹치는 폴더를 "다른 랜드마크"로 검사하지 않음)
+    photos = list_reference_photos(landmarks=list(landmark_qa_data))
+    for i, (photo_landmark, path) in enumerate(photos, 1):
+        print(f"[BLIP {i}/{len(photos)}] {path}")
+        image = to_pil(path)
+        for landmark in landmark_qa_data:
+            if landmark == photo_landmark:
+                continue
+            passed, _ = gate_landmark(image, landmark)
+            is_success, failed = check_with_blip(image, landmark) if passed else (False, blip_hint_questions(image, landmark))
+            if not is_success:
+                add_case(cases, blip_hint_key(landmark, failed), "blip", landmark, failed)
+
+
+def collect_clip_cases(cases, mood_depth):
+    """
+    정답이 아닌 분위기의 순열(길이 mood_depth까지)과 참조 사진의 실제 판정 결과로
+    CLIP 실패 시그니처를 모읍니다.
+    """
+    from config.keyword import keyword_mapping
+    from models.clip_module import make_clip_info, get_mood_profiles, judge_mood
+    from models.clip_landmark_gate import list_reference_photos
+    from models.llm_hint_generator import clip_hint_key
+    from utils.image_context import to_pil
+
+    moods = list(keyword_mapping)
+    for kw in moods:
+        others = [mood for mood in moods if mood != kw]
+        for depth in range(1, mood_depth + 1):
+            for detected in itertools.permutations(others, depth):
+                # 활기찬/차분한은 서로 대조되므로 함께 감지된 것으로 나오지 않음 (filter_other_moods)
+                if "활기찬" in detected and "차분한" in detected:
+                    continue
+                clip_info = make_clip_info(kw, False, ", ".join(detected))
+                add_case(cases, clip_hint_key(kw, clip_info), "clip", kw, clip_info)
+
+    photos = list_reference_photos()
+    for i, (_, path) in enumerate(photos, 1):
+        print(f"[CLIP {i}/{len(photos)}] {path}")
+        profile = get_mood_profiles([to_pil(path)])[0]
+        for kw in moods:
+            is_success, detected = judge_mood(kw, profile)
+            if not is_success:
+                clip_info = make_clip_info(kw, False, detected)
+                add_case(cases, clip_hint_key(kw, clip_info), "clip", kw, clip_info)
+
+
+# =====================================
+# 힌트 생성 및 팩 저장
+# =====================================
+
+def generate_hints(cases, variants, concurrency):
+    """
+    시그니처마다 힌트 변형을 variants개씩 생성합니다. (동시 요청은 concurrency개까지)
+
+    Returns:
+        tuple: (hints, failures) - hints는 {키: [힌트, ...]}
+    """
+    from models.llm_hint_generator import build_blip_messages, build_clip_messages, request_hint
+
+    hints = {key: [] for key in cases}
+    failures = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {}
+        for key, case in cases.items():
+            build_messages = build_blip_messages if case["kind"] == "blip" else build_clip_messages
+            messages = build_messages(case["answer"], case["failure_info"])
+            for _ in range(variants):
+                futures[executor.submit(request_hint, messages)] = key
+
+        for done, future in enumerate(as_completed(futures), 1):
+            key = futures[future]
+            try:
+                hint = future.result()
+                if hint and hint not in hints[key]:
+                    hints[key].append(hint)
+            except Exception as e:
+                failures += 1
+                print(f"❌ 힌트 생성 실패 ({key}): {e}")
+            if done % 50 == 0 or done == len(futures):
+                print(f"힌트 생성 진행: {done}/{len(futures)} (실패 {failures})")
+
+    return {key: texts for key, texts in hints.items() if texts}, failures
+
+
+def write_pack(hints, output):
+    """힌트 팩을 임시 파일에 쓴 뒤 교체합니다. (서버가 반쯤 쓰인 파일을 읽지 않도록)"""
+    from models.llm_hint_generator import MODEL_NAME
+
+    pack = {
+        "format": HINT_PACK_FORMAT,
+        "version": datetime.now().strftime("%Y%m%d-%H%M%S"),
+        "data_version": DATA_VERSION,
+        "model": MODEL_NAME,
+        "signature_top_k": HINT_SIGNATURE_TOP_K,
+        "hints": hints,
+    }
+    tmp_path = f"{output}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(pack, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, output)
+    return pack
+
+
+def build_pack(output=HINT_PACK_FILE, variants=3, concurrency=4, mood_depth=3, limit=None):
+    """실패 시그니처를 모으고 힌트를 생성해 팩으로 저장합니다."""
+    cases = {}
+    collect_clip_cases(cases, mood_depth)
+    collect_blip_cases(cases)
+
+    # 자주 관찰된 시그니처부터 (limit이 있으면 상위 limit개만)
+    ordered = sorted(cases.items(), key=lambda item: -item[1]["count"])
+    if limit:
+        ordered = ordered[:limit]
+    cases = dict(ordered)
+    print(f"✅ 실패 시그니처 {len(cases)}개 (BLIP {sum(c['kind'] == 'blip' for c in cases.values())}개)")
+
+    hints, failures = generate_hints(cases, variants, concurrency)
+    pack = write_pack(hints, output)
+    print(f"✅ 힌트 팩 저장 완료: {output} (버전 {pack['version']}, 시그니처 {len(hints)}개, 실패 {failures}건)")
+
+
+# =====================================
+# 서버에서 팩 사용
+# =====================================
+
+def load_hint_pack(path=HINT_PACK_FILE):
+    """
+    힌트 팩을 읽습니다. 파일이 없거나 형식이 다르면 빈 팩을 사용합니다.
+
+    Returns:
+        dict: {키: [힌트, ...]}
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            pack = json.load(f)
+    except Exception as e:
+        print(f"⚠️ 힌트 팩을 읽을 수 없습니다 ({path}): {e}")
+        return {}
+
+    if pack.get("format") != HINT_PACK_FORMAT:
+        print(f"⚠️ 힌트 팩 형식이 다릅니다 ({pack.get('format')} != {HINT_PACK_FORMAT}). 사용하지 않습니다.")
+        return {}
+
+    hints = pack.get("hints", {})
+    if pack.get("signature_top_k") != HINT_SIGNATURE_TOP_K:
+        # BLIP 시그니처 계산이 달라 맞을 수 없는 키는 제외
+        print("⚠️ 힌트 팩의 BLIP 시그니처 설정이 달라 BLIP 힌트는 사용하지 않습니다.")
+        hints = {key: value for key, value in hints.items() if not key.startswith("blip|")}
+    if pack.get("data_version") != DATA_VERSION:
+        print("⚠️ 힌트 팩 생성 후 Q&A/키워드 데이터가 바뀌었습니다. 팩을 다시 생성하세요.")
+
+    print(f"✅ 힌트 팩 로드 완료: 버전 {pack.get('version')}, 시그니처 {len(hints)}개")
+    return hints
+
+
+# ✅ 서버 시작 시 힌트 팩 로드
+hint_pack = load_hint_pack()
+pack_stats = {"hits": 0, "misses": 0}
+stats_lock = threading.Lock()
+
+
+def pack_hint(key):
+    """팩에 있는 시그니처면 힌트 변형 중 하나를, 없으면 None을 반환합니다."""
+    variants = hint_pack.get(key)
+    with stats_lock:
+        pack_stats["hits" if variants else "misses"] += 1
+    if not variants:
+        return None
+    return random.choice(variants)
+
+
+def pack_report():
+    """힌트 팩 적중 통계"""
+    with stats_lock:
+        stats = dict(pack_stats)
+    total = stats["hits"] + stats["misses"]
+    return {
+        **stats,
+        "hit_rate": stats["hits"] / total if total else 0.0,
+        "size": len(hint_pack),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="실패 시그니처별 힌트 팩 생성")
+    parser.add_argument("--output", default=HINT_PACK_FILE, help="저장할 팩 파일 경로")
+    parser.add_argument("--variants", type=int, default=3, help="시그니처당 힌트 변형 수")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시 LLM 요청 수")
+    parser.add_argument("--mood-depth", type=int, default=3, help="분위기 순열의 최대 길이")
+    parser.add_argument("--limit", type=int, default=None, help="자주 나오는 시그니처 상위 N개만 생성")
+    args = parser.parse_args()
+
+    build_pack(args.output, args.variants, args.concurrency, args.mood_depth, args.limit)
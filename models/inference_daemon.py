@@ -0,0 +1,243 @@
+# models/inference_daemon.py
+"""
+BLIP/CLIP 추론을 웹 프로세스 밖의 로컬 데몬에서 실행합니다.
+
+- 데몬 실행: python models/inference_daemon.py  (웹 서버와 별도로 재시작 가능)
+- 웹 프로세스: INFERENCE_DAEMON=1 이면 mission_manager가 아래 *_remote 함수를 사용
+- 디코딩된 이미지(uint8 H x W x 3)는 공유 메모리로 넘기고, 요청/결과는 Unix 소켓으로 주고받습니다.
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import struct
+import socket
+import socketserver
+from multiprocessing import shared_memory, resource_tracker
+
+import numpy as np
+from PIL import Image
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+from utils.image_context import to_pil
+
+# ======================================
+# ✅ 설정
+# ======================================
+SOCKET_PATH = os.getenv("INFERENCE_SOCKET", "/tmp/pazule_inference.sock")
+# 데몬 재시작 중이면 이 시간 동안 다시 연결을 시도
+CONNECT_TIMEOUT = float(os.getenv("INFERENCE_CONNECT_TIMEOUT", "10"))
+# 추론 결과를 기다리는 최대 시간 (초)
+REQUEST_TIMEOUT = float(os.getenv("INFERENCE_REQUEST_TIMEOUT", "120"))
+
+
+# =====================================
+# 메시지 주고받기 (4바이트 길이 + JSON)
+# =====================================
+
+def send_message(sock, message):
+    payload = json.dumps(message, ensure_ascii=False).encode("utf-8")
+    sock.sendall(struct.pack(">I", len(payload)) + payload)
+
+
+def recv_exact(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("추론 데몬 연결이 끊어졌습니다.")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_message(sock):
+    (length,) = struct.unpack(">I", recv_exact(sock, 4))
+    return json.loads(recv_exact(sock, length).decode("utf-8"))
+
+
+# =====================================
+# 데몬 (모델을 로드하고 요청을 처리)
+# =====================================
+
+def attach_image(name, shape):
+    """클라이언트가 만든 공유 메모리의 이미지를 PIL Image로 복사해 옵니다."""
+    try:
+        shm = shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        # 공유 메모리의 해제는 만든 쪽(웹 프로세스)이 담당
+        resource_tracker.unregister(shm._name, "shared_memory")
+    try:
+        array = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        return Image.fromarray(array.copy(), "RGB")
+    finally:
+        shm.close()
+
+
+def load_handlers():
+    """데몬 프로세스에서만 모델을 로드하고 요청 종류별 처리 함수를 만듭니다."""
+    if os.getenv("INFERENCE_QUEUE", "0") == "1":
+        # 여러 웹 워커의 동시 요청을 데몬 안에서 마이크로 배치로 묶음
+        from models.inference_queue import check_with_blip_queued as check_with_blip
+        from models.inference_queue import check_with_clip_queued as check_with_clip
+    else:
+        from models.blip_module import check_with_blip
+        from models.clip_module import check_with_clip
+    from models.blip_module import blip_hint_questions
+    from models.clip_module import describe_mood
+    from models.clip_landmark_gate import gate_landmark, gate_report
+
+    return {
+        "blip": lambda image, arg: check_with_blip(image, arg),
+        "blip_hint": lambda image, arg: blip_hint_questions(image, arg),
+        "clip": lambda image, arg: check_with_clip(image, arg),
+        "gate": lambda image, arg: gate_landmark(image, arg),
+        "mood": lambda image, arg: describe_mood(image),
+        "gate_report": lambda image, arg: gate_report(),
+        "ping": lambda image, arg: {"pid": os.getpid()},
+    }
+
+
+class InferenceRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = recv_message(self.request)
+            handler = self.server.handlers[request["op"]]
+            image = None
+            if request.get("shm"):
+                image = attach_image(request["shm"], tuple(request["shape"]))
+            result = handler(image, request.get("arg"))
+            send_message(self.request, {"ok": True, "result": result})
+        except Exception as e:
+            print(f"❌ 추론 데몬 요청 처리 오류: {e}")
+            try:
+                send_message(self.request, {"ok": False, "error": str(e)})
+            except OSError:
+                pass
+
+
+class InferenceDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(socket_path=SOCKET_PATH):
+    """모델을 로드한 뒤 Unix 소켓에서 요청을 기다립니다."""
+    handlers = load_handlers()
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)  # 이전 실행이 남긴 소켓 파일
+
+    with InferenceDaemon(socket_path, InferenceRequestHandler) as server:
+        server.handlers = handlers
+        os.chmod(socket_path, 0o660)
+
+        def stop(signum, frame):
+            print("🛑 추론 데몬 종료 중...")
+            sys.exit(0)
+
+        signal.signal(signal.SIGTERM, stop)
+        print(f"✅ 추론 데몬 대기 중: {socket_path} (pid {os.getpid()})")
+        try:
+            server.serve_forever()
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+
+
+# =====================================
+# 클라이언트 (웹 프로세스, 모델을 로드하지 않음)
+# =====================================
+
+def connect(socket_path=SOCKET_PATH):
+    """데몬에 연결합니다. 데몬이 재시작 중이면 CONNECT_TIMEOUT 동안 다시 시도합니다."""
+    deadline = time.monotonic() + CONNECT_TIMEOUT
+    while True:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(socket_path)
+            sock.settimeout(REQUEST_TIMEOUT)
+            return sock
+        except (FileNotFoundError, ConnectionRefusedError):
+            sock.close()
+            if time.monotonic() >= deadline:
+                raise ConnectionError(f"추론 데몬에 연결할 수 없습니다: {socket_path}")
+            time.sleep(0.2)
+
+
+def call_daemon(op, image=None, arg=None):
+    """
+    이미지를 공유 메모리에 올리고 데몬에 요청을 보낸 뒤 결과를 받습니다.
+
+    Args:
+        op (str): 요청 종류 ("blip", "blip_hint", "clip", "gate", "mood", "gate_report", "ping")
+        image (str or ImageContext or PIL.Image, optional): 입력 이미지
+        arg (str, optional): 정답 랜드마크 또는 분위기 키워드
+
+    Returns:
+        데몬 처리 함수의 반환값 (JSON 변환 결과)
+    """
+    shm = None
+    request = {"op": op, "arg": arg}
+    try:
+        if image is not None:
+            array = np.asarray(to_pil(image), dtype=np.uint8)
+            shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            np.ndarray(array.shape, dtype=np.uint8, buffer=shm.buf)[:] = array
+            request.update({"shm": shm.name, "shape": list(array.shape)})
+
+        with connect() as sock:
+            send_message(sock, request)
+            response = recv_message(sock)
+    finally:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    if not response["ok"]:
+        raise RuntimeError(f"추론 데몬 오류: {response['error']}")
+    return response["result"]
+
+
+def check_with_blip_remote(user_image_path, landmark_name, progress=None):
+    """check_with_blip과 같은 시그니처로, 추론 데몬에서 실행합니다. (질문별 진행률은 보고하지 않음)"""
+    is_success, incorrect_list = call_daemon("blip", user_image_path, landmark_name)
+    return is_success, incorrect_list
+
+
+def blip_hint_questions_remote(image, landmark_name):
+    """blip_hint_questions과 같은 시그니처로, 추론 데몬에서 실행합니다."""
+    return call_daemon("blip_hint", image, landmark_name)
+
+
+def check_with_clip_remote(image, kw):
+    """check_with_clip과 같은 시그니처로, 추론 데몬에서 실행합니다."""
+    is_success, clip_info = call_daemon("clip", image, kw)
+    return is_success, clip_info
+
+
+def gate_landmark_remote(image, landmark_name):
+    """gate_landmark과 같은 시그니처로, 추론 데몬에서 실행합니다."""
+    passed, gate_info = call_daemon("gate", image, landmark_name)
+    return passed, gate_info
+
+
+def describe_mood_remote(image):
+    """describe_mood과 같은 시그니처로, 추론 데몬에서 실행합니다."""
+    return call_daemon("mood", image)
+
+
+def gate_report_remote():
+    """gate_report과 같은 시그니처로, 추론 데몬에서 실행합니다."""
+    return call_daemon("gate_report")
+
+
+if __name__ == "__main__":
+    # 웹 서버와 별도로 실행: python models/inference_daemon.py
+    serve()
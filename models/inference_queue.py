@@ -0,0 +1,132 @@
+# models/inference_queue.py
+
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+from models.blip_module import check_with_blip_batch
+from models.clip_module import check_with_clip_batch
+
+
+# --- 마이크로 배치 설정 ---
+# 한 번의 forward에 묶을 최대 요청 수
+MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "8"))
+# 다른 요청이 대기 중일 때 배치를 채우기 위해 더 기다리는 최대 시간 (초)
+MAX_WAIT = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10")) / 1000.0
+# 요청 하나가 배치 결과를 기다리는 최대 시간 (초) - 넘으면 TimeoutError
+SUBMIT_TIMEOUT = float(os.getenv("INFERENCE_SUBMIT_TIMEOUT", "120"))
+
+
+class MicroBatchScheduler:
+    """
+    여러 Flask 요청 스레드가 보낸 추론 요청을 모아 한 번의 배치 forward로 실행합니다.
+
+    - 대기 중인 요청이 없으면 바로 실행하므로 트래픽이 적을 때 지연이 늘지 않습니다.
+    - 이미 다른 요청이 쌓여 있으면 max_wait 동안 max_batch_size까지 모아서 실행합니다.
+    - 모델 호출은 항상 이 스케줄러의 워커 스레드 하나에서만 일어납니다.
+    """
+
+    def __init__(self, name, batch_fn, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_WAIT, timeout=SUBMIT_TIMEOUT):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.stats = {"requests": 0, "batches": 0, "max_batch": 0}
+
+    def _ensure_worker(self):
+        """워커 스레드를 처음 요청 시에 시작합니다. (fork된 프로세스에서도 새로 시작)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name=f"{self.name}-batcher", daemon=True
+            )
+            self._thread.start()
+
+    def submit(self, *args):
+        """
+        요청 하나를 큐에 넣고 배치 실행 결과가 나올 때까지 기다립니다.
+
+        Raises:
+            concurrent.futures.TimeoutError: timeout초 안에 결과가 나오지 않았을 때
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((args, future))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()  # 아직 배치에 들어가지 않았으면 실행하지 않음
+            raise
+
+    def _collect_batch(self):
+        """첫 요청을 기다린 뒤, 이미 쌓인 요청이 있을 때만 max_wait 동안 배치를 채웁니다."""
+        batch = [self._queue.get()]
+
+        # 대기 중인 요청이 없으면 바로 실행 (저부하 시 지연 증가 없음)
+        if self._queue.empty():
+            return batch
+
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # 기다리다 시간 초과로 취소된 요청은 빼고 실행
+            batch = [
+                (args, future) for args, future in self._collect_batch() if future.set_running_or_notify_cancel()
+            ]
+            if not batch:
+                continue
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+
+            try:
+                # 요청별 인자를 위치별 리스트로 모아 배치 함수에 전달
+                columns = [list(column) for column in zip(*(args for args, _ in batch))]
+                results = list(self.batch_fn(*columns))
+                if len(results) != len(batch):
+                    # 결과가 모자라면 남은 요청이 영원히 기다리지 않도록 모두 오류로 끝냄
+                    raise RuntimeError(f"배치 결과 수 불일치: 요청 {len(batch)}개, 결과 {len(results)}개")
+            except Exception as e:
+                print(f"❌ [{self.name}] 배치 추론 오류: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+# --- 모델별 스케줄러 ---
+blip_scheduler = MicroBatchScheduler("blip", check_with_blip_batch)
+clip_scheduler = MicroBatchScheduler("clip", check_with_clip_batch)
+
+
+def check_with_blip_queued(user_image, landmark_name, progress=None):
+    """check_with_blip과 같은 시그니처로, 마이크로 배치 큐를 거쳐 실행합니다. (질문별 진행률은 보고하지 않음)"""
+    return blip_scheduler.submit(user_image, landmark_name)
+
+
+def check_with_clip_queued(image, kw):
+    """check_with_clip과 같은 시그니처로, 마이크로 배치 큐를 거쳐 실행합니다."""
+    return clip_scheduler.submit(image, kw)
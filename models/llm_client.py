@@ -0,0 +1,230 @@
+# models/llm_client.py
+"""
+힌트 생성용 LLM 호출 계층
+
+- 호출마다 전체 마감 시간(재시도 포함)과 시도별 타임아웃
+- 연결 오류/429/5xx만 지수 백오프 + 지터로 재시도
+- 연속 실패가 쌓이면 서킷 브레이커가 열려 일정 시간 호출하지 않음 (호출부는 기본 힌트 사용)
+- 크기를 정한 HTTP 연결 풀을 keep-alive로 재사용
+"""
+
+import os
+import time
+import random
+import threading
+
+import httpx
+import openai
+from openai import OpenAI, DefaultHttpxClient
+from dotenv import load_dotenv
+
+# .env 파일 로드
+load_dotenv()
+
+# ======================================
+# ✅ 설정 (환경 변수로 변경 가능)
+# ======================================
+# 시도 1번의 타임아웃 (초) - 스트리밍은 조각 사이의 최대 대기 시간
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "6"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "2"))
+# 호출 1번의 전체 마감 시간 (재시도와 백오프 포함)
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "10"))
+# 재시도 횟수와 백오프 기본 간격 (초)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF = float(os.getenv("LLM_RETRY_BACKOFF", "0.3"))
+# 연속 실패가 이 횟수에 이르면 서킷을 열고, 이 시간(초) 뒤에 한 번 시험 호출
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+# HTTP 연결 풀 (프로세스당)
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "16"))
+LLM_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_KEEPALIVE_CONNECTIONS", "8"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+
+# 재시도할 오류 (연결 실패/타임아웃, 429, 5xx)
+RETRYABLE_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+
+class CircuitOpenError(Exception):
+    """서킷 브레이커가 열려 있어 LLM을 호출하지 않았을 때"""
+
+
+class CircuitBreaker:
+    """
+    연속 실패 횟수로 여닫는 서킷 브레이커
+    closed → (연속 실패 threshold회) → open → (cooldown 경과) → half_open (시험 호출 1번) → closed 또는 open
+    """
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_running = False
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """지금 호출해도 되는지 반환합니다."""
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self.trial_running:
+                self.trial_running = True
+                return True
+            self.rejected += 1
+            return False
+
+    def is_half_open(self):
+        """지금이 half_open 시험 호출 중인지 (allow()가 True를 반환한 호출에서 확인)"""
+        with self._lock:
+            return self.state == "half_open"
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                print("✅ LLM 서킷 브레이커 닫힘 (업스트림 복구)")
+            self.state = "closed"
+            self.failures = 0
+            self.trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    print(f"⚠️ LLM 서킷 브레이커 열림 (연속 실패 {self.failures}회, {self.cooldown:.0f}초 동안 기본 힌트 사용)")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+            self.trial_running = False
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "rejected": self.rejected,
+                "threshold": self.threshold,
+                "cooldown": self.cooldown,
+            }
+
+
+# ✅ 연결 풀을 명시한 HTTP 클라이언트 (연결은 첫 요청 때 열리므로 gunicorn fork 후에도 공유되지 않음)
+http_client = DefaultHttpxClient(
+    limits=httpx.Limits(
+        max_connections=LLM_POOL_SIZE,
+        max_keepalive_connections=LLM_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+    ),
+    timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+)
+# 재시도는 아래에서 직접 처리 (SDK 기본 재시도는 마감 시간을 모름)
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client, max_retries=0)
+breaker = CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_COOLDOWN)
+call_stats = {"calls": 0, "retries": 0, "failures": 0, "prompt_tokens": 0, "completion_tokens": 0}
+stats_lock = threading.Lock()
+
+
+def count_stat(name, amount=1):
+    """호출 통계를 더합니다. (힌트/작업 스레드 풀에서 동시에 호출됨)"""
+    with stats_lock:
+        call_stats[name] += amount
+
+
+def backoff_delay(attempt):
+    """지수 백오프에 full jitter를 적용한 대기 시간 (여러 워커가 동시에 재시도하지 않도록)"""
+    return random.uniform(0, LLM_RETRY_BACKOFF * (2 ** attempt))
+
+
+def create_completion(deadline=None, **kwargs):
+    """
+    마감 시간 안에서 재시도하며 chat.completions.create를 호출합니다.
+
+    Args:
+        deadline (float, optional): 전체 마감 시간 (초, 기본값 LLM_DEADLINE)
+        **kwargs: chat.completions.create 인자 (stream=True면 스트림 객체를 반환)
+
+    Returns:
+        ChatCompletion 또는 Stream
+
+    Raises:
+        CircuitOpenError: 서킷 브레이커가 열려 있을 때
+        TimeoutError: 재시도 중 마감 시간이 지났을 때
+        openai.APIError: 재시도 후에도 실패했거나 재시도할 수 없는 오류일 때
+    """
+    deadline_at = time.monotonic() + (LLM_DEADLINE if deadline is None else deadline)
+    count_stat("calls")
+
+    attempt = 0
+    last_error = None
+    while True:
+        if not breaker.allow():
+            if last_error is not None:
+                # 재시도 대기 중 다른 호출이 서킷을 열었음 - 실제 업스트림 오류를 그대로 전달
+                count_stat("failures")
+                raise last_error
+            raise CircuitOpenError("LLM 서킷 브레이커가 열려 있습니다.")
+        trial = breaker.is_half_open()
+
+        remaining = deadline_at - time.monotonic()
+        if remaining <= 0:
+            breaker.record_failure()
+            count_stat("failures")
+            raise TimeoutError("LLM 호출 마감 시간이 지났습니다.")
+
+        try:
+            response = client.with_options(timeout=min(LLM_TIMEOUT, remaining)).chat.completions.create(**kwargs)
+            breaker.record_success()
+            return response
+        except RETRYABLE_ERRORS as e:
+            delay = backoff_delay(attempt)
+            # 브레이커에는 호출 1번당 한 번만 실패로 기록 (재시도마다 세지 않음)
+            # half_open 시험 호출은 재시도하지 않고 실제 오류를 그대로 전달
+            if trial or attempt >= LLM_MAX_RETRIES or time.monotonic() + delay >= deadline_at:
+                breaker.record_failure()
+                count_stat("failures")
+                raise
+            last_error = e
+            print(f"⚠️ LLM 호출 재시도 ({attempt + 1}/{LLM_MAX_RETRIES}, {delay:.2f}초 후): {e}")
+            count_stat("retries")
+            attempt += 1
+            time.sleep(delay)
+        except openai.APIStatusError:
+            # 업스트림은 응답했지만 요청이 잘못된 경우 (400/401 등) - 재시도하지 않고 장애로 세지 않음
+            breaker.record_success()
+            count_stat("failures")
+            raise
+        except Exception:
+            breaker.record_failure()
+            count_stat("failures")
+            raise
+
+
+def record_stream_failure():
+    """스트림을 연 뒤 읽는 도중 실패했을 때 브레이커에 알립니다."""
+    breaker.record_failure()
+    count_stat("failures")
+
+
+def record_usage(usage):
+    """응답의 토큰 사용량을 로그로 남기고 누적합니다. (usage가 없으면 무시)"""
+    if usage is None:
+        return
+    count_stat("prompt_tokens", usage.prompt_tokens or 0)
+    count_stat("completion_tokens", usage.completion_tokens or 0)
+    print(f"🧮 LLM 토큰 사용량: 입력 {usage.prompt_tokens}, 출력 {usage.completion_tokens}")
+
+
+def client_stats():
+    """LLM 호출/재시도/실패 수, 누적 토큰 사용량, 서킷 브레이커 상태"""
+    with stats_lock:
+        stats = dict(call_stats)
+    return {
+        **stats,
+        "breaker": breaker.stats(),
+        "pool_size": LLM_POOL_SIZE,
+        "timeout": LLM_TIMEOUT,
+        "deadline": LLM_DEADLINE,
+    }
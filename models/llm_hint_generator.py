@@ -1,59 +1,36 @@
 # models/llm_hint_generator.py
 
 import os
-from openai import OpenAI
-from dotenv import load_dotenv
-
-# .env 파일 로드
-load_dotenv()
-
-# OpenAI 클라이언트 초기화
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+import re
+import sys
+import json
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+from models.hint_cache import hint_cache, make_hint_key, blip_signature, clip_signature
+from models.hint_pack import pack_hint
+from models.llm_client import create_completion, record_stream_failure, record_usage
+from config.keyword import feedback_guide
 
 # GPT 모델 설정
 MODEL_NAME = "gpt-4o-mini"
 
-
-def generate_blip_hint(answer, blip_failed_questions=None):
-    """
-    BLIP VQA에서 틀린 질문들을 바탕으로 추상적 힌트를 생성합니다.
-
-    Args:
-        answer (str): 정답 랜드마크 이름 (예: "네모탑")
-        blip_failed_questions (list): 틀린 질문 리스트
-            [{"question": str, "expected_answer": str, "model_answer": str}, ...]
-
-    Returns:
-        str: LLM이 생성한 힌트 메시지
-
-    Raises:
-        ValueError: OPENAI_API_KEY가 설정되지 않았을 때
-    """
-
-    # API 키 확인
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        print("⚠️ OPENAI_API_KEY가 설정되지 않았습니다. 기본 힌트를 사용합니다.")
-        return f"다시 한 번 주변을 둘러보세요. '{answer}'와 관련된 특별한 장소가 있을 거예요! 💡"
-
-    if blip_failed_questions is None:
-        blip_failed_questions = []
-
-    # 틀린 질문 정보를 텍스트로 포맷팅
-    failed_info = ""
-    if blip_failed_questions:
-        failed_info = "\n사용자 사진에서 부족한 특징 (BLIP VQA 결과):\n"
-        for i, item in enumerate(blip_failed_questions, 1):
-            question = item.get("question", "N/A")
-            expected_answer = item.get("expected_answer", "N/A")
-            model_answer = item.get("model_answer", "N/A")
-            failed_info += f'  {i}. 질문: "{question}"\n'
-            failed_info += f"     - 모델 답변: '{model_answer}', 기대 답변: '{expected_answer}'\n"
-    else:
-        failed_info = "\n사용자 사진에서 부족한 특징: (정보 없음)\n"
-
-    # 시스템 프롬프트
-    system_prompt = """당신은 파주 출판단지 보물찾기 게임의 힌트 제공자입니다.
+# 힌트 프롬프트에 넣을 BLIP 틀린 질문 최대 개수 (변별력 순 상위)
+HINT_MAX_FAILED_QUESTIONS = int(os.getenv("HINT_MAX_FAILED_QUESTIONS", "5"))
+# 질문별 변별력 점수 (tests/build_question_order.py로 생성, 없으면 질문 순서/확신도로 정렬)
+QUESTION_ORDER_FILE = os.path.join(PROJECT_ROOT, "data", "landmark_question_order.json")
+# 비슷한 질문을 묶을 때 무시하는 단어와 기준 (핵심 단어 자카드 유사도)
+QUESTION_STOPWORDS = {
+    "is", "are", "does", "do", "has", "have", "the", "a", "an", "s", "there", "any",
+    "in", "on", "of", "to", "it", "its", "this", "that", "photo", "image", "picture",
+}
+REDUNDANT_SIMILARITY = 0.6
+
+# ======================================
+# ✅ 시스템 프롬프트 (모듈 로드 시 한 번만 생성)
+# ======================================
+BLIP_SYSTEM_PROMPT = """당신은 파주 출판단지 보물찾기 게임의 힌트 제공자입니다.
 사용자가 촬영한 사진이 정답 랜드마크가 아닐 때, 추상적이고 창의적인 힌트를 제공하는 역할을 합니다.
 
 ### 힌트 작성 가이드라인:
@@ -88,68 +65,7 @@ def generate_blip_hint(answer, blip_failed_questions=None):
 - 부족한 특징(모델이 'no'라고 했지만 'yes'가 기대됨)은 간접적으로 암시하세요.
 """
 
-    # 사용자 프롬프트
-    user_prompt = f"""정답 랜드마크: {answer}
-{failed_info}
-
-위 정보를 바탕으로 사용자가 정답에 더 가까이 다가갈 수 있도록 추상적이고 창의적인 힌트를 생성해주세요."""
-
-    print(f"✅ LLM 힌트 생성 시도 (API 키 설정됨, 길이: {len(api_key)}자)")
-
-    try:
-        response = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7,  # 창의적인 힌트를 위해 높은 temperature 설정
-            max_tokens=200
-        )
-
-        hint = response.choices[0].message.content.strip()
-        print("✅ LLM 힌트 생성 성공")
-        return hint
-
-    except Exception as e:
-        print(f"❌ Error generating hint with GPT: {e}")
-        # 오류 발생 시 기본 힌트 반환
-        return f"다시 한 번 주변을 둘러보세요. '{answer}'와 관련된 특별한 장소가 있을 거예요! 💡"
-
-
-
-
-def generate_clip_hint(answer, clip_info):
-
-    # API 키 확인
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        print("⚠️ OPENAI_API_KEY가 설정되지 않았습니다. 기본 힌트를 사용합니다.")
-        return f"다시 한 번 주변을 둘러보세요. '{answer}'와 관련된 특별한 장소가 있을 거예요! 💡"
-
-    # clip_info
-    failed_info = ""
-    if clip_info:
-        failed_info = "\n사용자 사진에서 부족한 감성 (CLIP 결과):\n"
-        question = clip_info[0].get("question", "N/A")
-        model_answer = clip_info[0].get("model_answer", "N/A")
-        expected_answer = clip_info[0].get("expected_answer", "N/A")
-    
-        failed_info += f'  질문: "{question}"\n'
-        failed_info += f"  - 모델 답변: '{model_answer}'\n"
-        failed_info += f"  - 기대 답변: '{expected_answer}'\n"
-    else:
-        failed_info = "\n사용자 사진에서 부족한 감성: (정보 없음)\n"
-    '''
-        틀렸을시 : 
-            # 감정 정보 반환 (힌트 생성용)
-            f"질문: 이 장소에서 {kw} 분위기가 느껴지나요?",
-            f"model answer: 아니요, 이 장소는 {moods} 분위기가 더 강하게 느껴져요.",
-            f"expected answer: 네, 이 장소는 {kw} 분위기가 느껴져요."
-    '''
-
-    # 시스템 프롬프트
-    system_prompt = """당신은 파주 출판단지 감성 찾기 게임의 힌트 제공자입니다.
+CLIP_SYSTEM_PROMPT = """당신은 파주 출판단지 감성 찾기 게임의 힌트 제공자입니다.
 사용자가 촬영한 사진이 정답 감성이 아닐 때, 추상적이고 창의적인 힌트를 제공하는 역할을 합니다.
 
 ### 힌트 작성 가이드라인: 
@@ -192,34 +108,339 @@ def generate_clip_hint(answer, clip_info):
 - **나쁜 힌트:** "사진 분석 결과 웅장한, 활기찬, 신비로운, 화사한, 자연적인 5개만 담고 있습니다." 
 """
 
+
+def load_question_scores(path=QUESTION_ORDER_FILE):
+    """
+    랜드마크별 질문 변별력 점수를 로드합니다.
+
+    Returns:
+        dict: {랜드마크: {질문: 점수}} (파일이 없으면 빈 dict)
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return {
+            landmark: {item["question"]: item.get("score", 0.0) for item in items}
+            for landmark, items in data.get("landmarks", {}).items()
+        }
+    except FileNotFoundError:
+        return {}
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        print(f"⚠️ 질문 변별력 점수를 읽을 수 없습니다 ({path}): {e}")
+        return {}
+
+
+question_scores = load_question_scores()
+
+
+def question_terms(question):
+    """질문의 핵심 단어 집합 (비슷한 질문 묶기용)"""
+    return frozenset(word for word in re.findall(r"[a-z]+", question.lower()) if word not in QUESTION_STOPWORDS)
+
+
+def rank_failed_questions(answer, blip_failed_questions, top_k=HINT_MAX_FAILED_QUESTIONS):
+    """
+    틀린 질문을 정답 랜드마크 기준 변별력 순으로 정렬하고, 비슷한 질문은 하나로 묶어 상위 top_k개만 고릅니다.
+
+    Args:
+        answer (str): 정답 랜드마크 이름
+        blip_failed_questions (list): check_with_blip의 틀린 질문 리스트 (질문 순서대로)
+        top_k (int): 고를 최대 개수
+
+    Returns:
+        tuple: (selected, omitted) - 고른 질문 리스트, 생략한 질문 수
+    """
+    failed = blip_failed_questions or []
+    scores = question_scores.get(answer, {})
+
+    # 변별력 점수 → 모델이 틀린 답에 확신한 정도 → 원래 질문 순서
+    ranked = sorted(
+        enumerate(failed),
+        key=lambda pair: (
+            -scores.get(pair[1].get("question"), 0.0),
+            -(pair[1].get("confidence") or 0.0),
+            pair[0],
+        ),
+    )
+
+    selected = []
+    selected_terms = []
+    for _, item in ranked:
+        if len(selected) >= top_k:
+            break
+        terms = question_terms(item.get("question", ""))
+        direction = (item.get("expected_answer"), item.get("model_answer"))
+        redundant = any(
+            direction == (other.get("expected_answer"), other.get("model_answer"))
+            and len(terms & other_terms) / max(1, len(terms | other_terms)) >= REDUNDANT_SIMILARITY
+            for other, other_terms in zip(selected, selected_terms)
+        )
+        if not redundant:
+            selected.append(item)
+            selected_terms.append(terms)
+
+    return selected, len(failed) - len(selected)
+
+
+def fallback_hint(answer):
+    """LLM을 사용할 수 없을 때 쓰는 기본 힌트 (분위기 정답이면 config/keyword.py의 촬영 가이드 사용)"""
+    guide = feedback_guide.get(answer)
+    if guide:
+        return f"{guide['desc']} 💡"
+    return f"다시 한 번 주변을 둘러보세요. '{answer}'와 관련된 특별한 장소가 있을 거예요! 💡"
+
+
+def request_hint(messages):
+    """
+    Chat Completion을 한 번 호출해 힌트 전체를 받습니다.
+
+    Args:
+        messages (list): build_blip_messages / build_clip_messages의 반환값
+
+    Returns:
+        str: LLM이 생성한 힌트 메시지
+    """
+    # 마감 시간/재시도/서킷 브레이커는 llm_client에서 처리
+    response = create_completion(
+        model=MODEL_NAME,
+        messages=messages,
+        temperature=0.7,  # 창의적인 힌트를 위해 높은 temperature 설정
+        max_tokens=200
+    )
+    record_usage(response.usage)
+    return response.choices[0].message.content.strip()
+
+
+def stream_hint(messages):
+    """
+    Chat Completion을 스트리밍으로 호출해 힌트를 생성되는 대로 조각(delta)씩 돌려줍니다.
+
+    Args:
+        messages (list): build_blip_messages / build_clip_messages의 반환값
+
+    Yields:
+        str: 새로 생성된 텍스트 조각
+
+    Raises:
+        ValueError: OPENAI_API_KEY가 설정되지 않았을 때
+    """
+    if not os.getenv("OPENAI_API_KEY"):
+        raise ValueError("OPENAI_API_KEY가 설정되지 않았습니다.")
+
+    # 스트림을 여는 단계까지만 재시도 (조각을 보낸 뒤에는 재시도하지 않음)
+    stream = create_completion(
+        model=MODEL_NAME,
+        messages=messages,
+        temperature=0.7,
+        max_tokens=200,
+        stream=True,
+        stream_options={"include_usage": True}  # 마지막 조각에 토큰 사용량 포함
+    )
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            if getattr(chunk, "usage", None):
+                record_usage(chunk.usage)
+    except Exception:
+        record_stream_failure()
+        raise
+    finally:
+        stream.close()  # 중간에 그만 읽어도 HTTP 연결을 바로 반환
+
+
+def build_blip_messages(answer, blip_failed_questions=None):
+    """
+    BLIP VQA에서 틀린 질문들로 힌트 요청 메시지(system + user)를 만듭니다.
+
+    Args:
+        answer (str): 정답 랜드마크 이름 (예: "네모탑")
+        blip_failed_questions (list): 틀린 질문 리스트
+            [{"question": str, "expected_answer": str, "model_answer": str}, ...]
+
+    Returns:
+        list: Chat Completion messages
+    """
+    if blip_failed_questions is None:
+        blip_failed_questions = []
+
+    # 변별력 높은 틀린 질문만 골라 입력 토큰을 줄임 (다른 랜드마크를 찍으면 최대 40개)
+    selected, omitted = rank_failed_questions(answer, blip_failed_questions)
+    if omitted:
+        print(f"✂️ 힌트 프롬프트: 틀린 질문 {len(blip_failed_questions)}개 중 {len(selected)}개 전송")
+
+    # 틀린 질문 정보를 텍스트로 포맷팅
+    failed_info = ""
+    if selected:
+        failed_info = "\n사용자 사진에서 부족한 특징 (BLIP VQA 결과, 변별력 높은 순):\n"
+        for i, item in enumerate(selected, 1):
+            question = item.get("question", "N/A")
+            expected_answer = item.get("expected_answer", "N/A")
+            model_answer = item.get("model_answer", "N/A")
+            failed_info += f'  {i}. 질문: "{question}"\n'
+            failed_info += f"     - 모델 답변: '{model_answer}', 기대 답변: '{expected_answer}'\n"
+        if omitted:
+            failed_info += f"  (비슷하거나 변별력이 낮은 틀린 질문 {omitted}개 생략)\n"
+    else:
+        failed_info = "\n사용자 사진에서 부족한 특징: (정보 없음)\n"
+
+
     # 사용자 프롬프트
-    user_prompt = f"""정답 분위기: {answer}
+    user_prompt = f"""정답 랜드마크: {answer}
 {failed_info}
 
-위 정보를 바탕으로 사용자가 정답에 더 가까이 다가갈 수 있도록 힌트를 생성해주세요.
-"""
+위 정보를 바탕으로 사용자가 정답에 더 가까이 다가갈 수 있도록 추상적이고 창의적인 힌트를 생성해주세요."""
+
+    return [
+        {"role": "system", "content": BLIP_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def blip_hint_key(answer, blip_failed_questions=None):
+    """BLIP 힌트 캐시 키 (정답 랜드마크 + 프롬프트에 들어가는 상위 틀린 질문 시그니처)"""
+    selected, _ = rank_failed_questions(answer, blip_failed_questions)
+    return make_hint_key("blip", answer, blip_signature(selected))
+
+
+def clip_hint_key(answer, clip_info):
+    """CLIP 힌트 캐시 키 (정답 분위기 + 감지된 분위기 순서)"""
+    return make_hint_key("clip", answer, clip_signature(clip_info))
+
+
+def generate_hint(answer, messages, cache_key=None, with_source=False):
+    """
+    힌트 메시지로 LLM을 호출합니다. 키가 없거나 호출에 실패하면 기본 힌트를 반환합니다.
+
+    Args:
+        answer (str): 정답
+        messages (list): build_blip_messages / build_clip_messages의 반환값
+        cache_key (str, optional): 주어지면 힌트 캐시에서 먼저 찾고, 새로 만든 힌트를 저장
+        with_source (bool): True이면 힌트 출처도 함께 반환 (결과 캐시 저장 여부 판단용)
+
+    Returns:
+        str: LLM이 생성한 힌트 메시지 (또는 기본 힌트)
+        with_source=True이면 (hint, source) - source: "pack" / "cache" / "llm" / "fallback"
+    """
+    def result(hint, source):
+        return (hint, source) if with_source else hint
+
+    # 미리 생성해 둔 힌트 팩에 있는 시그니처면 LLM을 호출하지 않음
+    if cache_key is not None:
+        hint = pack_hint(cache_key)
+        if hint is not None:
+            return result(hint, "pack")
+
+    # API 키 확인
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        print("⚠️ OPENAI_API_KEY가 설정되지 않았습니다. 기본 힌트를 사용합니다.")
+        return result(fallback_hint(answer), "fallback")
 
     print(f"✅ LLM 힌트 생성 시도 (API 키 설정됨, 길이: {len(api_key)}자)")
 
-    try:
-        response = client.chat.completions.create(
-            model=MODEL_NAME,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7,  # 창의적인 힌트를 위해 높은 temperature 설정
-            max_tokens=200
-        )
+    created = []  # 이 호출에서 LLM이 생성했으면 True가 들어감 (아니면 캐시된 변형)
 
-        hint = response.choices[0].message.content.strip()
+    def create():
+        hint = request_hint(messages)
+        created.append(True)
         print("✅ LLM 힌트 생성 성공")
         return hint
 
+    try:
+        if cache_key is None:
+            return result(create(), "llm")
+        hint = hint_cache.get_or_create(cache_key, create)
+        return result(hint, "llm" if created else "cache")
+
     except Exception as e:
         print(f"❌ Error generating hint with GPT: {e}")
         # 오류 발생 시 기본 힌트 반환
-        return f"다시 한 번 주변을 둘러보세요. '{answer}'와 관련된 특별한 장소가 있을 거예요! 💡"
+        return result(fallback_hint(answer), "fallback")
+
+
+def generate_blip_hint(answer, blip_failed_questions=None, with_source=False):
+    """
+    BLIP VQA에서 틀린 질문들을 바탕으로 추상적 힌트를 생성합니다.
+
+    Args:
+        answer (str): 정답 랜드마크 이름 (예: "네모탑")
+        blip_failed_questions (list): 틀린 질문 리스트
+            [{"question": str, "expected_answer": str, "model_answer": str}, ...]
+        with_source (bool): True이면 (hint, source)를 반환 (generate_hint 참고)
+
+    Returns:
+        str: LLM이 생성한 힌트 메시지
+    """
+    return generate_hint(
+        answer,
+        build_blip_messages(answer, blip_failed_questions),
+        blip_hint_key(answer, blip_failed_questions),
+        with_source,
+    )
+
+
+def build_clip_messages(answer, clip_info):
+    """
+    CLIP 분위기 판정 결과로 힌트 요청 메시지(system + user)를 만듭니다.
+
+    Args:
+        answer (str): 정답 분위기 키워드 (예: "자연적인")
+        clip_info (list): [{"question": str, "model_answer": str, "expected_answer": str}]
+
+    Returns:
+        list: Chat Completion messages
+    """
+    # clip_info
+    failed_info = ""
+    if clip_info:
+        failed_info = "\n사용자 사진에서 부족한 감성 (CLIP 결과):\n"
+        question = clip_info[0].get("question", "N/A")
+        model_answer = clip_info[0].get("model_answer", "N/A")
+        expected_answer = clip_info[0].get("expected_answer", "N/A")
+    
+        failed_info += f'  질문: "{question}"\n'
+        failed_info += f"  - 모델 답변: '{model_answer}'\n"
+        failed_info += f"  - 기대 답변: '{expected_answer}'\n"
+    else:
+        failed_info = "\n사용자 사진에서 부족한 감성: (정보 없음)\n"
+    '''
+        틀렸을시 : 
+            # 감정 정보 반환 (힌트 생성용)
+            f"질문: 이 장소에서 {kw} 분위기가 느껴지나요?",
+            f"model answer: 아니요, 이 장소는 {moods} 분위기가 더 강하게 느껴져요.",
+            f"expected answer: 네, 이 장소는 {kw} 분위기가 느껴져요."
+    '''
+
+
+    # 사용자 프롬프트
+    user_prompt = f"""정답 분위기: {answer}
+{failed_info}
+
+위 정보를 바탕으로 사용자가 정답에 더 가까이 다가갈 수 있도록 힌트를 생성해주세요.
+"""
+
+    return [
+        {"role": "system", "content": CLIP_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+
+def generate_clip_hint(answer, clip_info, with_source=False):
+    """
+    CLIP 분위기 판정 결과를 바탕으로 추상적 힌트를 생성합니다.
+
+    Args:
+        answer (str): 정답 분위기 키워드 (예: "자연적인")
+        clip_info (list): [{"question": str, "model_answer": str, "expected_answer": str}]
+        with_source (bool): True이면 (hint, source)를 반환 (generate_hint 참고)
+
+    Returns:
+        str: LLM이 생성한 힌트 메시지
+    """
+    return generate_hint(
+        answer, build_clip_messages(answer, clip_info), clip_hint_key(answer, clip_info), with_source
+    )
 
 
 
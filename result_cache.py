@@ -0,0 +1,107 @@
+# result_cache.py
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+# ======================================
+# ✅ 설정
+# ======================================
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+LANDMARK_QA_FILE = os.path.join(PROJECT_ROOT, "data", "landmark_qa_labeled_updated.json")
+KEYWORD_FILE = os.path.join(PROJECT_ROOT, "config", "keyword.py")
+
+# 캐시에 보관할 최대 판정 수와 유효 시간(초)
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "256"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "600"))
+
+
+class LRUCache:
+    """크기 제한 + TTL을 가진 스레드 안전 LRU 캐시"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()  # key -> (저장 시각, 값)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """키에 해당하는 값을 반환합니다. 없거나 만료되었으면 None"""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or time.monotonic() - item[0] > self.ttl:
+                if item is not None:
+                    del self._items[key]
+                self.misses += 1
+                return None
+
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        """값을 저장하고, 크기를 넘으면 가장 오래 쓰지 않은 항목부터 제거합니다."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._items[key] = (time.monotonic(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        """모든 항목을 제거합니다. (적중/미스 카운터는 유지)"""
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        """적중/미스 카운터와 현재 크기를 반환합니다."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._items),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+            }
+
+
+def compute_data_version():
+    """Q&A 데이터와 키워드 설정 파일 내용으로 데이터 버전 해시를 만듭니다."""
+    digest = hashlib.sha256()
+    for path in (LANDMARK_QA_FILE, KEYWORD_FILE):
+        try:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(path.encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+def image_digest(image):
+    """디코딩된 이미지 픽셀의 SHA-256 (파일 포맷/메타데이터와 무관)"""
+    digest = hashlib.sha256()
+    digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode("ascii"))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def make_cache_key(image, mission_type, answer):
+    """(이미지 해시, 미션 타입, 오늘의 정답, 데이터 버전) 캐시 키"""
+    return (image_digest(image), mission_type, answer, DATA_VERSION)
+
+
+# ✅ 서버 시작 시 데이터 버전 계산 및 캐시 생성
+DATA_VERSION = compute_data_version()
+mission_cache = LRUCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL)
+
+
+def invalidate_mission_cache():
+    """오늘의 정답이 바뀌면 이전 판정을 모두 버립니다."""
+    mission_cache.clear()
+    print("🧹 미션 결과 캐시를 초기화했습니다.")
@@ -1,9 +1,9 @@
 # server.py
 import os
 import sys
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from datetime import date
+from datetime import datetime
 import json
 
 # ✅ 프로젝트 루트 경로를 sys.path에 추가
@@ -12,111 +12,83 @@ if PROJECT_ROOT not in sys.path:
     sys.path.append(PROJECT_ROOT)
 
 # ✅ 모듈 임포트
-from answer_manager import get_today_answers
-from mission_manager import run_mission1, run_mission2
+from daily_state import daily_state
+from mission_manager import run_mission1, run_mission2, describe_mood, gate_report
 from metadata.validator import validate_metadata
+from result_cache import mission_cache
+from job_store import job_store, submit_job, JobQueueFullError, JOB_RETRY_AFTER
+from hint_store import hint_store
+from models.hint_cache import hint_cache
+from models.hint_pack import pack_report
+from models.llm_client import client_stats
+from utils.image_context import ImageContext, decode_image, PREVIEW_MIN_SIDE, PREVIEW_PIXEL_BUDGET
 
 app = Flask(__name__)
 CORS(app)  # 프론트엔드와 통신을 위해 CORS 활성화
 
-# ✅ 상태 파일 경로
-DATA_DIR = os.path.join(PROJECT_ROOT, "data")
-STATE_FILE = os.path.join(DATA_DIR, "current_answer.json")
+# ✅ SSE 스트림 keep-alive 간격 (초)
+SSE_KEEPALIVE = float(os.getenv("SSE_KEEPALIVE", "15"))
+# ✅ /get-today-hint 응답을 브라우저/프록시가 재검증 없이 재사용하는 최대 시간과, 만료 후 재검증하는 동안 이전 응답을 쓰는 시간 (초)
+# (관리자 지정 등으로 낮에 정답이 바뀌면 클라이언트에는 최대 두 값의 합만큼 늦게 반영됨)
+DAILY_HINT_MAX_AGE = int(os.getenv("DAILY_HINT_MAX_AGE", "60"))
+DAILY_HINT_STALE = int(os.getenv("DAILY_HINT_STALE", "30"))
 
-# ✅ 전역 변수로 오늘의 정답과 힌트 저장
-today_answer1 = None  # Mission1 (BLIP) 정답
-today_answer2 = None  # Mission2 (CLIP) 정답
-today_hint1 = None  # Mission1 힌트
-today_hint2 = None  # Mission2 힌트
+# ✅ 서버 시작 시 자동으로 오늘의 정답 보장 (이후에는 자정이나 상태 파일 변경 시에만 다시 읽음)
+daily_state.current()
 
 
-def ensure_today_answer():
-    """current_answer.json이 없거나 비어있거나 날짜가 다르면 새로 생성"""
-    from answer_manager import get_today_answers
+@app.route("/get-today-hint", methods=["GET"])
+def get_today_hint():
+    """HTML에서 호출하는 API - mission_type 파라미터로 힌트 선택"""
+    # mission_type 파라미터 받기 (기본값: "location" -> missions1)
+    mission_type = request.args.get("mission_type", "location")
 
-    os.makedirs(DATA_DIR, exist_ok=True)
+    # mission_type에 따라 다른 힌트와 정답 반환 (photo: Mission2 CLIP, 그 외: Mission1 BLIP)
+    payload, etag, expires_at = daily_state.hint_payload(mission_type)
 
-    # ✅ 파일 없거나 비어 있으면 새로 생성
-    if not os.path.exists(STATE_FILE) or os.path.getsize(STATE_FILE) == 0:
-        print("📝 상태 파일이 없거나 비어있어 새로 생성합니다.")
-        return get_today_answers()
+    # ✅ 브라우저/프록시가 DAILY_HINT_MAX_AGE초 동안 Python까지 오지 않고 재사용 (자정을 넘기지 않음)
+    # 이후 재검증 요청에는 ETag로 304 응답 - 낮에 정답이 바뀌어도 이 시간 안에 반영됨
+    to_midnight = max(0, int((expires_at - datetime.now()).total_seconds()))
+    max_age = min(to_midnight, DAILY_HINT_MAX_AGE)
+    stale = min(DAILY_HINT_STALE, to_midnight - max_age)
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = (
+        f"public, max-age={max_age}" + (f", stale-while-revalidate={stale}" if stale > 0 else "")
+    )
+    return response.make_conditional(request)
 
-    # ✅ 파일 내용 읽기 시도
-    try:
-        with open(STATE_FILE, "r", encoding="utf-8") as f:
-            content = f.read().strip()
-            if not content:
-                # 파일이 비어있으면 새로 생성
-                print("📝 상태 파일이 비어있어 새로 생성합니다.")
-                return get_today_answers()
-
-            state = json.loads(content)
-            today = str(date.today())
-
-            # ✅ 날짜가 오늘이면 그대로 유지
-            if state.get("date") == today:
-                # 하위 호환성: answer1이 없으면 answer 사용
-                answer1 = state.get("answer1") or state.get("answer")
-                answer2 = state.get("answer2")
-                hint1 = state.get("hint1") or state.get("hint")
-                hint2 = state.get("hint2")
-                if answer1 and answer2 and hint1 and hint2:
-                    return answer1, answer2, hint1, hint2
-
-            # ✅ 날짜가 다르면 새로 생성
-            print("📅 날짜가 바뀌어 새 정답 생성")
-            return get_today_answers()
-
-    except json.JSONDecodeError as e:
-        # JSON 파싱 오류
-        print(f"⚠️ 상태 파일 JSON 형식 오류: {e}. 새로 생성합니다.")
-        return get_today_answers()
-    except Exception as e:
-        # 기타 오류
-        print(f"⚠️ 상태 파일 로드 실패: {e}. 새로 생성합니다.")
-        return get_today_answers()
 
+@app.route("/api/cache-stats", methods=["GET"])
+def api_cache_stats():
+    """미션 결과 캐시의 적중/미스 통계"""
+    return jsonify(mission_cache.stats())
 
-# ✅ 서버 시작 시 자동으로 오늘의 정답 보장
-today_answer1, today_answer2, today_hint1, today_hint2 = ensure_today_answer()
 
+@app.route("/api/answer-stats", methods=["GET"])
+def api_answer_stats():
+    """오늘의 정답 상태 (날짜, 파일 재로드 횟수, 만료 시각)"""
+    return jsonify(daily_state.stats())
 
-@app.route("/get-today-hint", methods=["GET"])
-def get_today_hint():
-    """HTML에서 호출하는 API - mission_type 파라미터로 힌트 선택"""
-    global today_answer1, today_answer2, today_hint1, today_hint2
 
-    # mission_type 파라미터 받기 (기본값: "location" -> missions1)
-    mission_type = request.args.get("mission_type", "location")
+@app.route("/api/gate-stats", methods=["GET"])
+def api_gate_stats():
+    """CLIP 랜드마크 게이트의 기준값과 통과/거부 통계"""
+    return jsonify(gate_report())
+
 
-    # 혹시 서버가 오래 켜져 있다면 날짜 갱신 체크
-    today = str(date.today())
+@app.route("/api/mood-profile", methods=["POST"])
+def api_mood_profile():
+    """관리자 미리보기 - 한 번의 CLIP 실행으로 모든 분위기 키워드 판정 결과 반환"""
+    if "image" not in request.files:
+        return jsonify({"error": "이미지 파일이 필요합니다."}), 400
 
     try:
-        with open(STATE_FILE, "r", encoding="utf-8") as f:
-            state = json.load(f)
-        if state.get("date") != today:
-            print("📅 날짜가 바뀌어 재갱신합니다.")
-            today_answer1, today_answer2, today_hint1, today_hint2 = (
-                ensure_today_answer()
-            )
-        else:
-            # 하위 호환성: answer1이 없으면 answer 사용
-            today_answer1 = state.get("answer1") or state.get("answer")
-            today_answer2 = state.get("answer2")
-            today_hint1 = state.get("hint1") or state.get("hint")
-            today_hint2 = state.get("hint2")
-    except FileNotFoundError:
-        print("⚠️ current_answer.json 없음 → 새로 생성")
-        today_answer1, today_answer2, today_hint1, today_hint2 = ensure_today_answer()
-
-    # mission_type에 따라 다른 힌트와 정답 반환
-    if mission_type == "photo":
-        # Mission2 (CLIP) - 감정 분석
-        return jsonify({"answer": today_answer2, "hint": today_hint2})
-    else:
-        # Mission1 (BLIP) - 장소 인식
-        return jsonify({"answer": today_answer1, "hint": today_hint1})
+        image_context = ImageContext.from_upload(request.files["image"])
+        return jsonify({"today_answer": daily_state.answer("photo"), **describe_mood(image_context)})
+    except Exception as e:
+        print(f"분위기 프로필 계산 오류: {e}")
+        return jsonify({"error": str(e)}), 500
 
 
 @app.route("/api/preview", methods=["POST"])
@@ -129,25 +101,13 @@ def api_preview():
     if file.filename == "":
         return jsonify({"error": "이미지 파일이 선택되지 않았습니다."}), 400
 
-    # ✅ 임시 파일로 저장
-    import tempfile
-    from PIL import Image
-    from pillow_heif import register_heif_opener
     import io
 
-    # HEIC 포맷 지원 등록
-    register_heif_opener()
-
-    with tempfile.NamedTemporaryFile(
-        delete=False, suffix=os.path.splitext(file.filename)[1]
-    ) as tmp_file:
-        file.save(tmp_file.name)
-        temp_path = tmp_file.name
-
     try:
-        # HEIC 파일을 JPG로 변환
-        img = Image.open(temp_path)
-        img_rgb = img.convert("RGB")
+        # ✅ 업로드 본문을 메모리에서 미리보기 크기로 바로 축소 디코딩 (HEIC 포함)
+        img_rgb = decode_image(
+            ImageContext.from_upload(file).open(), PREVIEW_MIN_SIDE, PREVIEW_PIXEL_BUDGET
+        )
 
         # 메모리 버퍼에 JPG 저장
         output = io.BytesIO()
@@ -162,30 +122,32 @@ def api_preview():
             as_attachment=False,
             download_name="preview.jpg",
         )
+    except ValueError as e:
+        # 압축 해제 폭탄 등 너무 큰 이미지
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"미리보기 변환 오류: {e}")
         import traceback
 
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
-    finally:
-        # ✅ 임시 파일 삭제
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
 
 
-@app.route("/api/mission", methods=["POST"])
-def api_mission():
-    """미션 실행 API - mission_type에 따라 적절한 미션 실행"""
-    global today_answer1, today_answer2
+def read_mission_upload():
+    """
+    미션 요청의 업로드 파일과 mission_type을 확인합니다.
 
+    Returns:
+        tuple: (image_context, mission_type, error)
+               error가 None이 아니면 (응답 JSON, 상태 코드)
+    """
     # ✅ 이미지 파일 확인
     if "image" not in request.files:
-        return jsonify({"error": "이미지 파일이 필요합니다."}), 400
+        return None, None, ({"error": "이미지 파일이 필요합니다."}, 400)
 
     file = request.files["image"]
     if file.filename == "":
-        return jsonify({"error": "이미지 파일이 선택되지 않았습니다."}), 400
+        return None, None, ({"error": "이미지 파일이 선택되지 않았습니다."}, 400)
 
     # ✅ mission_type 확인 (기본값: "location" -> mission1)
     mission_type = request.form.get("mission_type", "location")
@@ -195,51 +157,229 @@ def api_mission():
     allowed_extensions = [".jpg", ".jpeg", ".png", ".heic", ".heif"]
 
     if file_ext not in allowed_extensions:
-        return (
-            jsonify(
-                {
-                    "error": f"지원하지 않는 파일 형식입니다. 지원 형식: {', '.join(allowed_extensions)}"
-                }
-            ),
+        return None, None, (
+            {
+                "error": f"지원하지 않는 파일 형식입니다. 지원 형식: {', '.join(allowed_extensions)}"
+            },
             400,
         )
 
-    # ✅ 임시 파일로 저장 (HEIC 파일도 원본 확장자 유지)
-    import tempfile
+    # ✅ 업로드 본문을 메모리로 한 번만 읽음 (EXIF 파싱/디코딩 결과를 요청 내에서 공유)
+    return ImageContext.from_upload(file), mission_type, None
+
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
-        file.save(tmp_file.name)
-        temp_path = tmp_file.name
+def execute_mission(image_context, mission_type, answer, progress=None):
+    """
+    메타데이터 검증부터 미션 실행까지 수행합니다. (/api/mission, /api/jobs 공용)
 
+    Returns:
+        tuple: (응답 JSON, 상태 코드)
+    """
     try:
-        # ✅ 메타데이터 유효성 검사
-        if not validate_metadata(temp_path):
-            return (
-                jsonify(
-                    {"error": "오늘 촬영한 사진이 아니거나 출판단지 내부가 아닙니다."}
-                ),
-                400,
-            )
+        # ✅ 메타데이터 유효성 검사 (EXIF 바이트만 파싱, 실패하면 디코딩/모델 실행 없이 거부)
+        if not validate_metadata(image_context):
+            return {"error": "오늘 촬영한 사진이 아니거나 출판단지 내부가 아닙니다."}, 400
+
+        try:
+            image_context.open()  # 헤더만 읽어 형식/크기 확인 (압축 해제 폭탄 방지)
+        except Exception as e:
+            return {"error": f"이미지를 열 수 없습니다: {e}"}, 400
+
+        if progress is not None:
+            progress("metadata_ok")
 
         # ✅ mission_type에 따라 적절한 미션 실행
         if mission_type == "photo":
             # Mission2 (사진 촬영) - CLIP 감정 분석
-            result = run_mission2(temp_path, today_answer2)
+            result = run_mission2(image_context, answer, progress)
         else:
             # Mission1 (장소 찾기) - BLIP 장소 인식
-            result = run_mission1(temp_path, today_answer1)
+            result = run_mission1(image_context, answer, progress)
+
+        if result.get("hint_token"):
+            # ✅ 비동기 힌트 조회 경로 (ASYNC_HINTS=1)
+            result["hint_url"] = f"/api/hints/{result['hint_token']}"
+            result["hint_stream_url"] = f"/api/hints/{result['hint_token']}/stream"
 
-        return jsonify(result)
+        return result, 200
     except Exception as e:
         print(f"미션 실행 오류: {e}")
         import traceback
 
         traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
-    finally:
-        # ✅ 임시 파일 삭제
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        return {"error": str(e)}, 500
+
+
+@app.route("/api/mission", methods=["POST"])
+def api_mission():
+    """미션 실행 API - mission_type에 따라 적절한 미션 실행"""
+    image_context, mission_type, error = read_mission_upload()
+    if error is not None:
+        return jsonify(error[0]), error[1]
+
+    answer = daily_state.answer(mission_type)
+    result, status = execute_mission(image_context, mission_type, answer)
+    return jsonify(result), status
+
+
+# ======================================
+# ✅ 비동기 미션 작업 API (제출 → 폴링 또는 SSE 구독)
+# ======================================
+
+@app.route("/api/jobs", methods=["POST"])
+def api_submit_job():
+    """미션 작업 제출 - 바로 job_id를 반환하고 백그라운드에서 실행"""
+    image_context, mission_type, error = read_mission_upload()
+    if error is not None:
+        return jsonify(error[0]), error[1]
+
+    answer = daily_state.answer(mission_type)
+    try:
+        job_id = submit_job(
+            mission_type,
+            lambda progress: execute_mission(image_context, mission_type, answer, progress),
+        )
+    except JobQueueFullError:
+        # ✅ 대기열이 가득 차면 업로드를 메모리에 쌓지 않고 나중에 다시 시도하도록 안내
+        response = jsonify({"error": "요청이 많아 잠시 후 다시 시도해주세요.", "retry_after": JOB_RETRY_AFTER})
+        response.headers["Retry-After"] = str(JOB_RETRY_AFTER)
+        return response, 503
+    return (
+        jsonify(
+            {
+                "job_id": job_id,
+                "status_url": f"/api/jobs/{job_id}",
+                "events_url": f"/api/jobs/{job_id}/events",
+            }
+        ),
+        202,
+    )
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def api_job_status(job_id):
+    """미션 작업 상태 폴링 - 완료되면 result에 /api/mission과 같은 JSON이 들어 있음"""
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"error": "작업을 찾을 수 없습니다. (만료되었거나 잘못된 ID)"}), 404
+    return jsonify(job)
+
+
+@app.route("/api/jobs/<job_id>/events", methods=["GET"])
+def api_job_events(job_id):
+    """
+    미션 작업 진행 상황 SSE 스트림
+    - event: metadata_ok / questions / verdict / hint_ready / done
+    - 마지막 done 이벤트의 data는 /api/mission과 같은 결과 JSON
+    """
+    if job_store.get(job_id) is None:
+        return jsonify({"error": "작업을 찾을 수 없습니다. (만료되었거나 잘못된 ID)"}), 404
+
+    # 재연결 시 마지막으로 받은 이벤트 다음부터 전송
+    last_event_id = request.headers.get("Last-Event-ID", "0")
+    after = int(last_event_id) if last_event_id.isdigit() else 0
+
+    def stream():
+        nonlocal after
+        while True:
+            events, job = job_store.wait_events(job_id, after, SSE_KEEPALIVE)
+            if job is None:
+                yield "event: expired\ndata: {}\n\n"
+                return
+            if not events:
+                if job["status"] in ("done", "error"):
+                    # 이미 done까지 받은 클라이언트가 재연결한 경우 결과만 다시 전송
+                    yield f"event: done\ndata: {json.dumps(job['result'], ensure_ascii=False)}\n\n"
+                    return
+                yield ": keep-alive\n\n"
+                continue
+            for event in events:
+                after = event["seq"]
+                data = job["result"] if event["stage"] == "done" else event
+                yield (
+                    f"id: {event['seq']}\nevent: {event['stage']}\n"
+                    f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+                )
+                if event["stage"] == "done":
+                    return
+
+    return Response(
+        stream_with_context(stream()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/api/job-stats", methods=["GET"])
+def api_job_stats():
+    """비동기 미션 작업 저장소 통계"""
+    return jsonify(job_store.stats())
+
+
+# ======================================
+# ✅ 비동기 힌트 API (ASYNC_HINTS=1일 때 실패 응답의 hint_token으로 조회)
+# ======================================
+
+@app.route("/api/hints/<token>", methods=["GET"])
+def api_hint(token):
+    """
+    힌트 폴링 - status가 "pending"이면 hint는 지금까지 생성된 텍스트,
+    "done"이면 최종 힌트 (source: "llm" 또는 마감 후 기본 힌트 "fallback")
+    """
+    hint = hint_store.get(token)
+    if hint is None:
+        return jsonify({"error": "힌트를 찾을 수 없습니다. (만료되었거나 잘못된 토큰)"}), 404
+    return jsonify(hint)
+
+
+@app.route("/api/hints/<token>/stream", methods=["GET"])
+def api_hint_stream(token):
+    """
+    힌트 SSE 스트림
+    - event: delta - LLM이 생성한 텍스트 조각 ({"text"})
+    - event: done  - 최종 힌트 ({"hint", "source"}), 마감 시간이 지나면 기본 힌트로 대체됨
+    """
+    if hint_store.get(token) is None:
+        return jsonify({"error": "힌트를 찾을 수 없습니다. (만료되었거나 잘못된 토큰)"}), 404
+
+    last_event_id = request.headers.get("Last-Event-ID", "0")
+    after = int(last_event_id) if last_event_id.isdigit() else 0
+
+    def stream():
+        nonlocal after
+        while True:
+            chunks, hint = hint_store.wait_chunks(token, after, SSE_KEEPALIVE)
+            if hint is None:
+                yield "event: expired\ndata: {}\n\n"
+                return
+            for chunk in chunks:
+                after += 1
+                yield f"id: {after}\nevent: delta\ndata: {json.dumps({'text': chunk}, ensure_ascii=False)}\n\n"
+            if hint["status"] == "done":
+                data = {"hint": hint["hint"], "source": hint["source"]}
+                yield f"event: done\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+                return
+            if not chunks:
+                yield ": keep-alive\n\n"
+
+    return Response(
+        stream_with_context(stream()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/api/hint-stats", methods=["GET"])
+def api_hint_stats():
+    """비동기 힌트 저장소, 힌트 캐시(SQLite), 힌트 팩, LLM 클라이언트(서킷 브레이커) 통계"""
+    return jsonify(
+        {
+            "store": hint_store.stats(),
+            "cache": hint_cache.stats(),
+            "pack": pack_report(),
+            "llm": client_stats(),
+        }
+    )
 
 
 if __name__ == "__main__":
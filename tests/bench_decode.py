@@ -0,0 +1,96 @@
+import os
+import sys
+import json
+import time
+import resource
+import subprocess
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+DATA_DIR = os.path.join(PROJECT_ROOT, "data")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".jfif", ".png", ".heic", ".heif")
+
+# Photos at or above this size are reported separately (typical phone camera output)
+LARGE_PIXELS = 4_000_000
+
+
+def list_photos(data_dir=DATA_DIR):
+    """Collects every photo under data/<landmark>/."""
+    photos = []
+    for landmark in sorted(os.listdir(data_dir)):
+        folder = os.path.join(data_dir, landmark)
+        if os.path.isdir(folder):
+            photos.extend(
+                os.path.join(folder, name)
+                for name in sorted(os.listdir(folder))
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+    return photos
+
+
+def run_child(mode, large_only):
+    """
+    Decodes the photos in this process and prints timing and peak RSS as JSON.
+    Runs in a fresh subprocess so that peak RSS is measured per mode.
+    """
+    from PIL import Image
+    from utils.image_context import decode_image
+
+    photos = list_photos()
+    if large_only:
+        photos = [p for p in photos if Image.open(p).size[0] * Image.open(p).size[1] >= LARGE_PIXELS]
+
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    decoded_pixels = 0
+    for path in photos:
+        image = Image.open(path)
+        if mode == "full":
+            image = image.convert("RGB")
+        else:
+            image = decode_image(image)
+        decoded_pixels += image.size[0] * image.size[1]
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({
+        "photos": len(photos),
+        "seconds": elapsed,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "rss_growth_mb": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss) / 1024,
+        "avg_megapixels": decoded_pixels / max(1, len(photos)) / 1e6,
+    }))
+
+
+def benchmark():
+    """Compares full-size decode with the reduced-resolution decode used by the models."""
+    for large_only in (False, True):
+        label = f"photos >= {LARGE_PIXELS / 1e6:.0f} MP" if large_only else "all photos"
+        print(f"\n=== Decode benchmark ({label}) ===")
+        results = {}
+        for mode in ("full", "reduced"):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", mode] + (["--large"] if large_only else []),
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+
+        for mode, result in results.items():
+            per_photo = result["seconds"] / max(1, result["photos"]) * 1000
+            print(
+                f"{mode:>8}: {result['photos']} photos, {per_photo:.1f} ms/photo, "
+                f"peak RSS {result['peak_rss_mb']:.0f} MB (+{result['rss_growth_mb']:.0f} MB), "
+                f"avg {result['avg_megapixels']:.2f} MP decoded"
+            )
+        if results["reduced"]["seconds"] > 0:
+            print(f" speedup: {results['full']['seconds'] / results['reduced']['seconds']:.1f}x")
+
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        run_child(sys.argv[sys.argv.index("--child") + 1], "--large" in sys.argv)
+    else:
+        benchmark()
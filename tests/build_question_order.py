@@ -0,0 +1,182 @@
+import os
+import sys
+import json
+from datetime import datetime
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from models import blip_module
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".jfif", ".png", ".heic", ".heif")
+
+
+def list_reference_photos(data_dir, landmarks):
+    """
+    Collects the reference photos under data/<landmark>/ for every landmark in the QA file.
+
+    Returns:
+        dict: {landmark_name: [photo_path, ...]}
+    """
+    photos = {}
+    for landmark in landmarks:
+        folder = os.path.join(data_dir, landmark)
+        if not os.path.isdir(folder):
+            print(f"Warning: No reference photo folder for '{landmark}'.")
+            continue
+        photos[landmark] = [
+            os.path.join(folder, name)
+            for name in sorted(os.listdir(folder))
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        ]
+    return photos
+
+
+def answer_all_questions(photo_path, unique_questions, mode, batch_size):
+    """
+    Answers every unique question of the QA file for one photo (vision encoder runs once).
+
+    Returns:
+        dict: {question: model_answer}
+    """
+    image_embeds = blip_module.load_image_embeds(photo_path)
+    if image_embeds is None:
+        raise ValueError("failed to load image")
+
+    answers = {}
+    for start in range(0, len(unique_questions), batch_size):
+        batch = unique_questions[start : start + batch_size]
+        model_answers, _ = blip_module.answer_questions(image_embeds, batch, mode)
+        answers.update(zip(batch, model_answers))
+    return answers
+
+
+def rank_questions(qa_data, photos, photo_answers):
+    """
+    Scores each question by how well it separates its landmark from the others:
+    (accuracy on the landmark's own photos) - (rate of the same answer on other landmarks' photos).
+    """
+    ranked = {}
+    for landmark, question_list in qa_data.items():
+        own_photos = photos.get(landmark, [])
+        other_photos = [p for name, paths in photos.items() if name != landmark for p in paths]
+
+        items = []
+        for question, expected_answer in question_list:
+            pos = [photo_answers[p][question] == expected_answer for p in own_photos]
+            neg = [photo_answers[p][question] == expected_answer for p in other_photos]
+            pos_accuracy = sum(pos) / len(pos) if pos else 0.0
+            neg_accuracy = sum(neg) / len(neg) if neg else 0.0
+            items.append({
+                "question": question,
+                "expected_answer": expected_answer,
+                "score": round(pos_accuracy - neg_accuracy, 4),
+                "pos_accuracy": round(pos_accuracy, 4),
+                "neg_accuracy": round(neg_accuracy, 4),
+            })
+
+        items.sort(key=lambda item: (item["score"], item["pos_accuracy"]), reverse=True)
+        ranked[landmark] = items
+    return ranked
+
+
+def simulate_early_exit(ordered_list, answers, threshold, batch_size):
+    """Replays check_with_blip's early-exit rule on recorded answers and returns the questions asked."""
+    total = len(ordered_list)
+    correct = 0
+    asked = 0
+    for start in range(0, total, batch_size):
+        batch = ordered_list[start : start + batch_size]
+        correct += sum(answers[question] == expected for question, expected in batch)
+        asked += len(batch)
+        if asked < total and (
+            correct / total >= threshold or (correct + total - asked) / total < threshold
+        ):
+            break
+    return asked
+
+
+def early_exit_report(qa_data, ranked, photos, photo_answers):
+    """Prints how many questions early exit saves on the reference photos, per target landmark."""
+    threshold = blip_module.SUCCESS_THRESHOLD
+    batch_size = blip_module.EARLY_EXIT_BATCH_SIZE
+
+    totals = {"own": [0, 0, 0], "other": [0, 0, 0]}  # [requests, asked, total]
+    for landmark, question_list in qa_data.items():
+        rank = {item["question"]: i for i, item in enumerate(ranked[landmark])}
+        ordered_list = sorted(question_list, key=lambda item: rank[item[0]])
+
+        for photo_landmark, paths in photos.items():
+            kind = "own" if photo_landmark == landmark else "other"
+            for path in paths:
+                asked = simulate_early_exit(ordered_list, photo_answers[path], threshold, batch_size)
+                totals[kind][0] += 1
+                totals[kind][1] += asked
+                totals[kind][2] += len(question_list)
+
+    print("\n=== Early exit report (reference photos, in-sample) ===")
+    for kind, label in (("own", "Photo of the target landmark"), ("other", "Photo of another landmark")):
+        requests, asked, total = totals[kind]
+        if requests == 0:
+            continue
+        print(
+            f"{label}: {requests} requests, "
+            f"avg {asked / requests:.1f}/{total / requests:.0f} questions asked, "
+            f"avg {(total - asked) / requests:.1f} saved ({(total - asked) / total:.1%})"
+        )
+    requests = totals["own"][0] + totals["other"][0]
+    asked = totals["own"][1] + totals["other"][1]
+    total = totals["own"][2] + totals["other"][2]
+    if requests:
+        print(f"Overall: avg {(total - asked) / requests:.1f} questions saved per request ({(total - asked) / total:.1%})")
+
+
+def build_question_order(output_path, mode=None):
+    """
+    Ranks each landmark's questions by how well they discriminated on the reference photos
+    in data/<landmark>/ and saves the order used by check_with_blip's early-exit mode.
+
+    Args:
+        output_path (str): Path to save landmark_question_order.json.
+        mode (str, optional): "generate" or "score". Defaults to blip_module.VQA_MODE.
+    """
+    if mode is None:
+        mode = blip_module.VQA_MODE
+
+    qa_data = blip_module.landmark_qa_data
+    photos = list_reference_photos(blip_module.DATA_DIR, qa_data.keys())
+    unique_questions = blip_module.unique_questions
+
+    print(f"Answering {len(unique_questions)} unique questions on {sum(map(len, photos.values()))} photos...")
+    photo_answers = {}
+    for landmark, paths in photos.items():
+        for path in paths:
+            try:
+                photo_answers[path] = answer_all_questions(
+                    path, unique_questions, mode, blip_module.VQA_BATCH_SIZE
+                )
+            except Exception as e:
+                print(f"Warning: Skipping '{path}': {e}")
+        photos[landmark] = [p for p in paths if p in photo_answers]
+
+    ranked = rank_questions(qa_data, photos, photo_answers)
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "generated_at": datetime.now().isoformat(),
+                "mode": mode,
+                "landmarks": ranked,
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+    print(f"Successfully created question order file at: {output_path}")
+
+    early_exit_report(qa_data, ranked, photos, photo_answers)
+
+
+if __name__ == "__main__":
+    build_question_order(blip_module.QUESTION_ORDER_FILE)
@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import multiprocessing as mp
+from datetime import date, timedelta
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+# The rollover race only exists in the file-based selection mode
+os.environ["ANSWER_SELECTION"] = "random"
+
+
+def stale_state():
+    """A valid state file from yesterday, so every worker sees a rollover."""
+    return {
+        "date": str(date.today() - timedelta(days=1)),
+        "answer1": "stale",
+        "answer2": "stale",
+        "hint1": "stale",
+        "hint2": "stale",
+    }
+
+
+def use_state_file(state_file):
+    """Points answer_manager at the scratch state file (called inside each process)."""
+    import answer_manager
+
+    answer_manager.STATE_FILE = state_file
+    return answer_manager
+
+
+def rollover_worker(state_file, rounds, start, done, results, use_lock):
+    """Simulates a server worker hitting the midnight rollover at the same moment as the others."""
+    sys.stdout = open(os.devnull, "w")  # keep the answer_manager logs out of the report
+    answer_manager = use_state_file(state_file)
+    for round_no in range(rounds):
+        start.wait()
+        if use_lock:
+            answers = answer_manager.get_today_answers()
+        else:
+            answers = answer_manager.load_or_create_answers()
+        results.put((round_no, answers))
+        done.wait()
+
+
+def reader_worker(state_file, stop, counters):
+    """Keeps reading the state file the way daily_state does and counts torn/unparseable reads."""
+    reads = errors = 0
+    while not stop.is_set():
+        try:
+            with open(state_file, "r", encoding="utf-8") as f:
+                json.loads(f.read())
+            reads += 1
+        except FileNotFoundError:
+            pass
+        except json.JSONDecodeError:
+            errors += 1
+    counters.put((reads, errors))
+
+
+def run(workers, rounds, readers, use_lock):
+    state_file = os.path.join(tempfile.mkdtemp(prefix="pazule_rollover_"), "current_answer.json")
+    use_state_file(state_file)
+    from answer_store import write_json_atomic
+
+    start = mp.Barrier(workers + 1)
+    done = mp.Barrier(workers + 1)
+    results = mp.Queue()
+    counters = mp.Queue()
+    stop = mp.Event()
+
+    procs = [
+        mp.Process(target=rollover_worker, args=(state_file, rounds, start, done, results, use_lock))
+        for _ in range(workers)
+    ]
+    reader_procs = [mp.Process(target=reader_worker, args=(state_file, stop, counters)) for _ in range(readers)]
+    for proc in procs + reader_procs:
+        proc.start()
+
+    conflicts = 0
+    mismatched = 0
+    began = time.perf_counter()
+    for round_no in range(rounds):
+        # Simulated midnight: the file still holds yesterday's answers
+        write_json_atomic(state_file, stale_state())
+        start.wait()
+        answers = {results.get(timeout=30) for _ in range(workers)}
+        done.wait()
+
+        with open(state_file, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        saved_answers = (saved["answer1"], saved["answer2"], saved["hint1"], saved["hint2"])
+        if len({a for _, a in answers}) > 1:
+            conflicts += 1
+        if any(a != saved_answers for _, a in answers):
+            mismatched += 1
+
+    elapsed = time.perf_counter() - began
+    stop.set()
+    reads = errors = 0
+    for _ in reader_procs:
+        r, e = counters.get(timeout=30)
+        reads += r
+        errors += e
+    for proc in procs + reader_procs:
+        proc.join()
+
+    print(f"workers={workers} rounds={rounds} lock={'on' if use_lock else 'off'} ({elapsed:.1f}s)")
+    print(f"  rounds where workers got different answers : {conflicts}")
+    print(f"  rounds where a worker's answer != saved file: {mismatched}")
+    print(f"  concurrent reads: {reads}, torn/unparseable: {errors}")
+    return conflicts == 0 and mismatched == 0 and errors == 0
+
+
+if __name__ == "__main__":
+    # python tests/check_answer_rollover.py [--workers 8] [--rounds 50] [--readers 2] [--no-lock]
+    # --no-lock skips the state file lock to show the conflicts it prevents (expected to FAIL)
+    parser = argparse.ArgumentParser(description="Concurrent midnight rollover check for answer_manager")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--no-lock", action="store_true")
+    args = parser.parse_args()
+
+    ok = run(args.workers, args.rounds, args.readers, not args.no_lock)
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,151 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import urllib.request
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm_server import start_server
+
+# Small limits so every scenario finishes in a few seconds
+DEADLINE = 1.5
+COOLDOWN = 1.0
+BREAKER_FAILURES = 3
+
+server = start_server()
+BASE_URL = f"http://127.0.0.1:{server.server_port}"
+os.environ.update({
+    "OPENAI_BASE_URL": f"{BASE_URL}/v1",
+    "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "sk-test",
+    "LLM_TIMEOUT": "1",
+    "LLM_DEADLINE": str(DEADLINE),
+    "LLM_MAX_RETRIES": "2",
+    "LLM_RETRY_BACKOFF": "0.05",
+    "LLM_BREAKER_FAILURES": str(BREAKER_FAILURES),
+    "LLM_BREAKER_COOLDOWN": str(COOLDOWN),
+    # Keep the hint cache and hint pack out of the way
+    "HINT_VARIANTS": "0",
+    "HINT_PACK_FILE": os.path.join(tempfile.gettempdir(), "no_hint_pack.json"),
+})
+
+from models import llm_client
+from models.llm_hint_generator import (
+    build_blip_messages,
+    fallback_hint,
+    generate_blip_hint,
+    request_hint,
+    stream_hint,
+)
+
+FAILED_QUESTIONS = [{"question": "Is it a tower?", "expected_answer": "yes", "model_answer": "no"}]
+MESSAGES = build_blip_messages("네모탑", FAILED_QUESTIONS)
+results = []
+
+
+def control(**values):
+    request = urllib.request.Request(
+        f"{BASE_URL}/control", data=json.dumps(values).encode("utf-8"), method="POST"
+    )
+    return json.loads(urllib.request.urlopen(request).read())
+
+
+def fake_stats():
+    return json.loads(urllib.request.urlopen(f"{BASE_URL}/stats").read())
+
+
+def check(name, condition, detail=""):
+    results.append(condition)
+    print(f"{'PASS' if condition else 'FAIL'}  {name}  {detail}")
+
+
+def timed(fn, *args):
+    """Runs fn and returns (result or exception, elapsed seconds)."""
+    start = time.perf_counter()
+    try:
+        value = fn(*args)
+    except Exception as e:
+        value = e
+    return value, time.perf_counter() - start
+
+
+def scenario_keepalive():
+    before = fake_stats()
+    for _ in range(10):
+        request_hint(MESSAGES)
+    streamed = "".join(stream_hint(MESSAGES))
+    after = fake_stats()
+    new_connections = after["connections"] - before["connections"]
+    check("healthy upstream: 10 calls + 1 stream succeed", bool(streamed.strip()))
+    check("connections are reused (keep-alive pool)", new_connections <= 2, f"new connections={new_connections}")
+
+
+def scenario_deadline():
+    control(latency=5.0)
+    value, elapsed = timed(request_hint, MESSAGES)
+    check("slow upstream: call fails", isinstance(value, Exception), type(value).__name__)
+    check("slow upstream: call respects the deadline", elapsed < DEADLINE + 0.5, f"{elapsed:.2f}s (deadline {DEADLINE}s)")
+    control(latency=0.0)
+    time.sleep(COOLDOWN + 0.1)  # let the breaker half-open again
+    request_hint(MESSAGES)
+
+
+def scenario_breaker():
+    control(error_rate=1.0, error_status=503)
+    before = fake_stats()["requests"]
+    value, _ = timed(request_hint, MESSAGES)
+    retried = fake_stats()["requests"] - before
+    check("5xx upstream: retried before giving up", retried >= 2, f"attempts={retried}")
+    failures = llm_client.breaker.stats()["consecutive_failures"]
+    check("a failed call counts once towards the breaker", failures == 1, f"consecutive_failures={failures}")
+
+    for _ in range(BREAKER_FAILURES):
+        timed(request_hint, MESSAGES)
+    check("breaker opens after repeated failures", llm_client.breaker.stats()["state"] == "open")
+
+    before = fake_stats()["requests"]
+    value, elapsed = timed(request_hint, MESSAGES)
+    check(
+        "open breaker: fails fast without calling upstream",
+        isinstance(value, llm_client.CircuitOpenError) and fake_stats()["requests"] == before,
+        f"{elapsed * 1000:.1f}ms",
+    )
+    hint, elapsed = timed(generate_blip_hint, "네모탑", FAILED_QUESTIONS)
+    check("open breaker: local fallback hint", hint == fallback_hint("네모탑"), f"{elapsed * 1000:.1f}ms")
+
+
+def scenario_half_open_failure():
+    time.sleep(COOLDOWN + 0.1)  # upstream still failing when the trial call goes out
+    before = fake_stats()["requests"]
+    value, _ = timed(request_hint, MESSAGES)
+    attempts = fake_stats()["requests"] - before
+    check(
+        "half-open trial failure: upstream error surfaces, no retries",
+        isinstance(value, llm_client.openai.InternalServerError) and attempts == 1,
+        f"{type(value).__name__}, attempts={attempts}",
+    )
+    check("half-open trial failure: breaker opens again", llm_client.breaker.stats()["state"] == "open")
+
+
+def scenario_recovery():
+    control(error_rate=0.0)
+    time.sleep(COOLDOWN + 0.1)
+    value, _ = timed(request_hint, MESSAGES)
+    check("recovered upstream: half-open trial succeeds", isinstance(value, str))
+    check("breaker closes again", llm_client.breaker.stats()["state"] == "closed")
+
+
+if __name__ == "__main__":
+    # python tests/check_llm_client.py
+    scenario_keepalive()
+    scenario_deadline()
+    scenario_breaker()
+    scenario_half_open_failure()
+    scenario_recovery()
+    print(f"\n{sum(results)}/{len(results)} checks passed")
+    print(json.dumps(llm_client.client_stats(), ensure_ascii=False))
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,179 @@
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Canned hint returned by the fake chat completion, streamed word by word
+FAKE_HINT = "하늘을 향해 층층이 쌓인 이야기를 따라가 보세요. 조금 더 높은 곳에 답이 있어요."
+
+
+class FakeState:
+    """Behaviour of the fake upstream. Can be changed at runtime with POST /control."""
+
+    def __init__(self, latency=0.0, error_rate=0.0, error_status=503, chunk_delay=0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.chunk_delay = chunk_delay
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+
+    def update(self, values):
+        with self.lock:
+            for name in ("latency", "error_rate", "error_status", "chunk_delay"):
+                if name in values:
+                    setattr(self, name, type(getattr(self, name))(values[name]))
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "latency": self.latency,
+                "error_rate": self.error_rate,
+                "error_status": self.error_status,
+                "chunk_delay": self.chunk_delay,
+                "requests": self.requests,
+                "connections": self.connections,
+            }
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """
+    Minimal OpenAI-compatible /v1/chat/completions endpoint (plain and streaming).
+    GET /stats returns request/connection counts; POST /control changes latency and error injection.
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse by the client is visible in /stats
+
+    def setup(self):
+        super().setup()
+        with self.server.state.lock:
+            self.server.state.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", "0"))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self.send_json(200, self.server.state.snapshot())
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        state = self.server.state
+        if self.path == "/control":
+            state.update(self.read_json())
+            self.send_json(200, state.snapshot())
+            return
+        if not self.path.endswith("/chat/completions"):
+            self.send_json(404, {"error": {"message": "not found"}})
+            return
+
+        request = self.read_json()
+        with state.lock:
+            state.requests += 1
+            latency, error_rate, error_status = state.latency, state.error_rate, state.error_status
+            chunk_delay = state.chunk_delay
+
+        time.sleep(latency)
+        if random.random() < error_rate:
+            self.send_json(error_status, {"error": {"message": "injected error", "type": "server_error"}})
+            return
+
+        usage = {"prompt_tokens": 120, "completion_tokens": 40, "total_tokens": 160}
+        if not request.get("stream"):
+            self.send_json(200, {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": FAKE_HINT},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write_chunk(data):
+            payload = f"data: {data}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+            self.wfile.flush()
+
+        for word in FAKE_HINT.split(" "):
+            time.sleep(chunk_delay)
+            write_chunk(json.dumps({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+            }, ensure_ascii=False))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            write_chunk(json.dumps({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "fake"),
+                "choices": [],
+                "usage": usage,
+            }))
+        write_chunk("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def start_server(port=0, **behaviour):
+    """Starts the fake server in a background thread and returns it (server.server_port has the port)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeLLMHandler)
+    server.daemon_threads = True
+    server.state = FakeState(**behaviour)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    # python tests/fake_llm_server.py --port 8765 --latency 2 --error-rate 0.3
+    # then run the server with OPENAI_BASE_URL=http://127.0.0.1:8765/v1
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI chat completions API")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status of injected errors")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="seconds between streamed chunks")
+    args = parser.parse_args()
+
+    server = start_server(
+        args.port,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        chunk_delay=args.chunk_delay,
+    )
+    print(f"Fake LLM server on http://127.0.0.1:{server.server_port}/v1 (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -0,0 +1,66 @@
+import os
+import sys
+
+
+def read_smaps_rollup(pid):
+    """Reads Rss/Pss/Shared/Private (kB) of a process from /proc/<pid>/smaps_rollup (Linux)."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                values[parts[0][:-1]] = int(parts[1])
+    return {
+        "rss": values.get("Rss", 0),
+        "pss": values.get("Pss", 0),
+        "shared": values.get("Shared_Clean", 0) + values.get("Shared_Dirty", 0),
+        "private": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+    }
+
+
+def child_pids(pid):
+    """Returns the direct children of a process (the gunicorn workers of a master)."""
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The 4th field (after the parenthesised command name) is the parent pid
+        if int(stat.rsplit(")", 1)[1].split()[1]) == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def report(master_pid):
+    """
+    Prints memory for a gunicorn master and its workers.
+    'private' is what each extra worker really costs; 'shared' is the copy-on-write model weights.
+    """
+    rows = [("master", master_pid)] + [("worker", pid) for pid in child_pids(master_pid)]
+    print(f"{'role':<8}{'pid':>8}{'RSS MB':>10}{'PSS MB':>10}{'shared MB':>11}{'private MB':>12}")
+    total_pss = 0
+    workers_private = []
+    for role, pid in rows:
+        mem = read_smaps_rollup(pid)
+        total_pss += mem["pss"]
+        if role == "worker":
+            workers_private.append(mem["private"])
+        print(
+            f"{role:<8}{pid:>8}{mem['rss'] / 1024:>10.0f}{mem['pss'] / 1024:>10.0f}"
+            f"{mem['shared'] / 1024:>11.0f}{mem['private'] / 1024:>12.0f}"
+        )
+    print(f"\nTotal PSS (actual memory used by the server): {total_pss / 1024:.0f} MB")
+    if workers_private:
+        print(f"Average private memory per worker: {sum(workers_private) / len(workers_private) / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    # python tests/measure_worker_memory.py <gunicorn master pid>
+    if len(sys.argv) != 2:
+        print("Usage: python tests/measure_worker_memory.py <gunicorn master pid>")
+        sys.exit(1)
+    report(int(sys.argv[1]))
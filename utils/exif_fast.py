@@ -0,0 +1,188 @@
+# exif_fast.py
+import struct
+
+from PIL import Image
+
+# ============================================
+# ✅ 픽셀 디코딩 없이 컨테이너 바이트에서 EXIF 블록만 찾아 파싱
+# ============================================
+# JPEG: APP1 "Exif\0\0" 세그먼트
+# HEIF/HEIC: meta 박스의 iinf에서 'Exif' 항목을 찾고 iloc의 위치로 TIFF 블록을 읽음
+
+JPEG_SOI = b"\xff\xd8"
+EXIF_HEADER = b"Exif\x00\x00"
+
+TAG_DATETIME = 0x0132  # IFD0 DateTime
+TAG_EXIF_IFD = 0x8769
+TAG_DATETIME_ORIGINAL = 0x9003  # Exif IFD DateTimeOriginal
+
+
+def find_jpeg_exif(data):
+    """JPEG 마커를 따라가며 APP1 Exif 세그먼트의 TIFF 블록을 반환합니다. (없으면 None)"""
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # 채움 바이트
+            pos += 1
+            continue
+        if marker in (0xD9, 0xDA):  # EOI / SOS 이후에는 메타데이터 세그먼트가 없음
+            return None
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:  # 길이 없는 마커
+            pos += 2
+            continue
+
+        (length,) = struct.unpack(">H", data[pos + 2 : pos + 4])
+        segment = data[pos + 4 : pos + 2 + length]
+        if marker == 0xE1 and segment.startswith(EXIF_HEADER):
+            return segment[len(EXIF_HEADER):]
+        pos += 2 + length
+    return None
+
+
+def iter_boxes(data, start, end):
+    """ISO BMFF 박스를 (타입, 본문 시작, 본문 끝)으로 순회합니다."""
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack(">I4s", data[pos : pos + 8])
+        header = 8
+        if size == 1:
+            (size,) = struct.unpack(">Q", data[pos + 8 : pos + 16])
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            return
+        yield box_type, pos + header, pos + size
+        pos += size
+
+
+def read_uint(data, pos, size):
+    """size 바이트(0/2/4/8) 빅엔디안 정수를 읽습니다."""
+    if size == 0:
+        return 0, pos
+    fmt = {2: ">H", 4: ">I", 8: ">Q"}[size]
+    return struct.unpack(fmt, data[pos : pos + size])[0], pos + size
+
+
+def find_exif_item_id(data, start, end):
+    """iinf 박스에서 item_type이 'Exif'인 항목 ID를 찾습니다."""
+    version = data[start]
+    pos = start + 4
+    entry_count, pos = read_uint(data, pos, 2 if version == 0 else 4)
+    for box_type, body, box_end in iter_boxes(data, pos, end):
+        if box_type != b"infe":
+            continue
+        infe_version = data[body]
+        if infe_version < 2:
+            continue
+        item_id, p = read_uint(data, body + 4, 2 if infe_version == 2 else 4)
+        item_type = data[p + 2 : p + 6]  # item_protection_index(2) 다음
+        if item_type == b"Exif":
+            return item_id
+    return None
+
+
+def find_item_extent(data, start, end, target_id):
+    """iloc 박스에서 항목의 첫 번째 extent (파일 오프셋, 길이)를 찾습니다."""
+    version = data[start]
+    pos = start + 4
+    offset_size = data[pos] >> 4
+    length_size = data[pos] & 0x0F
+    base_offset_size = data[pos + 1] >> 4
+    index_size = data[pos + 1] & 0x0F if version in (1, 2) else 0
+    pos += 2
+    item_count, pos = read_uint(data, pos, 2 if version < 2 else 4)
+
+    for _ in range(item_count):
+        item_id, pos = read_uint(data, pos, 2 if version < 2 else 4)
+        construction_method = 0
+        if version in (1, 2):
+            construction_method = data[pos + 1] & 0x0F
+            pos += 2
+        pos += 2  # data_reference_index
+        base_offset, pos = read_uint(data, pos, base_offset_size)
+        extent_count, pos = read_uint(data, pos, 2)
+
+        extents = []
+        for _ in range(extent_count):
+            _, pos = read_uint(data, pos, index_size)
+            extent_offset, pos = read_uint(data, pos, offset_size)
+            extent_length, pos = read_uint(data, pos, length_size)
+            extents.append((base_offset + extent_offset, extent_length))
+
+        if item_id == target_id:
+            if construction_method != 0 or not extents:
+                return None  # 파일 오프셋 방식만 지원
+            return extents[0]
+    return None
+
+
+def find_heif_exif(data):
+    """HEIF 컨테이너의 Exif 항목에서 TIFF 블록을 반환합니다. (없으면 None)"""
+    for box_type, body, box_end in iter_boxes(data, 0, len(data)):
+        if box_type != b"meta":
+            continue
+        children = {t: (b, e) for t, b, e in iter_boxes(data, body + 4, box_end)}
+        if b"iinf" not in children or b"iloc" not in children:
+            return None
+
+        item_id = find_exif_item_id(data, *children[b"iinf"])
+        if item_id is None:
+            return None
+        extent = find_item_extent(data, *children[b"iloc"], item_id)
+        if extent is None:
+            return None
+
+        offset, length = extent
+        payload = data[offset : offset + length] if length else data[offset:]
+        if len(payload) < 4:
+            return None
+        # Exif 항목은 TIFF 헤더까지의 오프셋(4바이트)으로 시작
+        (tiff_offset,) = struct.unpack(">I", payload[:4])
+        tiff = payload[4 + tiff_offset :]
+        if tiff.startswith(EXIF_HEADER):
+            tiff = tiff[len(EXIF_HEADER):]
+        return tiff
+    return None
+
+
+def extract_exif_block(data):
+    """
+    이미지 바이트에서 EXIF TIFF 블록만 잘라냅니다. (픽셀 디코딩 없음)
+
+    Returns:
+        bytes or None: TIFF 헤더로 시작하는 EXIF 블록 (지원하지 않는 포맷이거나 없으면 None)
+    """
+    try:
+        if data.startswith(JPEG_SOI):
+            return find_jpeg_exif(data)
+        if data[4:8] == b"ftyp":
+            return find_heif_exif(data)
+    except (struct.error, IndexError, KeyError):
+        return None
+    return None
+
+
+def read_exif_fast(data):
+    """
+    이미지 바이트에서 EXIF를 파싱합니다.
+
+    Returns:
+        PIL.Image.Exif or None: EXIF 태그 (블록을 찾지 못하면 None → 호출 측에서 Pillow로 대체)
+    """
+    block = extract_exif_block(data)
+    if not block:
+        return None
+    exif = Image.Exif()
+    exif.load(block)
+    return exif
+
+
+def photo_datetime(exif):
+    """DateTimeOriginal(Exif IFD)을 우선으로, 없으면 IFD0 DateTime을 반환합니다."""
+    if not exif:
+        return None
+    original = exif.get_ifd(TAG_EXIF_IFD).get(TAG_DATETIME_ORIGINAL)
+    return original or exif.get(TAG_DATETIME)
@@ -0,0 +1,133 @@
+# image_context.py
+import io
+import os
+import math
+import threading
+
+from PIL import Image
+from pillow_heif import register_heif_opener
+
+from utils.exif_fast import read_exif_fast
+
+# HEIC 포맷 지원 등록
+register_heif_opener()
+
+# ======================================
+# ✅ 디코딩 설정
+# ======================================
+# BLIP(384px)/CLIP(224px) 입력에 충분한 최소 짧은 변 길이와 디코딩 픽셀 상한
+DECODE_MIN_SIDE = int(os.getenv("DECODE_MIN_SIDE", "512"))
+DECODE_PIXEL_BUDGET = int(os.getenv("DECODE_PIXEL_BUDGET", str(1024 * 1024)))
+
+# /api/preview 미리보기용 (화면 표시용이라 조금 더 크게)
+PREVIEW_MIN_SIDE = int(os.getenv("PREVIEW_MIN_SIDE", "1080"))
+PREVIEW_PIXEL_BUDGET = int(os.getenv("PREVIEW_PIXEL_BUDGET", str(2048 * 2048)))
+
+# 압축 해제 폭탄 방지: 헤더 기준 원본 픽셀 수가 이 값을 넘으면 디코딩하지 않음 (기본 64MP)
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(64_000_000)))
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+
+def check_pixel_limit(image):
+    """헤더의 이미지 크기가 MAX_IMAGE_PIXELS를 넘으면 ValueError를 발생시킵니다."""
+    width, height = image.size
+    if width * height > MAX_IMAGE_PIXELS:
+        raise ValueError(
+            f"이미지가 너무 큽니다 ({width}x{height}, 최대 {MAX_IMAGE_PIXELS:,} 픽셀)."
+        )
+
+
+def decode_image(image, min_side=DECODE_MIN_SIDE, pixel_budget=DECODE_PIXEL_BUDGET):
+    """
+    pixel_budget보다 큰 이미지를 짧은 변이 min_side 이상인 가장 작은 크기로 바로 디코딩합니다.
+    JPEG은 DCT 스케일링(draft), HEIF는 내장 썸네일(draft)을 사용하고,
+    그래도 pixel_budget을 넘으면 목표 크기로 리사이즈합니다.
+
+    Args:
+        image (PIL.Image): 헤더만 읽은(아직 디코딩하지 않은) 이미지
+        min_side (int): 목표 최소 짧은 변 길이
+        pixel_budget (int): 디코딩 결과의 최대 픽셀 수
+
+    Returns:
+        PIL.Image: RGB 이미지
+    """
+    check_pixel_limit(image)
+
+    width, height = image.size
+    if width * height <= pixel_budget:
+        return image.convert("RGB")  # 이미 충분히 작으면 그대로 (모델 전처리가 리사이즈)
+
+    scale = min(1.0, min_side / min(width, height), math.sqrt(pixel_budget / (width * height)))
+    target = (max(1, math.ceil(width * scale)), max(1, math.ceil(height * scale)))
+    image.draft("RGB", target)  # 목표 크기 이상에서 가장 작은 스케일로 디코딩
+    image = image.convert("RGB")
+    if image.size[0] * image.size[1] > pixel_budget:
+        image = image.resize(target, Image.BICUBIC, reducing_gap=2.0)
+    return image
+
+
+class ImageContext:
+    """
+    업로드 1건의 원본 바이트를 메모리에 두고, EXIF 파싱과 픽셀 디코딩을 각각 한 번만 수행합니다.
+    메타데이터 검증과 BLIP/CLIP 모델이 같은 객체를 공유하므로 임시 파일이 필요 없습니다.
+    """
+
+    def __init__(self, data, filename=""):
+        self.data = data
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._exif = None
+        self._image = None
+
+    @classmethod
+    def from_upload(cls, file_storage):
+        """Flask 업로드 파일(FileStorage)의 본문을 한 번만 읽습니다."""
+        return cls(file_storage.read(), file_storage.filename or "")
+
+    @classmethod
+    def from_path(cls, path):
+        """디스크의 이미지 파일을 읽습니다. (테스트/스크립트용)"""
+        with open(path, "rb") as f:
+            return cls(f.read(), os.path.basename(path))
+
+    def open(self):
+        """헤더만 읽은 지연 로딩 Image를 반환합니다. (픽셀은 아직 디코딩하지 않음)"""
+        image = Image.open(io.BytesIO(self.data))
+        check_pixel_limit(image)
+        return image
+
+    @property
+    def exif(self):
+        """EXIF 태그 (처음 접근할 때 한 번만 파싱, JPEG/HEIF는 컨테이너 바이트에서 직접 읽음)"""
+        with self._lock:
+            if self._exif is None:
+                self._exif = read_exif_fast(self.data)
+            if self._exif is None:
+                self._exif = self.open().getexif()  # 그 외 포맷은 Pillow로 대체
+            return self._exif
+
+    @property
+    def image(self):
+        """모델 입력용으로 축소 디코딩된 RGB PIL Image (처음 접근할 때 한 번만 디코딩)"""
+        with self._lock:
+            if self._image is None:
+                self._image = decode_image(self.open())
+            return self._image
+
+
+def to_pil(image):
+    """
+    파일 경로, ImageContext, PIL Image 중 무엇이 오든 RGB PIL Image로 맞춥니다.
+    파일 경로는 모델 입력 크기에 맞춰 축소 디코딩합니다.
+
+    Args:
+        image (str or ImageContext or PIL.Image): 입력 이미지
+
+    Returns:
+        PIL.Image: RGB 이미지
+    """
+    if isinstance(image, str):
+        return decode_image(Image.open(image))
+    if isinstance(image, ImageContext):
+        return image.image
+    return image  # 이미 PIL Image 객체인 경우